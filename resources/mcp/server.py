@@ -1,4 +1,8 @@
+import os
+import time
+import functools
 from typing import Dict, Any
+from orpheus_collage_tools.metrics import REGISTRY, MCP_CALLS, MCP_LATENCY
 from src.torrent_searcher import OrpheusTorrentSearcher
 from src.collage_discoverer import CollageDiscoverer
 from src.torrent_downloader import TorrentDownloader
@@ -7,9 +11,23 @@ class MCP:
     def __init__(self):
         self.tools = {}
 
-    def tool(self, func):
-        self.tools[func.__name__] = func
-        return func
+    def tool(self):
+        def decorator(func):
+            @functools.wraps(func)
+            async def instrumented(*args, **kwargs):
+                status = "error"
+                start = time.monotonic()
+                try:
+                    result = await func(*args, **kwargs)
+                    status = "error" if isinstance(result, dict) and result.get("error") else "success"
+                    return result
+                finally:
+                    MCP_CALLS.inc(tool=func.__name__, status=status)
+                    MCP_LATENCY.observe(time.monotonic() - start, tool=func.__name__)
+
+            self.tools[func.__name__] = instrumented
+            return instrumented
+        return decorator
 
     def resource(self, name):
         def decorator(func):
@@ -94,7 +112,11 @@ async def discover_album_in_collages(
         )
         return results
 
+import os
+import time
+import functools
 from typing import Dict, Any
+from orpheus_collage_tools.metrics import REGISTRY, MCP_CALLS, MCP_LATENCY
 from src.torrent_searcher import OrpheusTorrentSearcher
 from src.collage_discoverer import CollageDiscoverer
 from src.torrent_downloader import TorrentDownloader
@@ -103,9 +125,23 @@ class MCP:
     def __init__(self):
         self.tools = {}
 
-    def tool(self, func):
-        self.tools[func.__name__] = func
-        return func
+    def tool(self):
+        def decorator(func):
+            @functools.wraps(func)
+            async def instrumented(*args, **kwargs):
+                status = "error"
+                start = time.monotonic()
+                try:
+                    result = await func(*args, **kwargs)
+                    status = "error" if isinstance(result, dict) and result.get("error") else "success"
+                    return result
+                finally:
+                    MCP_CALLS.inc(tool=func.__name__, status=status)
+                    MCP_LATENCY.observe(time.monotonic() - start, tool=func.__name__)
+
+            self.tools[func.__name__] = instrumented
+            return instrumented
+        return decorator
 
     def resource(self, name):
         def decorator(func):
@@ -508,4 +544,15 @@ search_torrents(
     groupname="Music for the Jilted Generation"
 )
 ```
-"""
\ No newline at end of file
+"""
+
+
+@mcp.resource("orpheus://metrics")
+async def get_metrics() -> str:
+    """Prometheus text-format metrics for this server process"""
+    return REGISTRY.render()
+
+
+if os.environ.get("ORPHEUS_METRICS_PORT"):
+    # Expose /metrics over HTTP for Prometheus to scrape
+    REGISTRY.serve(int(os.environ["ORPHEUS_METRICS_PORT"]))
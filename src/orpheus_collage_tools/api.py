@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Orpheus Collage Tools - Tracker Client
+Async session for ajax.php API calls, logged-in page scraping and
+.torrent downloads, sharing one connection pool and rate limiter
+"""
+
+import os
+import json
+import time
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+import aiohttp
+
+from .cache import ResponseCache, cache_key
+from .jsonstream import JSONArrayStream
+from .metrics import BYTES_FETCHED, CACHE_LOOKUPS, RATE_LIMIT_WAIT, REQUESTS, REQUEST_LATENCY, RETRIES
+from .resilience import (RETRY_STATUSES, TRACKER_BREAKER, CircuitBreaker, CircuitOpenError, RetryPolicy,
+                         parse_retry_after)
+
+BASE_URL = "https://orpheus.network"
+USER_AGENT = "Orpheus-CLI/1.0"
+STREAM_CHUNK = 64 * 1024
+# Failures of the connection itself rather than answers from the tracker
+TRANSPORT_ERRORS = (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError)
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+# The login form posts back to login.php; no logged-in page carries it
+LOGIN_FORM = b'action="login.php"'
+
+
+def _is_login_url(url: str) -> bool:
+    return url.split("?")[0].rstrip("/").endswith("login.php")
+
+
+class APIError(Exception):
+    """Raised when the tracker answers with an HTTP error or a failure status"""
+
+    def __init__(self, message: str, status: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class FailureStatus(APIError):
+    """The tracker answered ``status: failure``, e.g. for an artist it does not know"""
+
+
+def format_age(seconds: float) -> str:
+    """Short human age such as '45s', '12m', '3h' or '2d'"""
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= size:
+            return f"{int(seconds // size)}{unit}"
+    return f"{int(seconds)}s"
+
+
+def stale_marker(age: float) -> str:
+    """Marker shown next to data served from an old cached copy while it is refreshed"""
+    return f"⏳ stale (cached {format_age(age)} ago, refreshing)"
+
+
+class CachedResponse:
+    """An API payload (or what a parser made of it) together with how old the copy we hold is"""
+
+    def __init__(self, data: Any, age: float = 0.0, stale: bool = False):
+        self.data = data
+        self.age = age
+        self.stale = stale
+
+    @property
+    def marker(self) -> str:
+        """Marker shown next to stale data while it is being refreshed"""
+        return stale_marker(self.age) if self.stale else ""
+
+
+class RateLimiter:
+    """Sliding-window limiter: at most ``max_requests`` per ``period`` seconds"""
+
+    def __init__(self, max_requests: int = 5, period: float = 10.0):
+        self.max_requests = max_requests
+        self.period = period
+        self._sent: Deque[float] = deque()
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def acquire(self):
+        start = time.monotonic()
+        # Created lazily so the lock belongs to the loop that uses it
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                while self._sent and now - self._sent[0] >= self.period:
+                    self._sent.popleft()
+                if len(self._sent) < self.max_requests:
+                    self._sent.append(now)
+                    break
+                await asyncio.sleep(self.period - (now - self._sent[0]))
+        RATE_LIMIT_WAIT.observe(time.monotonic() - start)
+
+
+class OrpheusAPI:
+    """Async tracker session, used as ``async with OrpheusAPI(...) as api``"""
+
+    def __init__(self, api_key: str, username: Optional[str] = None, password: Optional[str] = None,
+                 base_url: str = BASE_URL, rate_limiter: Optional[RateLimiter] = None,
+                 timeout: float = 30.0, max_connections: int = 8, cache: Optional[ResponseCache] = None,
+                 retry_policy: Optional[RetryPolicy] = None, breaker: Optional[CircuitBreaker] = None):
+        self.api_key = api_key
+        self.username = username
+        self.password = password
+        self.base_url = base_url.rstrip("/")
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.cache = cache
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.breaker = breaker or TRACKER_BREAKER
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._logged_in = False
+        self._login_lock: Optional[asyncio.Lock] = None
+        self._refreshing: Dict[str, asyncio.Task] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], **kwargs) -> "OrpheusAPI":
+        """Build a client from the loaded config.json"""
+        rate = config.get("rate_limit") or [5, 10]
+        kwargs.setdefault("rate_limiter", RateLimiter(int(rate[0]), float(rate[1])))
+        kwargs.setdefault("base_url", os.environ.get("ORPHEUS_BASE_URL") or config.get("base_url", BASE_URL))
+        return cls(config["api_key"], config.get("username"), config.get("password"), **kwargs)
+
+    async def __aenter__(self):
+        self._login_lock = asyncio.Lock()
+        self.session = aiohttp.ClientSession(
+            headers={"User-Agent": USER_AGENT},
+            connector=aiohttp.TCPConnector(limit=self.max_connections),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self, refresh_grace: float = 5.0):
+        # Give in-flight background refreshes a moment to land in the cache
+        pending: Set[asyncio.Task] = set(self._refreshing.values())
+        if pending:
+            _done, still_running = await asyncio.wait(pending, timeout=refresh_grace)
+            for task in still_running:
+                task.cancel()
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _request(self, endpoint: str, method: str, path: str,
+                       handler: Optional[Callable[[aiohttp.ClientResponse], Awaitable[Any]]] = None, **kwargs) -> Any:
+        """Send a rate-limited request, retrying transient failures, and return the body
+
+        Timeouts, dropped connections, truncated bodies, 429 and 5xx answers
+        are retried with jittered exponential backoff (or after Retry-After).
+        Server errors and transport failures also count against the shared
+        circuit breaker.
+        """
+        if self.session is None:
+            raise RuntimeError("OrpheusAPI must be used inside 'async with'")
+
+        attempts = self.retry_policy.attempts
+        for attempt in range(1, attempts + 1):
+            try:
+                probe = await self.breaker.before()
+            except CircuitOpenError as e:
+                raise APIError(str(e)) from e
+            settled = False
+            retry_after = None
+            try:
+                body = await self._send(endpoint, method, path, handler, **kwargs)
+                self.breaker.record_success()
+                settled = True
+                return body
+            except APIError as e:
+                if (e.status is not None and e.status >= 500) or isinstance(e.__cause__, TRANSPORT_ERRORS):
+                    self.breaker.record_failure()
+                else:
+                    # The tracker answered; it is up even if it refused this request
+                    self.breaker.record_success()
+                    if e.retry_after is not None:
+                        self.breaker.pause(e.retry_after)
+                settled = True
+                if e.status not in RETRY_STATUSES or attempt == attempts:
+                    raise
+                reason, retry_after = str(e.status), e.retry_after
+            except TRANSPORT_ERRORS as e:
+                self.breaker.record_failure()
+                settled = True
+                if isinstance(e, asyncio.TimeoutError):
+                    reason = "timeout"
+                elif isinstance(e, aiohttp.ClientPayloadError):
+                    reason = "truncated body"
+                else:
+                    reason = "connection"
+                if attempt == attempts:
+                    raise APIError(f"{path}: {reason} after {attempts} attempts") from e
+            finally:
+                if probe and not settled:
+                    # Cancelled mid-probe: don't leave the breaker half-open forever
+                    self.breaker.record_failure()
+            RETRIES.inc(endpoint=endpoint, reason=reason)
+            await asyncio.sleep(self.retry_policy.delay(attempt, retry_after))
+        raise AssertionError("unreachable")
+
+    async def _send(self, endpoint: str, method: str, path: str,
+                    handler: Optional[Callable[[aiohttp.ClientResponse], Awaitable[Any]]] = None, **kwargs) -> Any:
+        """One rate-limited request; HTTP errors become ``APIError``
+
+        The body is returned, or with ``handler`` whatever it makes of the
+        (successful) response, e.g. when reading it as a stream.
+        """
+        await self.rate_limiter.acquire()
+        status = "error"
+        start = time.monotonic()
+        try:
+            async with self.session.request(method, f"{self.base_url}/{path}", **kwargs) as response:
+                status = str(response.status)
+                if response.status < 400 and handler is not None:
+                    return await handler(response)
+                body = await response.read()
+                BYTES_FETCHED.inc(len(body))
+                if response.status >= 400:
+                    raise APIError(f"HTTP {response.status} from {path}", response.status,
+                                   parse_retry_after(response.headers.get("Retry-After")))
+                return body
+        finally:
+            REQUESTS.inc(endpoint=endpoint, status=status)
+            REQUEST_LATENCY.observe(time.monotonic() - start, endpoint=endpoint)
+
+    async def ajax_raw(self, action: str, **params) -> bytes:
+        """Raw ``ajax.php`` response body, for parsing off the event loop"""
+        return await self._request(
+            action, "GET", "ajax.php",
+            params={"action": action, **params},
+            headers={"Authorization": f"token {self.api_key}"},
+        )
+
+    async def ajax(self, action: str, max_age: Optional[float] = None, **params) -> Dict[str, Any]:
+        """Parsed ``ajax.php`` response payload (the ``response`` member)
+
+        With a cache attached, a response younger than ``max_age`` seconds is
+        served from disk; every fetched response is written back to the cache.
+        """
+        key = cache_key(action, **params)
+        if self.cache is not None and max_age is not None:
+            cached = self.cache.get(key, max_age)
+            if cached is not None:
+                return cached
+
+        data = json.loads(await self.ajax_raw(action, **params))
+        if data.get("status") != "success":
+            raise FailureStatus(data.get("error") or f"{action} request failed")
+        response = data.get("response") or {}
+        if self.cache is not None:
+            self.cache.put(key, response)
+        return response
+
+    async def ajax_stream(self, action: str, key: str, on_items: Callable[[List[Dict[str, Any]]], Awaitable[None]],
+                          on_head: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+                          **params) -> Dict[str, Any]:
+        """Stream the ``response[key]`` array of a large ``ajax.php`` payload
+
+        Elements are parsed as the body arrives and passed to ``on_items`` in
+        batches, so neither the whole body nor the whole object tree is held
+        in memory. ``on_head`` gets the payload fields that precede the
+        array (e.g. the collage name) before the first batch. Returns the
+        rest of the payload (``key`` left empty). Streamed responses bypass
+        the cache.
+        """
+        async def read(response: aiohttp.ClientResponse) -> Dict[str, Any]:
+            parser = JSONArrayStream(("response", key))
+
+            def parse(chunk: Optional[bytes]) -> List[Dict[str, Any]]:
+                try:
+                    return parser.feed(chunk) if chunk is not None else parser.finish()
+                except ValueError as e:
+                    raise APIError(f"Invalid {action} response: {e}") from e
+
+            try:
+                async for chunk in response.content.iter_chunked(STREAM_CHUNK):
+                    BYTES_FETCHED.inc(len(chunk))
+                    had_head = parser.head is not None
+                    items = parse(chunk)
+                    if on_head is not None and not had_head and parser.head is not None:
+                        await on_head(parser.head.get("response") or {})
+                    if items:
+                        await on_items(items)
+            except TRANSPORT_ERRORS as e:
+                if parser.count:
+                    # Items were already handed on; a retry would repeat them, so
+                    # give up here (the breaker still counts the failure)
+                    raise APIError(f"{action} response cut off after {parser.count} items") from e
+                raise
+            items = parse(None)
+            if items:
+                await on_items(items)
+            return parser.document
+
+        data = await self._request(action, "GET", "ajax.php", read,
+                                   params={"action": action, **params},
+                                   headers={"Authorization": f"token {self.api_key}"})
+        if data.get("status") != "success":
+            raise FailureStatus(data.get("error") or f"{action} request failed")
+        return data.get("response") or {}
+
+    async def ajax_swr(self, action: str, max_age: float,
+                       on_refresh: Optional[Callable[[Dict[str, Any], bool], None]] = None,
+                       **params) -> CachedResponse:
+        """Stale-while-revalidate lookup for interactive views
+
+        Anything we hold in the cache is returned at once, even past
+        ``max_age``; a stale copy is marked as such and refetched in the
+        background, after which ``on_refresh(new_data, changed)`` is called.
+        Only data we have never seen blocks on the network.
+        """
+        cached = self.swr_cached(action, max_age, on_refresh, **params)
+        if cached is None:
+            return CachedResponse(await self.ajax(action, **params))
+        return cached
+
+    def swr_cached(self, action: str, max_age: float,
+                   on_refresh: Optional[Callable[[Dict[str, Any], bool], None]] = None,
+                   **params) -> Optional[CachedResponse]:
+        """The cache half of ``ajax_swr``: any copy we hold (refreshed in the background when stale), else None"""
+        key = cache_key(action, **params)
+        entry = self.cache.get_entry(key) if self.cache is not None else None
+        if entry is None:
+            CACHE_LOOKUPS.inc(result="miss")
+            return None
+
+        data, stored_at = entry
+        age = max(0.0, time.time() - stored_at)
+        if age <= max_age:
+            CACHE_LOOKUPS.inc(result="hit")
+            return CachedResponse(data, age)
+
+        CACHE_LOOKUPS.inc(result="stale")
+        if key not in self._refreshing:
+            task = asyncio.ensure_future(self._revalidate(key, action, params, data, on_refresh))
+            self._refreshing[key] = task
+        return CachedResponse(data, age, stale=True)
+
+    async def _revalidate(self, key: str, action: str, params: Dict[str, Any], old: Dict[str, Any],
+                          on_refresh: Optional[Callable[[Dict[str, Any], bool], None]]):
+        try:
+            new = await self.ajax(action, **params)
+        except (APIError, aiohttp.ClientError, asyncio.TimeoutError):
+            # Keep serving the stale copy; the next lookup tries again
+            return
+        finally:
+            self._refreshing.pop(key, None)
+        if on_refresh is not None:
+            on_refresh(new, new != old)
+
+    async def login(self):
+        """Log in with username/password so site pages can be scraped
+
+        A good login redirects away from login.php; a refused one answers
+        with the login form again and raises ``APIError``.
+        """
+        async with self._login_lock:
+            if self._logged_in:
+                return
+            if not self.username or not self.password:
+                raise APIError("Username and password are required to browse site pages")
+
+            async def check(response: aiohttp.ClientResponse) -> None:
+                target = response.headers.get("Location", "")
+                if response.status not in REDIRECT_STATUSES or _is_login_url(target):
+                    raise APIError("Login failed: check the username and password in your configuration")
+
+            await self._request("login", "POST", "login.php", check, data={
+                "username": self.username,
+                "password": self.password,
+                "keeplogged": "1",
+                "login": "Log in",
+            }, allow_redirects=False)
+            self._logged_in = True
+
+    async def page(self, path: str, **params) -> str:
+        """HTML for a site page such as ``collages.php``
+
+        Raises ``APIError`` when the site sends us to the login page instead,
+        e.g. because the session expired; the next call logs in again.
+        """
+        await self.login()
+        endpoint = path.split(".")[0]
+
+        async def read(response: aiohttp.ClientResponse) -> bytes:
+            body = await response.read()
+            BYTES_FETCHED.inc(len(body))
+            if _is_login_url(response.url.path) or LOGIN_FORM in body:
+                self._logged_in = False
+                raise APIError(f"{path}: got the login page; the session has expired or the login was refused")
+            return body
+
+        body = await self._request(endpoint, "GET", path, read, params=params)
+        return body.decode("utf-8", errors="replace")
+
+    async def download_torrent(self, torrent_id: int) -> bytes:
+        """The .torrent file for ``torrent_id``"""
+        return await self.ajax_raw("download", id=torrent_id)
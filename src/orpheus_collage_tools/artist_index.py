@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Orpheus Collage Tools - Artist Index
+Local dictionary of every artist name seen in cached responses, collage
+stores and crates, used to correct misspelled names the tracker does not know
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import unicodedata
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, TypeVar
+
+from .api import FailureStatus
+
+INDEX_FILE = "artist_index.json"
+INDEX_VERSION = 1
+# How long a name the tracker rejected is corrected without asking it again
+MISS_MAX_AGE = 7 * 86400
+
+# Names that describe a compilation rather than an artist
+NOT_ARTISTS = {"various artists", "various", "va", "unknown artist"}
+
+T = TypeVar("T")
+
+TRAILING_THE = re.compile(r"^(.*),\s*the$")
+NON_WORD = re.compile(r"[^\w\s]+")
+
+
+def normalize_artist(name: str) -> str:
+    """Key under which spellings of one artist meet
+
+    Case and diacritics are dropped, "&" reads as "and", punctuation is
+    ignored and "The Beatles", "Beatles, The" and "Beatles" share a key.
+    """
+    text = unicodedata.normalize("NFKD", name)
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    text = " ".join(text.replace("&", " and ").split())
+    match = TRAILING_THE.match(text)
+    if match:
+        text = match.group(1)
+    elif text.startswith("the ") and len(text) > 4:
+        text = text[4:]
+    return " ".join(NON_WORD.sub("", text).split())
+
+
+def max_typos(key: str) -> int:
+    """Edits tolerated for a key of this length (none for very short names)"""
+    if len(key) <= 3:
+        return 0
+    return 1 if len(key) <= 7 else 2
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, or ``limit + 1`` once it is exceeded"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def _trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ArtistIndex:
+    """Normalized artist keys -> display name, persisted as ``artist_index.json``
+
+    Names seen in tracker responses are trusted; names typed into crates are
+    kept too but lose to a trusted spelling within typo distance. Keys the
+    tracker rejected are remembered as misses (key -> time) so a repeated
+    typo is corrected without asking again.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        # key -> [display name, trusted]
+        self.artists: Dict[str, List[Any]] = {}
+        self.misses: Dict[str, float] = {}
+        self.dirty = False
+        self._grams: Optional[Dict[str, Set[str]]] = None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION:
+                self.artists = data.get("artists") or {}
+                self.misses = data.get("misses") or {}
+        except (OSError, ValueError):
+            pass
+
+    def __len__(self) -> int:
+        return len(self.artists)
+
+    def add(self, name: str, trusted: bool = True):
+        name = " ".join((name or "").split())
+        key = normalize_artist(name)
+        if not key or key in NOT_ARTISTS:
+            return
+        if trusted and self.misses.pop(key, None) is not None:
+            self.dirty = True
+        entry = self.artists.get(key)
+        if entry is not None and (entry[1] or not trusted):
+            return
+        self.artists[key] = [name, trusted]
+        self.dirty = True
+        if self._grams is not None:
+            for gram in _trigrams(key):
+                self._grams.setdefault(gram, set()).add(key)
+
+    def add_many(self, names: Iterable[str], trusted: bool = True):
+        for name in names:
+            self.add(name, trusted)
+
+    def _candidates(self, key: str) -> Set[str]:
+        """Keys sharing enough trigrams with ``key`` to be within typo distance"""
+        if self._grams is None:
+            self._grams = {}
+            for known in self.artists:
+                for gram in _trigrams(known):
+                    self._grams.setdefault(gram, set()).add(known)
+        grams = _trigrams(key)
+        # Each edit changes at most three trigrams (four for a transposition)
+        needed = max(1, len(grams) - 4 * max_typos(key))
+        counts: Dict[str, int] = {}
+        for gram in grams:
+            for known in self._grams.get(gram, ()):
+                counts[known] = counts.get(known, 0) + 1
+        return {known for known, count in counts.items() if count >= needed}
+
+    def lookup(self, name: str) -> Optional[str]:
+        """The known spelling of ``name``: exact key first, then the single closest trusted name"""
+        key = normalize_artist(name)
+        if not key:
+            return None
+        entry = self.artists.get(key)
+        if entry is not None and entry[1]:
+            return entry[0]
+        limit = max_typos(key)
+        best: List[Tuple[int, str]] = []
+        if limit:
+            for known in self._candidates(key):
+                if known == key or not self.artists[known][1]:
+                    continue
+                distance = edit_distance(key, known, limit)
+                if distance <= limit:
+                    best.append((distance, known))
+        best.sort()
+        if best and (len(best) == 1 or best[0][0] < best[1][0]):
+            return self.artists[best[0][1]][0]
+        # Ambiguous or unknown: fall back to an untrusted exact match
+        return entry[0] if entry is not None else None
+
+    def correct(self, name: str, quiet: bool = False) -> str:
+        """``name`` as the tracker spells it when the index knows better, else unchanged"""
+        known = self.lookup(name)
+        if known is None or known == name.strip():
+            return name
+        if normalize_artist(known) != normalize_artist(name) and not quiet:
+            print(f"🔤 Using '{known}' for '{name}'", file=sys.stderr)
+        return known
+
+    def add_miss(self, name: str):
+        """Remember that the tracker knows no artist called ``name``"""
+        key = normalize_artist(name)
+        if key and not (self.artists.get(key) or [None, False])[1]:
+            self.misses[key] = time.time()
+            self.dirty = True
+
+    def is_miss(self, name: str) -> bool:
+        recorded = self.misses.get(normalize_artist(name))
+        return recorded is not None and time.time() - recorded < MISS_MAX_AGE
+
+    async def fetch(self, name: str, fetch: Callable[[str], Awaitable[T]], quiet: bool = False) -> T:
+        """``fetch(name)``, retried with the corrected spelling only when the tracker knows no such artist
+
+        The name as given goes first unless the tracker recently rejected it
+        and the index has a single correction for it, so a real artist one
+        typo away from a better-known one ("Mase", "Muse") is never rewritten.
+        """
+        if self.is_miss(name):
+            known = self.correct(name, quiet)
+            if normalize_artist(known) != normalize_artist(name):
+                return await fetch(known)
+        try:
+            return await fetch(name)
+        except FailureStatus:
+            self.add_miss(name)
+            known = self.correct(name, quiet)
+            if known == name:
+                raise
+            return await fetch(known)
+
+    def save(self):
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "artists": self.artists, "misses": self.misses}, f,
+                      ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+
+def response_artists(value: Dict[str, Any]) -> Iterator[str]:
+    """Artist names in a cached ``ajax.php`` response of any action"""
+    if value.get("name") and "torrentgroup" in value:
+        # action=artist
+        yield value["name"]
+    groups = value.get("torrentgroups") or value.get("results") or []
+    if isinstance(value.get("group"), dict):
+        groups = [value["group"]] + list(groups)
+    for group in groups:
+        if not isinstance(group, dict):
+            continue
+        for artist in (group.get("musicInfo") or {}).get("artists") or []:
+            if isinstance(artist, dict) and artist.get("name"):
+                yield artist["name"]
+        for artist in group.get("artists") or []:
+            if isinstance(artist, dict) and artist.get("name"):
+                yield artist["name"]
+        if isinstance(group.get("artist"), str):
+            # action=browse results carry a display string
+            yield group["artist"]
+
+
+def cached_artists(cache_dir: Path) -> Iterator[str]:
+    for path in Path(cache_dir).glob("*/*.json"):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f).get("value")
+        except (OSError, ValueError):
+            continue
+        if isinstance(value, dict):
+            yield from response_artists(value)
+
+
+def build_artist_index(config_dir: Path) -> ArtistIndex:
+    """Rebuild the index from the response cache, collage stores and crates"""
+    # Imported here: crates keys artists with normalize_artist from this module
+    from .collage_store import CollageStore
+    from .crates import crate_artists, list_crates, load_crate
+
+    config_dir = Path(config_dir)
+    index = ArtistIndex(config_dir / INDEX_FILE)
+    index.artists, index.dirty = {}, True
+    index.add_many(cached_artists(config_dir / "cache"))
+    for path in sorted((config_dir / "collages").glob("*.occ")):
+        try:
+            with CollageStore(path) as store:
+                index.add_many(store.artists)
+        except (OSError, ValueError):
+            continue
+    for path in list_crates(config_dir):
+        try:
+            index.add_many(crate_artists(load_crate(path)), trusted=False)
+        except (OSError, ValueError):
+            continue
+    return index
+
+
+def load_artist_index(config_dir: Path) -> ArtistIndex:
+    """The persisted index, built on first use"""
+    path = Path(config_dir) / INDEX_FILE
+    if path.exists():
+        return ArtistIndex(path)
+    index = build_artist_index(config_dir)
+    index.save()
+    return index
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="orpheus artists", description="Local artist name index")
+    subparsers = parser.add_subparsers(dest="action", required=True)
+    subparsers.add_parser("rebuild", help="Rebuild the index from cached data, collages and crates")
+    lookup = subparsers.add_parser("lookup", help="Show how a name would be corrected")
+    lookup.add_argument("names", nargs="+")
+    args = parser.parse_args(argv)
+
+    from .core import OrpheusTools
+
+    tools = OrpheusTools()
+    if args.action == "rebuild":
+        index = build_artist_index(tools.config_dir)
+        index.save()
+        print(f"✅ Indexed {len(index)} artists")
+        return
+
+    index = load_artist_index(tools.config_dir)
+    for name in args.names:
+        known = index.lookup(name)
+        if known is None:
+            print(f"❓ {name}: not in the index")
+        elif known == name.strip():
+            print(f"✅ {name}")
+        else:
+            print(f"🔤 {name} -> {known}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Orpheus Collage Tools - Response Cache
+On-disk cache of parsed API responses, shared by interactive commands
+and the background watcher
+"""
+
+import os
+import json
+import time
+import hashlib
+import urllib.parse
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+from .metrics import CACHE_LOOKUPS
+
+
+def cache_key(action: str, **params) -> str:
+    """Stable key for an ajax.php call, e.g. ``artist?artistname=Nas``"""
+    return f"{action}?{urllib.parse.urlencode(sorted((k, str(v)) for k, v in params.items()))}"
+
+
+class ResponseCache:
+    """JSON files under ``cache_dir``, one per key, stamped with their fetch time"""
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+
+    def _path(self, key: str) -> Path:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return self.cache_dir / digest[:2] / f"{digest}.json"
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, float]]:
+        """(value, stored_at) regardless of age, or None when never cached"""
+        try:
+            with open(self._path(key), "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry["value"], entry["stored_at"]
+
+    def get(self, key: str, max_age: float) -> Optional[Any]:
+        """Cached value if it is younger than ``max_age`` seconds"""
+        entry = self.get_entry(key)
+        if entry is None or time.time() - entry[1] > max_age:
+            CACHE_LOOKUPS.inc(result="miss")
+            return None
+        CACHE_LOOKUPS.inc(result="hit")
+        return entry[0]
+
+    def put(self, key: str, value: Any):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"key": key, "stored_at": time.time(), "value": value}, f)
+        os.replace(tmp_path, path)
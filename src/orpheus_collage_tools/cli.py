@@ -6,63 +6,155 @@ Main entry point for the Orpheus Collage Tools package
 
 import sys
 import platform
-from pathlib import Path
+from typing import List, Optional
 
-def main():
-    """Main entry point that delegates to platform-specific implementations"""
-    system = platform.system().lower()
+SUPPORTED_PLATFORMS = ("darwin", "windows", "linux")
 
-    if system == "darwin":  # macOS
-        # Use the existing bash script for macOS
-        script_dir = Path(__file__).parent
-        bash_script = script_dir / "scripts" / "macos" / "collage_tools.sh"
+# `orpheus crate <action>` -> download_crate.py flag
+CRATE_ACTIONS = {
+    "list": "--list-crates",
+    "create": "--create-crate",
+    "download": "--download-crate",
+}
 
-        if not bash_script.exists():
-            print("❌ macOS script not found!")
-            sys.exit(1)
 
-        # Execute the bash script
-        import subprocess
-        result = subprocess.run([str(bash_script)] + sys.argv[1:])
-        sys.exit(result.returncode)
+def crate_args(args: List[str]) -> Optional[List[str]]:
+    """Translate `crate list|create|download ...` to the script's flags (raw flags pass through)
 
-    elif system in ["windows", "linux"]:
-        # Use Python implementation for Windows/Linux
-        from orpheus_collage_tools.core import OrpheusTools
+    None means the arguments name no action, and the crate usage should be shown.
+    """
+    if not args:
+        return None
+    if args[0].startswith("--"):
+        return args
+    action = CRATE_ACTIONS.get(args[0])
+    if action is None or (args[0] != "list" and len(args) < 2):
+        return None
+    return [action] + args[1:]
 
-        tools = OrpheusTools()
 
-        # Setup configuration if needed
-        if not tools.config_file.exists():
-            if not tools.setup_config():
-                print("❌ Configuration setup failed!")
-                sys.exit(1)
+def quick_search_args(args: List[str]) -> List[str]:
+    """`quick-search --artist A --album B` as find_album_collages.py arguments"""
+    forwarded = []
+    for flag in ("--artist", "--album"):
+        if flag in args[:-1]:
+            value = args[args.index(flag) + 1]
+            if value:
+                forwarded += [flag, value]
+    return forwarded
 
-        # Check command line arguments
-        if len(sys.argv) == 1:
-            # No arguments - run interactive mode
-            tools.run_interactive_menu()
-            return
 
-        # Parse command line arguments
-        command = sys.argv[1]
-        args = sys.argv[2:]
-
-        if command == "find-album":
-            tools.run_command("find_album_collages", *args)
-        elif command == "find-artist-collages":
-            tools.run_command("search_artist_collages", *args)
-        elif command == "download":
-            tools.run_command("download_collage_torrents", *args)
-        elif command == "crate":
-            tools.run_command("download_crate", *args)
-        else:
-            tools.show_help()
+def dispatch(tools, argv: List[str]):
+    """Run the command named by ``argv`` (interactive mode when empty)"""
+    # No arguments - run interactive mode
+    if not argv:
+        tools.run_interactive_menu()
+        return
+
+    command = argv[0]
+    args = argv[1:]
 
+    if command == "find-album" and any(arg.startswith(("--format", "--artists-file")) for arg in args):
+        from orpheus_collage_tools.listing import find_album_main
+        find_album_main(args)
+    elif command == "find-album":
+        tools.run_command("find_album_collages", *args)
+    elif command == "quick-search":
+        forwarded = quick_search_args(args)
+        if not forwarded:
+            print("Usage: orpheus quick-search --artist 'Name' --album 'Name'")
+            sys.exit(1)
+        print("🔍 Quick search for collages...")
+        tools.run_command("find_album_collages", *forwarded)
+    elif command == "find-artist-collages":
+        if not args:
+            print("❌ Artist name is required!")
+            print("Usage: orpheus find-artist-collages 'Artist Name'")
+            sys.exit(1)
+        tools.run_command("search_artist_collages", *args)
+    elif command == "download":
+        if not any(arg.startswith("--prefer-") for arg in args):
+            print("❌ ERROR: --prefer option is MANDATORY!")
+            print()
+            print("Required encoding preference:")
+            print("  --prefer-320    # MP3 320 CBR")
+            print("  --prefer-v0     # MP3 V0 VBR")
+            print("  --prefer-flac   # FLAC Lossless")
+            print()
+            print("Example: orpheus download 6936 --prefer-320")
+            sys.exit(1)
+        tools.run_command("download_collage_torrents", *args)
+    elif command == "crate" and args[:1] == ["coverage"]:
+        from orpheus_collage_tools.coverage import main as coverage_main
+        coverage_main(args[1:])
+    elif command == "crate":
+        translated = crate_args(args)
+        if translated is None:
+            print("📦 Crate Commands:")
+            print("  orpheus crate list             # List all crates")
+            print("  orpheus crate create <n>       # Create new crate")
+            print("  orpheus crate download <n>     # Download crate")
+            print("  orpheus crate coverage <n>     # What local downloads and collages cover")
+            return
+        tools.run_command("download_crate", *translated)
+    elif command == "sync":
+        from orpheus_collage_tools.sync import main as sync_main
+        sync_main(args)
+    elif command == "collage" and args[:1] == ["list"]:
+        from orpheus_collage_tools.listing import collage_list_main
+        collage_list_main(args[1:])
+    elif command == "collage" and args[:1] == ["query"]:
+        from orpheus_collage_tools.collage_store import main as collage_query_main
+        collage_query_main(args[1:])
+    elif command == "plan":
+        from orpheus_collage_tools.planner import main as plan_main
+        plan_main(args)
+    elif command == "related":
+        from orpheus_collage_tools.similarity import main as related_main
+        related_main(args)
+    elif command == "artists":
+        from orpheus_collage_tools.artist_index import main as artists_main
+        artists_main(args)
+    elif command == "watch":
+        from orpheus_collage_tools.watch import main as watch_main
+        watch_main(args)
     else:
+        tools.show_help()
+
+
+def main(argv: Optional[List[str]] = None, system: Optional[str] = None):
+    """Main entry point; every platform runs the same in-process Python engine
+
+    ``argv`` and ``system`` default to the real command line and platform and
+    can be passed in to exercise another platform's path.
+    """
+    argv = sys.argv[1:] if argv is None else list(argv)
+    system = (system or platform.system()).lower()
+
+    if system not in SUPPORTED_PLATFORMS:
         print(f"❌ Unsupported platform: {system}")
         print("Supported platforms: macOS, Windows, Linux")
         sys.exit(1)
 
+    from orpheus_collage_tools.core import OrpheusTools
+
+    tools = OrpheusTools(system=system)
+
+    # Setup configuration if needed
+    if not tools.config_file.exists():
+        if not tools.setup_config():
+            print("❌ Configuration setup failed!")
+            sys.exit(1)
+    elif not tools.check_config():
+        sys.exit(1)
+
+    try:
+        dispatch(tools, argv)
+    finally:
+        # In-process commands count requests and downloads too; export once they finish
+        from orpheus_collage_tools.metrics import export_if_configured
+        export_if_configured(tools.load_config())
+
+
 if __name__ == "__main__":
     main()
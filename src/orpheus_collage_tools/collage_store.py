@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Orpheus Collage Tools - Columnar Collage Store
+Collage contents as fixed-width columns plus a string table in one file,
+memory-mapped for queries so large collages never become nested dicts
+"""
+
+import sys
+import json
+import mmap
+import struct
+from array import array
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+if TYPE_CHECKING:
+    from .api import OrpheusAPI
+
+MAGIC = b"OCCS0001"
+ALIGN = 8
+
+# name -> array typecode; one row per torrent
+COLUMNS = (
+    ("group_id", "I"),
+    ("torrent_id", "I"),
+    ("size", "Q"),
+    ("seeders", "I"),
+    ("year", "H"),
+    ("format", "B"),
+    ("encoding", "B"),
+    ("media", "B"),
+    ("name", "I"),      # index into the string table
+    ("artist", "I"),    # index into the string table
+)
+CODED = ("format", "encoding", "media")
+
+
+def _aligned(n: int) -> int:
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def store_path(config_dir: Path, collage_id: int) -> Path:
+    return Path(config_dir) / "collages" / f"collage_{collage_id}.occ"
+
+
+def group_artist(group: Dict) -> str:
+    """Display artist of an ``action=collage`` group"""
+    artists = (group.get("musicInfo") or {}).get("artists") or []
+    if not artists or len(artists) > 2:
+        return "Various Artists"
+    return " & ".join(a.get("name", "") for a in artists)
+
+
+class CollageStoreWriter:
+    """Builds a store from ``action=collage`` torrent groups added in batches
+
+    Only the compact columns are kept, so groups can be streamed in and
+    dropped as they arrive.
+    """
+
+    def __init__(self):
+        self.columns = {column: array(typecode) for column, typecode in COLUMNS}
+        self.codes: Dict[str, Dict[str, int]] = {column: {} for column in CODED}
+        self.strings: Dict[str, int] = {}
+        self.artists: Dict[str, None] = {}
+
+    def _intern(self, text: str) -> int:
+        return self.strings.setdefault(text, len(self.strings))
+
+    def _code(self, column: str, text: str) -> int:
+        table = self.codes[column]
+        if text not in table:
+            if len(table) >= 255:
+                raise ValueError(f"Too many distinct {column} values")
+            table[text] = len(table)
+        return table[text]
+
+    def add(self, groups: Iterable[Dict]):
+        columns = self.columns
+        for group in groups:
+            group_id = int(group.get("id") or 0)
+            name_index = self._intern(group.get("name") or "")
+            artist_index = self._intern(group_artist(group))
+            for artist in (group.get("musicInfo") or {}).get("artists") or []:
+                if artist.get("name"):
+                    self.artists.setdefault(artist["name"])
+            year = int(group.get("year") or 0)
+            for torrent in group.get("torrents") or []:
+                columns["group_id"].append(group_id)
+                columns["torrent_id"].append(int(torrent.get("torrentid") or torrent.get("id") or 0))
+                columns["size"].append(int(torrent.get("size") or 0))
+                columns["seeders"].append(int(torrent.get("seeders") or 0))
+                columns["year"].append(min(year, 65535))
+                columns["format"].append(self._code("format", torrent.get("format") or ""))
+                columns["encoding"].append(self._code("encoding", torrent.get("encoding") or ""))
+                columns["media"].append(self._code("media", torrent.get("media") or ""))
+                columns["name"].append(name_index)
+                columns["artist"].append(artist_index)
+
+    def write(self, path: Path, collage_id: int, name: str) -> int:
+        """Write the store file atomically; returns the number of rows"""
+        columns = self.columns
+        encoded = [text.encode("utf-8") for text in self.strings]
+        offsets = array("Q", [0])
+        for blob in encoded:
+            offsets.append(offsets[-1] + len(blob))
+
+        # Block offsets are relative to the aligned end of the header
+        blocks = [(column, columns[column].tobytes()) for column, _ in COLUMNS]
+        blocks += [("string_offsets", offsets.tobytes()), ("string_data", b"".join(encoded))]
+        header = {
+            "collage_id": collage_id,
+            "name": name,
+            "rows": len(columns["group_id"]),
+            "strings": len(encoded),
+            "byteorder": sys.byteorder,
+            "codes": {column: sorted(table, key=table.get) for column, table in self.codes.items()},
+            # Individual credited artists, for the artist index
+            "artists": list(self.artists),
+            "blocks": {},
+        }
+        position = 0
+        for block, data in blocks:
+            header["blocks"][block] = [position, len(data)]
+            position += _aligned(len(data))
+        header_bytes = json.dumps(header).encode("utf-8")
+        data_start = _aligned(len(MAGIC) + 4 + len(header_bytes))
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes)
+            for block, data in blocks:
+                f.seek(data_start + header["blocks"][block][0])
+                f.write(data)
+            f.truncate(data_start + position)
+        tmp_path.replace(path)
+        return header["rows"]
+
+
+def write_collage_store(path: Path, collage_id: int, name: str, groups: Iterable[Dict]) -> int:
+    """Write ``action=collage`` torrent groups to ``path``"""
+    writer = CollageStoreWriter()
+    writer.add(groups)
+    return writer.write(path, collage_id, name)
+
+
+async def fetch_collage_store(api: "OrpheusAPI", path: Path, collage_id: int) -> int:
+    """Stream a collage from the tracker straight into a store file"""
+    writer = CollageStoreWriter()
+
+    async def add(groups):
+        writer.add(groups)
+
+    response = await api.ajax_stream("collage", "torrentgroups", add, id=collage_id)
+    return writer.write(path, collage_id, response.get("name", ""))
+
+
+class CollageStore:
+    """Read-only, memory-mapped view of a collage store file"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"Not a collage store: {path}")
+        (header_length,) = struct.unpack_from("<I", self._map, len(MAGIC))
+        start = len(MAGIC) + 4
+        self.header = json.loads(self._map[start:start + header_length])
+        self._data_start = _aligned(start + header_length)
+        if self.header["byteorder"] != sys.byteorder:
+            self.close()
+            raise ValueError("Collage store was written on a machine with a different byte order")
+        self.rows = self.header["rows"]
+        self.codes: Dict[str, List[str]] = self.header["codes"]
+        self._view = memoryview(self._map)
+        self._columns = {column: self._block(column, typecode) for column, typecode in COLUMNS}
+        self._string_offsets = self._block("string_offsets", "Q")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        for attribute in ("_columns", "_string_offsets", "_view"):
+            value = getattr(self, attribute, None)
+            if isinstance(value, dict):
+                for view in value.values():
+                    view.release()
+            elif isinstance(value, memoryview):
+                value.release()
+            setattr(self, attribute, None)
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    @property
+    def name(self) -> str:
+        return self.header["name"]
+
+    @property
+    def collage_id(self) -> int:
+        return self.header["collage_id"]
+
+    @property
+    def artists(self) -> List[str]:
+        """Every credited artist (stores written before this was recorded have none)"""
+        return self.header.get("artists") or []
+
+    def _block(self, block: str, typecode: str) -> memoryview:
+        offset, length = self.header["blocks"][block]
+        offset += self._data_start
+        return self._view[offset:offset + length].cast(typecode)
+
+    def column(self, column: str) -> memoryview:
+        """Zero-copy view of one column"""
+        return self._columns[column]
+
+    def string(self, index: int) -> str:
+        offset = self._data_start + self.header["blocks"]["string_data"][0]
+        start, end = self._string_offsets[index], self._string_offsets[index + 1]
+        return bytes(self._view[offset + start:offset + end]).decode("utf-8")
+
+    def group_ids(self) -> set:
+        return set(self._columns["group_id"])
+
+    def row(self, index: int) -> Dict:
+        row = {column: self._columns[column][index] for column, _ in COLUMNS}
+        for column in CODED:
+            row[column] = self.codes[column][row[column]]
+        row["name"] = self.string(row["name"])
+        row["artist"] = self.string(row["artist"])
+        return row
+
+    def _codes_for(self, column: str, values: Optional[Sequence[str]]) -> Optional[set]:
+        if values is None:
+            return None
+        if isinstance(values, str):
+            values = [values]
+        wanted = {value.lower() for value in values}
+        return {code for code, text in enumerate(self.codes[column]) if text.lower() in wanted}
+
+    def where(self, format: Optional[Sequence[str]] = None, encoding: Optional[Sequence[str]] = None,
+              media: Optional[Sequence[str]] = None, min_seeders: int = 0, max_size: Optional[int] = None) -> List[int]:
+        """Row indices matching every given filter, e.g. ``where(format="FLAC", min_seeders=5)``"""
+        filters = {column: self._codes_for(column, values)
+                   for column, values in (("format", format), ("encoding", encoding), ("media", media))}
+
+        if numpy is not None:
+            mask = numpy.ones(self.rows, dtype=bool)
+            for column, codes in filters.items():
+                if codes is not None:
+                    mask &= numpy.isin(numpy.frombuffer(self._columns[column], dtype=numpy.uint8), list(codes))
+            if min_seeders:
+                mask &= numpy.frombuffer(self._columns["seeders"], dtype=numpy.uint32) >= min_seeders
+            if max_size is not None:
+                mask &= numpy.frombuffer(self._columns["size"], dtype=numpy.uint64) <= max_size
+            return numpy.flatnonzero(mask).tolist()
+
+        selected = range(self.rows)
+        for column, codes in filters.items():
+            if codes is not None:
+                values = self._columns[column]
+                selected = [i for i in selected if values[i] in codes]
+        if min_seeders:
+            seeders = self._columns["seeders"]
+            selected = [i for i in selected if seeders[i] >= min_seeders]
+        if max_size is not None:
+            sizes = self._columns["size"]
+            selected = [i for i in selected if sizes[i] <= max_size]
+        return list(selected)
+
+    def best_per_group(self, rows: Iterable[int]) -> List[int]:
+        """Keep the best-seeded row for each group among ``rows``"""
+        group_ids = self._columns["group_id"]
+        seeders = self._columns["seeders"]
+        best: Dict[int, int] = {}
+        for i in rows:
+            current = best.get(group_ids[i])
+            if current is None or seeders[i] > seeders[current]:
+                best[group_ids[i]] = i
+        return sorted(best.values())
+
+
+def main(argv: Optional[List[str]] = None):
+    """Entry point for ``orpheus collage query``"""
+    import asyncio
+    import argparse
+
+    from .api import APIError, OrpheusAPI
+    from .core import OrpheusTools
+    from .discography import format_size
+
+    parser = argparse.ArgumentParser(prog="orpheus collage query",
+                                     description="Filter a collage's torrents from the local columnar store")
+    parser.add_argument("collage_id", type=int)
+    parser.add_argument("--format", action="append", help="e.g. FLAC, MP3 (repeatable)")
+    parser.add_argument("--encoding", action="append", help="e.g. Lossless, 320, 'V0 (VBR)' (repeatable)")
+    parser.add_argument("--media", action="append", help="e.g. CD, Vinyl, WEB (repeatable)")
+    parser.add_argument("--min-seeders", type=int, default=0)
+    parser.add_argument("--best", action="store_true", help="Only the best-seeded match per album")
+    parser.add_argument("--refresh", action="store_true", help="Rebuild the store from the tracker first")
+    args = parser.parse_args(argv)
+
+    tools = OrpheusTools()
+    path = store_path(tools.config_dir, args.collage_id)
+    if args.refresh or not path.exists():
+        config = tools.require_config()
+
+        async def fetch():
+            async with OrpheusAPI.from_config(config) as api:
+                await fetch_collage_store(api, path, args.collage_id)
+
+        try:
+            asyncio.run(fetch())
+        except (APIError, ValueError) as e:
+            print(f"❌ Could not fetch collage {args.collage_id}: {e}")
+            sys.exit(1)
+
+    with CollageStore(path) as store:
+        rows = store.where(args.format, args.encoding, args.media, args.min_seeders)
+        if args.best:
+            rows = store.best_per_group(rows)
+        print(f"📀 {store.name}: {len(rows)} of {store.rows} torrents match")
+        total = 0
+        for i in rows:
+            row = store.row(i)
+            total += row["size"]
+            print(f"   {row['artist']} - {row['name']} ({row['year']}) | {row['format']} {row['encoding']} "
+                  f"{row['media']} | {format_size(row['size'])} | {row['seeders']} seeders | ID {row['torrent_id']}")
+        print(f"📦 Total: {format_size(total)}")
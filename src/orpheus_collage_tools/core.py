@@ -14,13 +14,19 @@ import getpass
 import urllib.request
 import urllib.parse
 import http.cookiejar
+import time
 from typing import Optional, Dict, Any
 
+from .metrics import JOBS, JOB_DURATION, export_if_configured
+from .resilience import TRACKER_BREAKER, call_with_retry
+
 class OrpheusTools:
-    def __init__(self):
-        self.system = platform.system().lower()
+    def __init__(self, system: Optional[str] = None):
+        self.system = (system or platform.system()).lower()
         self.script_dir = Path(__file__).parent.parent
         self.lib_dir = self.script_dir / "lib"
+        # Overridable so setup can be pointed at a local stand-in tracker
+        self.base_url = os.environ.get("ORPHEUS_BASE_URL", "https://orpheus.network").rstrip("/")
 
         # Cross-platform config directory
         if self.system == "windows":
@@ -29,6 +35,11 @@ class OrpheusTools:
             self.config_dir = Path.home() / ".orpheus"
 
         self.config_file = self.config_dir / "config.json"
+        # Older macOS installs kept credentials in ~/.orpheus-config
+        legacy_config = Path.home() / ".orpheus-config" / "config.json"
+        if self.system != "windows" and not self.config_file.exists() and legacy_config.exists():
+            self.config_file = legacy_config
+        self.download_dir = Path.home() / "Documents" / "Orpheus"
 
         # Add lib directory to Python path
         sys.path.insert(0, str(self.lib_dir))
@@ -145,7 +156,7 @@ class OrpheusTools:
 
             # Create request
             req = urllib.request.Request(
-                'https://orpheus.network/login.php',
+                f'{self.base_url}/login.php',
                 data=data,
                 headers={
                     'User-Agent': 'Orpheus-CLI/1.0',
@@ -153,9 +164,12 @@ class OrpheusTools:
                 }
             )
 
-            # Make request
-            with opener.open(req) as response:
-                return response.getcode() in [200, 302, 303]
+            # Make request, retrying while the tracker is slow or overloaded
+            def login():
+                with opener.open(req, timeout=30) as response:
+                    return response.getcode()
+
+            return call_with_retry(login, breaker=TRACKER_BREAKER, endpoint="login") in [200, 302, 303]
 
         except Exception as e:
             print(f"❌ Credential validation error: {e}")
@@ -166,19 +180,23 @@ class OrpheusTools:
         try:
             # Create request
             req = urllib.request.Request(
-                'https://orpheus.network/ajax.php?action=collage&id=1',
+                f'{self.base_url}/ajax.php?action=collage&id=1',
                 headers={
                     'Authorization': f'token {api_key}',
                     'User-Agent': 'Orpheus-CLI/1.0'
                 }
             )
 
-            # Make request
-            with urllib.request.urlopen(req) as response:
-                if response.getcode() == 200:
-                    data = json.loads(response.read().decode('utf-8'))
-                    return data.get('status') == 'success'
-                return False
+            # Make request, retrying while the tracker is slow or overloaded
+            def fetch():
+                with urllib.request.urlopen(req, timeout=30) as response:
+                    return response.getcode(), response.read()
+
+            code, body = call_with_retry(fetch, breaker=TRACKER_BREAKER, endpoint="collage")
+            if code == 200:
+                data = json.loads(body.decode('utf-8'))
+                return data.get('status') == 'success'
+            return False
 
         except Exception as e:
             print(f"❌ API key validation error: {e}")
@@ -196,6 +214,28 @@ class OrpheusTools:
             print(f"❌ Error loading config: {e}")
             return None
 
+    def require_config(self) -> Dict[str, Any]:
+        """Configuration for a non-interactive command; exits with an error when there is none"""
+        config = self.load_config()
+        if not config:
+            print("❌ No configuration found. Run 'orpheus' once to set it up.", file=sys.stderr)
+            sys.exit(1)
+        return config
+
+    def check_config(self) -> bool:
+        """Verify the config file parses and has every required field"""
+        config = self.load_config()
+        if config is None:
+            print("❌ Invalid or incomplete configuration file")
+            print(f"Please delete {self.config_file} and run again to reconfigure")
+            return False
+        missing = [field for field in ('username', 'password', 'api_key') if not config.get(field)]
+        if missing:
+            print(f"❌ Config file missing required fields: {', '.join(missing)}")
+            print(f"Please delete {self.config_file} and run again to reconfigure")
+            return False
+        return True
+
     def run_interactive_menu(self):
         """Run the interactive menu system"""
         self.clear_screen()
@@ -410,6 +450,21 @@ class OrpheusTools:
             self.run_interactive_menu()
             return
 
+        budget = self._get_input("Size budget (e.g. 200GB, Enter for no limit): ").strip()
+
+        self._bump_watch("collage", collage_id)
+        if budget:
+            # Mix encodings per album to fit the budget; the plan is shown before anything is fetched
+            from .planner import main as plan_main
+            try:
+                plan_main(["collage", collage_id, "--budget", budget, "--prefer", prefer.split("-")[-1],
+                           "--download"])
+            except SystemExit:
+                pass
+            self._get_input("Press Enter to return to main menu...")
+            self.run_interactive_menu()
+            return
+
         print(f"\n⬇️ Starting download from collage ID: {collage_id}")
         print(f"🎵 Preferred format: {format_name}")
         print()
@@ -477,11 +532,21 @@ class OrpheusTools:
             self.run_interactive_menu()
             return
 
+        self._bump_watch("crate", crate_name)
         print("🔍 Searching with crate functionality...")
         self.run_command("find_album_collages", "--artist", artist, "--interactive")
         self._get_input("Press Enter to return to main menu...")
         self.run_interactive_menu()
 
+    def _bump_watch(self, kind: str, target: str):
+        """Let the background watcher refresh what the user is looking at first"""
+        from .watch import WatchScheduler
+
+        try:
+            WatchScheduler(self.config_dir / "watch.json").request_refresh(kind, target)
+        except (OSError, ValueError):
+            pass
+
     def run_command(self, command: str, *args):
         """Run a Python script from the lib directory"""
         script_path = self.lib_dir / f"{command}.py"
@@ -492,12 +557,21 @@ class OrpheusTools:
         # Build command arguments
         cmd_args = [sys.executable, str(script_path)] + list(args)
 
+        status = "error"
+        start = time.monotonic()
         try:
-            subprocess.run(cmd_args)
+            result = subprocess.run(cmd_args)
+            # argparse exits with 2 on bad arguments: the job never ran
+            status = {0: "success", 2: "usage_error"}.get(result.returncode, "failed")
         except KeyboardInterrupt:
+            status = "cancelled"
             print("\n❌ Command cancelled by user")
         except Exception as e:
             print(f"❌ Error running command: {e}")
+        finally:
+            JOBS.inc(command=command, status=status)
+            JOB_DURATION.observe(time.monotonic() - start, command=command)
+            export_if_configured(self.load_config())
 
     def show_help(self):
         """Show help information"""
@@ -508,7 +582,18 @@ class OrpheusTools:
         print("  orpheus                    # Interactive mode")
         print("  orpheus find-album --artist 'Name'")
         print("  orpheus find-artist-collages 'Artist'")
+        print("  orpheus quick-search --artist 'Name' --album 'Name'")
         print("  orpheus download <id> --prefer-320")
+        print("  orpheus sync <id> --prefer-320       # Only what's new since last sync")
+        print("  orpheus find-album --artist 'Name' --all --format ndjson")
+        print("  orpheus collage list <id> --format ndjson")
+        print("  orpheus find-album --artists-file artists.txt --format ndjson")
+        print("  orpheus artists lookup 'Name'          # How a name will be corrected offline")
+        print("  orpheus collage query <id> --format FLAC --min-seeders 5")
+        print("  orpheus related <id>                   # Similar collages from the local stores")
+        print("  orpheus plan collage <id> --budget 300GB   # Best mix of torrents within a size budget")
         print("  orpheus crate list")
+        print("  orpheus crate coverage 'Name'          # Covered albums and gap-filling collages")
+        print("  orpheus watch add collage <id> --every 6h")
         print()
         print("For more help, run without arguments for interactive mode")
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Orpheus Collage Tools - Crate Coverage
+Which crate albums are already downloaded or in a locally stored collage,
+and which collages would fill the most gaps, answered with set operations
+over local indexes instead of per-album lookups
+"""
+
+import sys
+import json
+import asyncio
+import argparse
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from .artist_index import ArtistIndex, load_artist_index
+from .cache import ResponseCache, cache_key
+from .crates import CrateMatches, artist_key, find_crate, load_crate, match_album, resolve_crate
+from .discography import format_size
+from .similarity import SimilarityIndex
+from .sinks import DownloadLedger
+from .sync import SyncState
+from .workers import compact_artist
+
+DEFAULT_COLLAGES = 5
+
+
+class Coverage(NamedTuple):
+    entries: List[Tuple[Dict, Optional[int]]]    # (crate entry, group ID or None when unresolved)
+    downloaded: Set[int]
+    collages: Dict[int, Tuple[str, Set[int]]]    # collage ID -> (name, crate groups it holds)
+    torrents: Dict[int, List]                    # group ID -> preferred torrent from the match cache
+
+    @property
+    def groups(self) -> Set[int]:
+        return {group_id for _entry, group_id in self.entries if group_id}
+
+    @property
+    def gaps(self) -> Set[int]:
+        return self.groups - self.downloaded
+
+    @property
+    def in_collages(self) -> Set[int]:
+        return set().union(*(groups for _name, groups in self.collages.values()))
+
+
+def resolve_offline(config_dir: Path, crate: Dict, index: Optional[ArtistIndex] = None,
+                    matches: Optional[CrateMatches] = None) -> List[Tuple[Dict, Optional[int]]]:
+    """(entry, group ID or None) for every crate album, from local data only
+
+    Matches from earlier crate runs come first, then cached discographies,
+    whatever their age, since a release group's ID does not change. Entries
+    whose artist was never looked up stay unresolved.
+    """
+    cache = ResponseCache(Path(config_dir) / "cache")
+    discographies: Dict[str, Optional[list]] = {}
+    resolved = []
+    for entry in crate.get("albums", []):
+        match = matches.lookup(entry) if matches is not None else None
+        if match is not None and match["group"]:
+            resolved.append((entry, match["group"][0]))
+            continue
+        group_id = int(entry["group_id"]) if entry.get("group_id") else None
+        artist = (entry.get("artist") or "").strip()
+        if group_id is None and artist and entry.get("album"):
+            key = artist_key(artist)
+            if key not in discographies:
+                # Like the online lookup: the name as given first, then the index's spelling
+                cached = cache.get_entry(cache_key("artist", artistname=artist))
+                if cached is None and index is not None:
+                    known = index.correct(artist, quiet=True)
+                    if known != artist:
+                        cached = cache.get_entry(cache_key("artist", artistname=known))
+                discographies[key] = compact_artist(cached[0])[1] if cached else None
+            groups = discographies[key]
+            group = match_album(groups, entry["album"], entry.get("year")) if groups else None
+            group_id = group[0] if group else None
+        resolved.append((entry, group_id))
+    return resolved
+
+
+def downloaded_groups(config_dir: Path) -> Set[int]:
+    """Groups handed to a sink (download ledger) or downloaded by collage sync"""
+    config_dir = Path(config_dir)
+    groups = DownloadLedger(config_dir / "downloads.jsonl").group_ids()
+    for path in (config_dir / "sync").glob("collage_*.json"):
+        try:
+            with open(path, "r") as f:
+                groups.update(int(group_id) for group_id in json.load(f).get("downloads", {}))
+        except (OSError, ValueError):
+            continue
+    return groups
+
+
+def collage_groups(config_dir: Path, group_ids: Set[int]) -> Dict[int, Tuple[str, Set[int]]]:
+    """Collage ID -> (name, which of ``group_ids`` it holds), over stored and synced collages"""
+    config_dir = Path(config_dir)
+    index = SimilarityIndex(config_dir)
+    index.update()
+    collages = {}
+    for position, shared in index.containing(group_ids).items():
+        collage_id, name, _groups, _mtime = index.collages[position]
+        collages[collage_id] = (name, shared)
+    # Synced collages without a store still know their groups
+    for path in (config_dir / "sync").glob("collage_*.json"):
+        try:
+            collage_id = int(path.stem.rsplit("_", 1)[-1])
+            state = SyncState.load(config_dir / "sync", collage_id)
+        except (OSError, ValueError):
+            continue
+        shared = state.groups & group_ids
+        if shared and collage_id not in collages:
+            collages[collage_id] = (state.name, shared)
+    return collages
+
+
+def crate_coverage(config_dir: Path, entries: List[Tuple[Dict, Optional[int]]],
+                   matches: Optional[CrateMatches] = None) -> Coverage:
+    groups = {group_id for _entry, group_id in entries if group_id}
+    torrents = {}
+    if matches is not None:
+        for entry, group_id in entries:
+            match = matches.lookup(entry)
+            if group_id and match is not None and match.get("torrent"):
+                torrents[group_id] = match["torrent"]
+    return Coverage(entries, downloaded_groups(config_dir) & groups, collage_groups(config_dir, groups), torrents)
+
+
+def fill_order(coverage: Coverage, limit: int = DEFAULT_COLLAGES) -> List[Tuple[int, str, Set[int]]]:
+    """Collages in the order that closes the most remaining gaps (greedy set cover)"""
+    remaining = set(coverage.gaps)
+    order = []
+    while remaining and len(order) < limit:
+        best = max(coverage.collages.items(), key=lambda item: (len(item[1][1] & remaining), -item[0]),
+                   default=None)
+        if best is None or not best[1][1] & remaining:
+            break
+        collage_id, (name, groups) = best
+        order.append((collage_id, name, groups & remaining))
+        remaining -= groups
+    return order
+
+
+def print_coverage(title: str, coverage: Coverage, limit: int = DEFAULT_COLLAGES, online: bool = False):
+    in_collages = coverage.in_collages
+    counts = {"downloaded": 0, "collage": 0, "missing": 0, "unresolved": 0}
+
+    print(f"\n📦 Coverage of {title} ({len(coverage.entries)} albums)")
+    print("=" * 60)
+    for entry, group_id in coverage.entries:
+        label = f"{entry.get('artist') or '?'} - {entry.get('album') or '?'}"
+        torrent = coverage.torrents.get(group_id)
+        if torrent and group_id not in coverage.downloaded:
+            _torrent_id, fmt, encoding, media, size, seeders = torrent
+            label += f" | {fmt} {encoding} {media} | {format_size(size)} | {seeders} seeders"
+        if group_id is None:
+            counts["unresolved"] += 1
+            print(f"   ❓ {label} ({'not found on the tracker' if online else 'not resolved offline'})")
+        elif group_id in coverage.downloaded:
+            counts["downloaded"] += 1
+            print(f"   ✅ {label}")
+        elif group_id in in_collages:
+            counts["collage"] += 1
+            holders = sum(1 for _name, groups in coverage.collages.values() if group_id in groups)
+            print(f"   📚 {label} (in {holders} collage{'s' if holders != 1 else ''})")
+        else:
+            counts["missing"] += 1
+            print(f"   ❌ {label}")
+
+    print(f"\n📊 {counts['downloaded']} downloaded | {counts['collage']} in local collages | "
+          f"{counts['missing']} missing | {counts['unresolved']} unresolved")
+
+    order = fill_order(coverage, limit)
+    if order:
+        print("\n🧩 Collages that fill the most gaps:")
+        for i, (collage_id, name, filled) in enumerate(order, 1):
+            print(f"{i:2d}. {name or 'Collage'} (ID: {collage_id}) | +{len(filled)} album{'s' if len(filled) != 1 else ''}")
+    if counts["unresolved"] and not online:
+        print("\n💡 Use --online to look up unresolved albums on the tracker")
+
+
+def main(argv: Optional[List[str]] = None):
+    """Entry point for ``orpheus crate coverage``"""
+    from .api import APIError, OrpheusAPI
+    from .core import OrpheusTools
+
+    parser = argparse.ArgumentParser(prog="orpheus crate coverage",
+                                     description="Show which crate albums local downloads and collages already cover")
+    parser.add_argument("name", help="Crate name")
+    parser.add_argument("--collages", type=int, default=DEFAULT_COLLAGES, help="How many gap-filling collages to suggest")
+    parser.add_argument("--online", action="store_true", help="Look up albums not resolvable from the cache")
+    args = parser.parse_args(argv)
+
+    tools = OrpheusTools()
+    path = find_crate(tools.config_dir, args.name)
+    if path is None:
+        print(f"❌ Crate not found: {args.name}")
+        sys.exit(1)
+    crate = load_crate(path)
+    index = load_artist_index(tools.config_dir)
+    matches = CrateMatches.for_crate(tools.config_dir, path, crate)
+    entries = resolve_offline(tools.config_dir, crate, index, matches)
+
+    unresolved = [entry for entry, group_id in entries if group_id is None]
+    if args.online and unresolved:
+        config = tools.require_config()
+
+        async def lookup():
+            async with OrpheusAPI.from_config(config, cache=ResponseCache(tools.config_dir / "cache")) as api:
+                return await resolve_crate(api, {"albums": unresolved}, index, matches)
+
+        print(f"🔍 Looking up {len(unresolved)} album(s) on the tracker...")
+        try:
+            found = {id(entry): group[0] for entry, group in asyncio.run(lookup()) if group}
+        except APIError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        entries = [(entry, group_id or found.get(id(entry))) for entry, group_id in entries]
+    coverage = crate_coverage(tools.config_dir, entries, matches)
+    # Saved last: crate_coverage may re-record matches under new preferences
+    index.save()
+    matches.save()
+
+    print_coverage(crate.get("name") or args.name, coverage, args.collages, args.online)
+
+
+if __name__ == "__main__":
+    main()
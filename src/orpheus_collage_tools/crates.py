@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Orpheus Collage Tools - Crates
+Locating and reading crate files (JSON wishlists of artist/album entries)
+and resolving their entries to tracker release groups, with a per-crate
+cache of those matches
+"""
+
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .api import APIError, OrpheusAPI
+from .artist_index import ArtistIndex, normalize_artist
+from .discography import ARTIST_MAX_AGE, load_artist, load_group
+from .releases import PREFERENCES
+from .workers import CompactGroup, compact_artist, compact_group
+
+# Crates shipped with a source checkout
+BUNDLED_CRATES = Path(__file__).resolve().parents[2] / "resources" / "data" / "crates"
+
+# How long a crate entry's match is reused; entries not found are retried sooner
+MATCH_MAX_AGE = 7 * 86400
+MISS_MAX_AGE = ARTIST_MAX_AGE
+
+# (torrent_id, format, encoding, media, size, seeders)
+PreferredTorrent = Tuple[int, str, str, str, int, int]
+
+
+def crate_dirs(config_dir: Path) -> List[Path]:
+    """Directories searched for crates: the user's first, then bundled ones"""
+    return [d for d in (Path(config_dir) / "crates", BUNDLED_CRATES) if d.is_dir()]
+
+
+def list_crates(config_dir: Path) -> List[Path]:
+    seen = set()
+    crates = []
+    for directory in crate_dirs(config_dir):
+        for path in sorted(directory.glob("*.json")):
+            if path.stem not in seen:
+                seen.add(path.stem)
+                crates.append(path)
+    return crates
+
+
+def find_crate(config_dir: Path, name: str) -> Optional[Path]:
+    """Crate file by file name or by the ``name`` field inside it"""
+    wanted = name.strip().lower()
+    for path in list_crates(config_dir):
+        if path.stem.lower() == wanted:
+            return path
+    for path in list_crates(config_dir):
+        try:
+            if load_crate(path).get("name", "").strip().lower() == wanted:
+                return path
+        except (OSError, ValueError):
+            continue
+    return None
+
+
+def load_crate(path: Path) -> Dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def artist_key(name: str) -> str:
+    """Key under which spellings of the same artist name are merged
+
+    The artist index's ``normalize_artist``, so crates group artists exactly
+    as the index does; names that are all punctuation keep their own key.
+    """
+    return normalize_artist(name) or " ".join(name.casefold().split())
+
+
+def crate_artists(crate: Dict) -> List[str]:
+    """Distinct artist names in a crate, in first-seen order"""
+    seen = set()
+    artists = []
+    for album in crate.get("albums", []):
+        artist = (album.get("artist") or "").strip()
+        if artist and artist_key(artist) not in seen:
+            seen.add(artist_key(artist))
+            artists.append(artist)
+    return artists
+
+
+def _album_key(name: str) -> str:
+    return re.sub(r"[^\w]+", "", name.casefold())
+
+
+def match_album(groups: List[CompactGroup], album: str, year: Optional[int] = None) -> Optional[CompactGroup]:
+    """The group an ``album`` title refers to: exact title first, then a containing one"""
+    wanted = _album_key(album)
+    if not wanted:
+        return None
+    exact = [g for g in groups if _album_key(g[1]) == wanted]
+    candidates = exact or [g for g in groups if wanted in _album_key(g[1])]
+    if not candidates:
+        return None
+    # Prefer the stated year, then the original (earliest) group
+    return min(candidates, key=lambda g: (year is not None and g[2] != year, g[2] or 9999))
+
+
+def preference_hash(crate: Dict) -> str:
+    """Fingerprint of a crate's ``preferences``, stored with each match"""
+    preferences = json.dumps(crate.get("preferences") or {}, sort_keys=True).lower()
+    return hashlib.sha1(preferences.encode("utf-8")).hexdigest()[:12]
+
+
+def entry_key(entry: Dict) -> str:
+    """Stable key of a crate entry: its group ID, else artist, album and year"""
+    if entry.get("group_id"):
+        return f"group:{int(entry['group_id'])}"
+    return f"{artist_key(entry.get('artist') or '')}|{_album_key(entry.get('album') or '')}|{entry.get('year') or ''}"
+
+
+def preferred_torrent(group: CompactGroup, preferences: Dict) -> Optional[PreferredTorrent]:
+    """The torrent of ``group`` that best fits a crate's preferences
+
+    The encoding preference is a filter, as in ``select_torrent``; then live
+    torrents, the preferred media, the closer encoding and more seeders win.
+    """
+    accepted = PREFERENCES.get(str(preferences.get("encoding") or "").lower())
+    media = str(preferences.get("media") or "").lower()
+    best, best_rank = None, None
+    for _year, _title, _label, _catalog, release_media, torrents in group[4]:
+        for torrent_id, fmt, encoding, size, seeders in torrents:
+            if accepted is not None and (fmt, encoding) not in accepted:
+                continue
+            rank = (seeders > 0, not media or release_media.lower() == media,
+                    -accepted.index((fmt, encoding)) if accepted else 0, seeders)
+            if best_rank is None or rank > best_rank:
+                best, best_rank = (torrent_id, fmt, encoding, release_media, size, seeders), rank
+    return best
+
+
+class CrateMatches:
+    """Resolved group and preferred torrent per crate entry, kept between runs
+
+    One JSON file per crate file under ``crate_matches/``. A match is reused until
+    it expires; when the crate's preferences change, the stored group is
+    re-evaluated locally instead of being looked up again.
+    """
+
+    def __init__(self, path: Path, crate: Dict, max_age: Optional[float] = None):
+        self.path = Path(path)
+        self.preferences = crate.get("preferences") or {}
+        self.preference_hash = preference_hash(crate)
+        self.max_age = MATCH_MAX_AGE if max_age is None else max_age
+        self.dirty = False
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f).get("entries") or {}
+        except (OSError, ValueError):
+            pass
+
+    @classmethod
+    def for_crate(cls, config_dir: Path, crate_path: Path, crate: Dict, **kwargs) -> "CrateMatches":
+        """Matches of the crate read from ``crate_path``, filed under a hash of that path"""
+        digest = hashlib.sha1(str(Path(crate_path).resolve()).encode("utf-8")).hexdigest()[:12]
+        name = re.sub(r"[^\w\-]+", "_", Path(crate_path).stem).strip("_") or "crate"
+        return cls(Path(config_dir) / "crate_matches" / f"{name}-{digest}.json", crate, **kwargs)
+
+    def lookup(self, entry: Dict) -> Optional[Dict[str, Any]]:
+        """The stored match of ``entry`` (its ``group`` may be None), or None when it must be resolved"""
+        match = self.entries.get(entry_key(entry))
+        if match is None:
+            return None
+        max_age = self.max_age if match.get("group") else min(self.max_age, MISS_MAX_AGE)
+        if time.time() - match.get("at", 0) > max_age:
+            return None
+        if match.get("preferences") != self.preference_hash:
+            # New preferences: the group still stands, only the torrent choice changes
+            self.record(entry, match["group"], at=match.get("at"))
+            match = self.entries[entry_key(entry)]
+        return match
+
+    def record(self, entry: Dict, group: Optional[CompactGroup], at: Optional[float] = None):
+        self.entries[entry_key(entry)] = {
+            "group": group,
+            "torrent": preferred_torrent(group, self.preferences) if group else None,
+            "preferences": self.preference_hash,
+            "at": time.time() if at is None else at,
+        }
+        self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"entries": self.entries}, f)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+
+async def resolve_crate(api: OrpheusAPI, crate: Dict,
+                        index: Optional[ArtistIndex] = None,
+                        matches: Optional[CrateMatches] = None) -> List[Tuple[Dict, Optional[CompactGroup]]]:
+    """(entry, group or None) for every album in a crate, in crate order
+
+    Entries are grouped by artist so each artist's discography is fetched
+    once and all of their albums are matched against it locally; entries
+    with a ``group_id`` are looked up directly. With an ``index``, artist
+    names the tracker does not know are retried with the index's spelling.
+    With ``matches``, entries matched on an earlier run are not looked up
+    again, and new results are recorded there (the caller saves them).
+    Discographies and groups seen before come from the cache whatever
+    their age and are refreshed in the background when old.
+    """
+    entries = crate.get("albums", [])
+    resolved: List[Optional[CompactGroup]] = [None] * len(entries)
+    names: Dict[str, str] = {}
+    by_artist: Dict[str, List[int]] = {}
+    by_group: Dict[int, List[int]] = {}
+    for position, entry in enumerate(entries):
+        match = matches.lookup(entry) if matches is not None else None
+        if match is not None:
+            resolved[position] = match["group"]
+        elif entry.get("group_id"):
+            by_group.setdefault(int(entry["group_id"]), []).append(position)
+        elif (entry.get("artist") or "").strip() and entry.get("album"):
+            name = entry["artist"].strip()
+            names.setdefault(artist_key(name), name)
+            by_artist.setdefault(artist_key(name), []).append(position)
+
+    async def fetch(artistname: str) -> Dict[str, Any]:
+        return (await load_artist(api, artistname)).data
+
+    async def resolve_artist(name: str, positions: List[int]):
+        try:
+            response = await (index.fetch(name, fetch) if index is not None else fetch(name))
+        except APIError:
+            return
+        found, groups = compact_artist(response)
+        if index is not None:
+            index.add(found or name)
+        for position in positions:
+            resolved[position] = match_album(groups, entries[position]["album"], entries[position].get("year"))
+            if matches is not None:
+                matches.record(entries[position], resolved[position])
+
+    async def resolve_group(group_id: int, positions: List[int]):
+        try:
+            group = compact_group((await load_group(api, group_id)).data)
+        except APIError:
+            return
+        for position in positions:
+            resolved[position] = group
+            if matches is not None:
+                matches.record(entries[position], group)
+
+    await asyncio.gather(*(resolve_artist(names[key], positions) for key, positions in by_artist.items()),
+                         *(resolve_group(group_id, positions) for group_id, positions in by_group.items()))
+    return list(zip(entries, resolved))
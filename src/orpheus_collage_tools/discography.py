@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Orpheus Collage Tools - Discography Views
+Artist discographies and group details for browsing, served from the
+cache first (stale-while-revalidate) and rendered as release listings
+"""
+
+import sys
+import string
+from typing import Any, Callable, Dict, List, Optional
+
+from .api import APIError, CachedResponse, FailureStatus, OrpheusAPI
+from .cache import cache_key
+from .releases import RELEASE_TYPES
+from .workers import CompactGroup, ParsePool, compact_artist, parse_artist_response
+
+# How long cached data counts as fresh in interactive views
+ARTIST_MAX_AGE = 6 * 3600
+GROUP_MAX_AGE = 24 * 3600
+
+RefreshCallback = Callable[[Dict[str, Any], bool], None]
+
+
+async def load_artist(api: OrpheusAPI, artist: str, on_refresh: Optional[RefreshCallback] = None) -> CachedResponse:
+    """Artist discography, immediately from cache when we hold any copy"""
+    return await api.ajax_swr("artist", ARTIST_MAX_AGE, on_refresh, artistname=artist)
+
+
+async def load_group(api: OrpheusAPI, group_id: int, on_refresh: Optional[RefreshCallback] = None) -> CachedResponse:
+    """Torrent group details, immediately from cache when we hold any copy"""
+    return await api.ajax_swr("torrentgroup", GROUP_MAX_AGE, on_refresh, id=group_id)
+
+
+async def load_artist_groups(api: OrpheusAPI, pool: ParsePool, artist: str,
+                             on_refresh: Optional[RefreshCallback] = None) -> CachedResponse:
+    """(name, groups) of an artist's discography, from cache like ``load_artist``
+
+    On a miss the raw response is parsed, grouped and written to the cache
+    in the parse pool instead of on the event loop.
+    """
+    cached = api.swr_cached("artist", ARTIST_MAX_AGE, on_refresh, artistname=artist)
+    if cached is not None:
+        return CachedResponse(compact_artist(cached.data), cached.age, cached.stale)
+    raw = await api.ajax_raw("artist", artistname=artist)
+    cache_dir = str(api.cache.cache_dir) if api.cache is not None else None
+    try:
+        return CachedResponse(await pool.run(parse_artist_response, raw, cache_dir,
+                                             cache_key("artist", artistname=artist)))
+    except LookupError as e:
+        raise FailureStatus(str(e)) from e
+    except ValueError as e:
+        raise APIError(f"Invalid artist response: {e}") from e
+
+
+def refresh_notice(label: str) -> RefreshCallback:
+    """Callback that tells the user when a stale view has been refreshed"""
+    def notify(_data: Dict[str, Any], changed: bool):
+        # stderr, so listings piped as NDJSON stay clean
+        if changed:
+            print(f"\n🔄 {label} changed on the tracker since it was shown - reload to see the update", file=sys.stderr)
+        else:
+            print(f"\n✅ {label} is up to date", file=sys.stderr)
+    return notify
+
+
+def format_size(size: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size} B"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def format_group(index: int, artist: str, group: CompactGroup, marker: str = "") -> List[str]:
+    """Release listing for one group, using the a1/b2 download codes"""
+    group_id, name, year, release_type, releases = group
+    kind = RELEASE_TYPES.get(release_type, "Release")
+    lines = [f"{index}. {artist} - {name} ({year or '?'}) [{kind}]" + (f"  {marker}" if marker else "")]
+    lines.append(f"   Group ID: {group_id}")
+    for letter, release in zip(string.ascii_lowercase, releases):
+        r_year, title, label, catalog, media, torrents = release
+        details = " | ".join(str(part) for part in (r_year or "?", title, label, catalog, media) if part)
+        lines.append(f"   Release {letter.upper()}: {details}")
+        for number, (torrent_id, fmt, encoding, size, seeders) in enumerate(torrents, 1):
+            lines.append(f"     [{letter}{number}] {fmt} {encoding} | {format_size(size)} | {seeders} seeders")
+    return lines
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Orpheus Collage Tools - Streaming JSON
+Incremental parser that pulls the elements of one array (such as a
+collage's ``torrentgroups``) out of a JSON body while it is still arriving
+"""
+
+import re
+import json
+import codecs
+from typing import Any, Dict, List, Optional, Sequence
+
+# Characters that matter outside strings, and inside them
+STRUCTURAL = re.compile(r'[{}\[\]",:]')
+STRING_SPECIAL = re.compile(r'["\\]')
+NON_SPACE = re.compile(r"\S")
+# What may follow a complete number or literal inside an array
+SCALAR_END = frozenset(",] \t\r\n")
+
+DECODER = json.JSONDecoder()
+
+
+class JSONArrayStream:
+    """Feed a JSON document chunk by chunk; get the target array's elements as they complete
+
+    ``path`` names the array by object keys from the root, e.g.
+    ``("response", "torrentgroups")``. Each ``feed()`` returns the elements
+    finished by that chunk, parsed. Only the element being received is
+    buffered; everything outside the target array is kept in a skeleton
+    that ``finish()`` parses into ``document``, with the array left empty.
+    What precedes the array is available as ``head`` as soon as it opens.
+
+    The document around the array is tracked character by character, but
+    each element is handed whole to the C JSON decoder once it has arrived.
+    """
+
+    def __init__(self, path: Sequence[str]):
+        self.path = tuple(path)
+        self.count = 0
+        self.head: Optional[Dict[str, Any]] = None
+        self.document: Optional[Dict[str, Any]] = None
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        self._in_string = False
+        self._stack: List[str] = []
+        self._keys: List[Optional[str]] = []
+        self._key: Optional[str] = None
+        self._key_start: Optional[int] = None
+        self._expect_key = False
+        self._in_target = False
+        self._retry_at = 0
+        self._skeleton: List[str] = []
+        self._skeleton_from: Optional[int] = 0
+        self._final = False
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        self._buf += self._decoder.decode(chunk)
+        items: List[Any] = []
+        self._scan(items)
+        self._trim()
+        self.count += len(items)
+        return items
+
+    def _scan(self, items: List[Any]):
+        buf, pos = self._buf, self._pos
+        end = len(buf)
+        stack, keys = self._stack, self._keys
+
+        while pos < end:
+            if self._in_target:
+                match = NON_SPACE.search(buf, pos)
+                if match is None:
+                    pos = end
+                    break
+                i = match.start()
+                c = buf[i]
+                if c == ",":
+                    pos = i + 1
+                    continue
+                if c == "]":
+                    # Leaving the target array
+                    stack.pop()
+                    keys.pop()
+                    self._in_target = False
+                    self._expect_key = False
+                    self._skeleton_from = i
+                    pos = i + 1
+                    continue
+                pos = i
+                if end < self._retry_at:
+                    break
+                try:
+                    item, after = DECODER.raw_decode(buf, i)
+                except json.JSONDecodeError:
+                    # Not complete yet; wait until the buffered part has doubled
+                    self._retry_at = i + 2 * (end - i)
+                    break
+                if not isinstance(item, (dict, list, str)) and (after == end or buf[after] not in SCALAR_END):
+                    # A number is only complete once something ends it: "-2500." may still become "-2500.5"
+                    if self._final and after < end:
+                        raise ValueError(f"Invalid JSON near: {buf[i:after + 20]}")
+                    break
+                items.append(item)
+                self._retry_at = 0
+                pos = after
+                continue
+
+            if self._in_string:
+                match = STRING_SPECIAL.search(buf, pos)
+                if match is None:
+                    pos = end
+                    break
+                i = match.start()
+                if buf[i] == "\\":
+                    if i + 1 >= end:
+                        # Wait for the escaped character
+                        pos = i
+                        break
+                    pos = i + 2
+                    continue
+                self._in_string = False
+                pos = i + 1
+                if self._key_start is not None:
+                    self._key = json.loads(buf[self._key_start:pos])
+                    self._key_start = None
+                continue
+
+            match = STRUCTURAL.search(buf, pos)
+            if match is None:
+                pos = end
+                break
+            i = match.start()
+            c = buf[i]
+            pos = i + 1
+
+            if c == '"':
+                self._in_string = True
+                if self._expect_key:
+                    self._key_start = i
+            elif c == "{" or c == "[":
+                in_object = bool(stack) and stack[-1] == "{"
+                stack.append(c)
+                keys.append(self._key if in_object else None)
+                self._expect_key = c == "{"
+                if c == "[" and tuple(keys[1:]) == self.path:
+                    # Entering the target array: its elements bypass the skeleton
+                    self._skeleton.append(buf[self._skeleton_from:i + 1])
+                    self._skeleton_from = None
+                    self._in_target = True
+                    closers = "".join("]" if opened == "[" else "}" for opened in reversed(stack))
+                    self.head = json.loads("".join(self._skeleton) + closers)
+            elif c == "}" or c == "]":
+                if not stack:
+                    raise ValueError(f"Unbalanced JSON near: {buf[max(0, i - 20):i + 1]}")
+                stack.pop()
+                keys.pop()
+                self._expect_key = False
+            elif c == ",":
+                self._expect_key = bool(stack) and stack[-1] == "{"
+            elif c == ":":
+                self._expect_key = False
+
+        self._pos = pos
+
+    def _trim(self):
+        """Drop consumed text, keeping a key or element still in progress"""
+        keep = self._key_start if self._key_start is not None else self._pos
+        if self._skeleton_from is not None:
+            self._skeleton.append(self._buf[self._skeleton_from:keep])
+            self._skeleton_from = 0
+        self._buf = self._buf[keep:]
+        self._pos -= keep
+        if self._key_start is not None:
+            self._key_start -= keep
+        self._retry_at = max(0, self._retry_at - keep)
+
+    def finish(self) -> List[Any]:
+        """End of input: the last elements; the rest of the document is left in ``document``
+
+        Raises ValueError when the document was cut off.
+        """
+        self._buf += self._decoder.decode(b"", final=True)
+        self._retry_at = 0
+        self._final = True
+        items: List[Any] = []
+        self._scan(items)
+        if self._stack or self._in_string or self._in_target:
+            raise ValueError("JSON document ended early")
+        if self._skeleton_from is not None:
+            self._skeleton.append(self._buf[self._skeleton_from:])
+        self.document = json.loads("".join(self._skeleton))
+        self.count += len(items)
+        return items
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Orpheus Collage Tools - Streaming Listings
+Non-interactive find-album and collage listings built as async generator
+pipelines, so each release group is written as soon as it is resolved
+"""
+
+import os
+import sys
+import json
+import asyncio
+import argparse
+from typing import Any, AsyncIterator, Dict, List, Optional, TextIO, Tuple
+
+from .api import APIError, CachedResponse, OrpheusAPI, stale_marker
+from .artist_index import ArtistIndex, load_artist_index
+from .cache import ResponseCache
+from .collage_store import group_artist
+from .discography import format_group, load_artist_groups, refresh_notice
+from .parsing import parse_collage_list
+from .releases import RELEASE_TYPES, is_official
+from .workers import CompactGroup, ParsePool, compact_collage, pool_size
+
+DEFAULT_LIMIT = 10
+COLLAGE_LOOKUPS = 4
+BATCH_JOBS = 4
+
+
+class OutputClosed(Exception):
+    """The consumer closed our stdout (e.g. ``| head``); stop producing"""
+
+
+def group_record(artist: str, group: CompactGroup, **extra) -> Dict[str, Any]:
+    """JSON-friendly form of a compact group"""
+    group_id, name, year, release_type, releases = group
+    record = {
+        "artist": artist,
+        "group_id": group_id,
+        "name": name,
+        "year": year,
+        "release_type": RELEASE_TYPES.get(release_type, "Unknown"),
+        "releases": [
+            {
+                "year": r_year, "title": title, "label": label, "catalog": catalog, "media": media,
+                "torrents": [
+                    {"torrent_id": t_id, "format": fmt, "encoding": encoding, "size": size, "seeders": seeders}
+                    for t_id, fmt, encoding, size, seeders in torrents
+                ],
+            }
+            for r_year, title, label, catalog, media, torrents in releases
+        ],
+    }
+    record.update(extra)
+    return record
+
+
+class Output:
+    """Writes records as NDJSON or text, with progress on stderr"""
+
+    def __init__(self, fmt: str = "text", stream: Optional[TextIO] = None, progress: Optional[bool] = None):
+        self.fmt = fmt
+        self.stream = stream or sys.stdout
+        self.progress = sys.stderr.isatty() if progress is None else progress
+        self.count = 0
+
+    def write(self, record: Dict[str, Any], lines: Optional[List[str]] = None):
+        if self.fmt == "ndjson":
+            text = json.dumps(record, ensure_ascii=False) + "\n"
+        else:
+            text = "\n".join(lines or []) + "\n\n"
+        try:
+            self.stream.write(text)
+            self.stream.flush()
+        except BrokenPipeError:
+            # Point stdout at devnull so the interpreter's final flush stays quiet
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, self.stream.fileno())
+            raise OutputClosed()
+        self.count += 1
+
+    def report(self, count: int, done: bool = False):
+        if self.progress:
+            sys.stderr.write(f"\r🔍 {count} release group(s) written" + ("\n" if done else ""))
+            sys.stderr.flush()
+
+
+def sort_groups(groups: List[CompactGroup]) -> List[CompactGroup]:
+    """Official releases first, then chronological"""
+    return sorted(groups, key=lambda g: (not is_official(g[3]), g[2] or 9999, g[1].lower()))
+
+
+def select_groups(groups: List[CompactGroup], album: Optional[str], official_only: bool,
+                  limit: Optional[int]) -> List[CompactGroup]:
+    if album:
+        wanted = album.casefold()
+        groups = [g for g in groups if wanted in g[1].casefold()]
+    if official_only:
+        groups = [g for g in groups if is_official(g[3])]
+    groups = sort_groups(groups)
+    return groups[:limit] if limit else groups
+
+
+async def group_collages(api: OrpheusAPI, pool: ParsePool, group_id: int) -> List[Dict]:
+    """Collages containing a group, scraped from its torrent page"""
+    html = await api.page("torrents.php", id=group_id)
+    return await pool.run(parse_collage_list, html)
+
+
+async def resolve_groups(api: OrpheusAPI, pool: ParsePool, groups: List[CompactGroup],
+                         show_collages: bool) -> AsyncIterator[tuple]:
+    """Yield (group, collages) as each group finishes resolving"""
+    if not show_collages:
+        for group in groups:
+            yield group, None
+        return
+
+    semaphore = asyncio.Semaphore(COLLAGE_LOOKUPS)
+
+    async def resolve(group: CompactGroup):
+        async with semaphore:
+            try:
+                return group, await group_collages(api, pool, group[0])
+            except APIError:
+                return group, []
+
+    tasks = [asyncio.ensure_future(resolve(group)) for group in groups]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Reached when the consumer stops early: drop outstanding lookups
+        for task in tasks:
+            task.cancel()
+
+
+async def artist_records(api: OrpheusAPI, pool: ParsePool, artist: str, album: Optional[str] = None,
+                         official_only: bool = False, limit: Optional[int] = DEFAULT_LIMIT,
+                         show_collages: bool = False,
+                         index: Optional[ArtistIndex] = None) -> AsyncIterator[Tuple[str, CompactGroup, Dict]]:
+    """(artist, group, extra fields) for an artist's groups, yielded as they are resolved
+
+    With an ``index``, a name the tracker does not know is retried with the
+    index's spelling and names the tracker confirms are added to it.
+
+    A discography seen before is served from the cache whatever its age;
+    an old copy is marked stale and refreshed in the background, with a
+    notice on stderr once the tracker has answered.
+    """
+    async def fetch(artistname: str) -> CachedResponse:
+        return await load_artist_groups(api, pool, artistname, refresh_notice(f"Discography of {artistname}"))
+
+    cached = await (index.fetch(artist, fetch) if index is not None else fetch(artist))
+    name, groups = cached.data
+    if index is not None:
+        index.add(name or artist)
+    stale = {"stale": True, "cached_age": int(cached.age)} if cached.stale else {}
+    groups = select_groups(groups, album, official_only, limit)
+    async for group, collages in resolve_groups(api, pool, groups, show_collages):
+        extra = {"collages": collages} if collages is not None else {}
+        yield name or artist, group, dict(extra, **stale)
+
+
+async def batch_records(api: OrpheusAPI, pool: ParsePool, artists: List[str], jobs: int = BATCH_JOBS,
+                        **options) -> AsyncIterator[Tuple[str, CompactGroup, Dict]]:
+    """``artist_records`` for many artists at once, each artist's groups yielded together as it finishes"""
+    semaphore = asyncio.Semaphore(jobs)
+
+    async def lookup(artist: str):
+        async with semaphore:
+            try:
+                return artist, [item async for item in artist_records(api, pool, artist, **options)], None
+            except APIError as e:
+                return artist, [], e
+
+    tasks = [asyncio.ensure_future(lookup(artist)) for artist in artists]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            artist, items, error = await next_done
+            if error is not None:
+                print(f"❌ {artist}: {error}", file=sys.stderr)
+            elif not items:
+                print(f"📭 {artist}: no matching releases", file=sys.stderr)
+            for item in items:
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def read_artists(path: str) -> List[str]:
+    """Artist names from a file (``-`` for stdin), one per line; blanks and ``#`` comments skipped"""
+    if path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    artists = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#") and line not in artists:
+            artists.append(line)
+    return artists
+
+
+async def collage_records(api: OrpheusAPI, collage_id: int) -> AsyncIterator[Tuple[str, CompactGroup, Dict]]:
+    """(artist, group, extra fields) for every group in a collage, yielded as the response streams in"""
+    batches: asyncio.Queue = asyncio.Queue(maxsize=4)
+    head: Dict[str, Any] = {}
+    finished = object()
+
+    async def on_head(response: Dict[str, Any]):
+        head.update(response)
+
+    async def fetch():
+        try:
+            await api.ajax_stream("collage", "torrentgroups", batches.put, on_head, id=collage_id)
+            await batches.put(finished)
+        except Exception as e:
+            await batches.put(e)
+
+    task = asyncio.ensure_future(fetch())
+    try:
+        while True:
+            batch = await batches.get()
+            if batch is finished:
+                return
+            if isinstance(batch, Exception):
+                raise batch
+            extra = {"collage_id": collage_id, "collage": head.get("name", "")}
+            _name, groups = compact_collage({"torrentgroups": batch})
+            for raw, group in zip(batch, groups):
+                yield group_artist(raw), group, extra
+    finally:
+        task.cancel()
+
+
+async def drain(items: AsyncIterator[Tuple[str, CompactGroup, Dict]], output: Output):
+    """Write items as they arrive; stop early if the consumer goes away"""
+    try:
+        async for artist, group, extra in items:
+            marker = stale_marker(extra["cached_age"]) if extra.get("stale") else ""
+            lines = format_group(output.count + 1, artist, group, marker)
+            for collage in extra.get("collages") or []:
+                lines.append(f"   📚 {collage['name']} (ID: {collage['collage_id']})")
+            output.write(group_record(artist, group, **extra), lines)
+            output.report(output.count)
+    except OutputClosed:
+        pass
+    finally:
+        await items.aclose()
+        output.report(output.count, done=True)
+
+
+def _load_config():
+    from .core import OrpheusTools
+
+    tools = OrpheusTools()
+    return tools, tools.require_config()
+
+
+def find_album_main(argv: Optional[List[str]] = None):
+    """Entry point for non-interactive ``orpheus find-album``"""
+    parser = argparse.ArgumentParser(prog="orpheus find-album", description="List an artist's release groups")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--artist")
+    source.add_argument("--artists-file", metavar="PATH", help="One artist per line ('-' reads stdin)")
+    parser.add_argument("--jobs", type=int, default=BATCH_JOBS, help="Artists looked up at once with --artists-file")
+    parser.add_argument("--album", help="Only groups whose name contains this")
+    parser.add_argument("--official-only", action="store_true", help="Skip compilations, bootlegs, mixtapes...")
+    parser.add_argument("--all", action="store_true", help="Every group instead of the first --limit")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT)
+    parser.add_argument("--show-collages", action="store_true", help="Also list collages containing each group")
+    parser.add_argument("--format", choices=("text", "ndjson"), default="text")
+    parser.add_argument("--no-correct", action="store_true", help="Never retry an unknown artist with a corrected spelling")
+    args = parser.parse_args(argv)
+
+    artists = None
+    if args.artists_file:
+        try:
+            artists = read_artists(args.artists_file)
+        except OSError as e:
+            print(f"❌ Could not read {args.artists_file}: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    tools, config = _load_config()
+    output = Output(args.format)
+    index = None if args.no_correct else load_artist_index(tools.config_dir)
+    options = dict(album=args.album, official_only=args.official_only,
+                   limit=None if args.all else args.limit, show_collages=args.show_collages, index=index)
+
+    async def run():
+        # One session (and one login) and one cache for every artist
+        async with OrpheusAPI.from_config(config, cache=ResponseCache(tools.config_dir / "cache")) as api, \
+                ParsePool(pool_size(config)) as pool:
+            if artists is not None:
+                records = batch_records(api, pool, artists, max(1, args.jobs), **options)
+            else:
+                records = artist_records(api, pool, args.artist, **options)
+            await drain(records, output)
+
+    try:
+        asyncio.run(run())
+    except APIError as e:
+        print(f"❌ {args.artist or args.artists_file}: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if index is not None:
+            index.save()
+    if output.count == 0:
+        sys.exit(1)
+
+
+def collage_list_main(argv: Optional[List[str]] = None):
+    """Entry point for ``orpheus collage list``"""
+    parser = argparse.ArgumentParser(prog="orpheus collage list", description="List a collage's release groups")
+    parser.add_argument("collage_id", type=int)
+    parser.add_argument("--format", choices=("text", "ndjson"), default="text")
+    args = parser.parse_args(argv)
+
+    tools, config = _load_config()
+    output = Output(args.format)
+
+    async def run():
+        async with OrpheusAPI.from_config(config, cache=ResponseCache(tools.config_dir / "cache")) as api:
+            await drain(collage_records(api, args.collage_id), output)
+
+    try:
+        asyncio.run(run())
+    except APIError as e:
+        print(f"❌ Collage {args.collage_id}: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Orpheus Collage Tools - Targeted HTML Parsing
+Parses only the page regions we use (torrent tables, group rows, collage
+lists) instead of building a soup tree for the whole page
+"""
+
+import re
+import sys
+import time
+import argparse
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+
+def _pick_parser() -> str:
+    """Prefer lxml when it is installed; fall back to the stdlib parser"""
+    try:
+        import lxml  # noqa: F401
+        return "lxml"
+    except ImportError:
+        return "html.parser"
+
+
+PARSER = _pick_parser()
+
+GROUP_LINK = re.compile(r"torrents\.php\?id=(\d+)")
+TORRENT_LINK = re.compile(r"torrentid=(\d+)")
+COLLAGE_LINK = re.compile(r"collages\.php\?id=(\d+)")
+ARTIST_LINK = re.compile(r"artist\.php\?id=(\d+)")
+YEAR = re.compile(r"\[(\d{4})\]")
+
+# Sample page in the tracker's markup, shipped with a source checkout
+SAMPLE_PAGES = Path(__file__).resolve().parents[2] / "resources" / "data" / "pages"
+
+SIZE_UNITS = {"B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3, "TB": 1024 ** 4}
+
+# Regions of the page we care about. The class is matched as a whole word
+# because a strainer sees the raw, space-separated attribute value.
+TORRENT_TABLES = SoupStrainer("table", attrs={"class": re.compile(r"\btorrent_table\b")})
+COLLAGE_TABLES = SoupStrainer("table", attrs={"class": re.compile(r"\bcollage_table\b")})
+GROUP_LINKS = SoupStrainer("a", href=GROUP_LINK)
+
+
+def parse_size(text: str) -> int:
+    """Convert a size like '562.0 MB' into bytes (0 when unparseable)"""
+    match = re.match(r"\s*([\d.,]+)\s*([KMGT]?B)\s*$", text or "", re.IGNORECASE)
+    if not match:
+        return 0
+    number = float(match.group(1).replace(",", ""))
+    return int(number * SIZE_UNITS[match.group(2).upper()])
+
+
+def _to_int(text: str) -> int:
+    digits = re.sub(r"[^\d]", "", text or "")
+    return int(digits) if digits else 0
+
+
+def _soup(html: str, strainer: SoupStrainer) -> BeautifulSoup:
+    return BeautifulSoup(html, PARSER, parse_only=strainer)
+
+
+def parse_torrent_groups(html: str) -> List[Dict]:
+    """Parse group and torrent rows from browse, artist and collage pages"""
+    groups: List[Dict] = []
+    by_id: Dict[int, Dict] = {}
+    edition = ""
+
+    for row in _soup(html, TORRENT_TABLES).find_all("tr"):
+        classes = row.get("class") or []
+
+        if "group" in classes:
+            link = row.find("a", href=GROUP_LINK)
+            if not link:
+                continue
+            group_id = int(GROUP_LINK.search(link["href"]).group(1))
+            artist_link = row.find("a", href=ARTIST_LINK)
+            year = YEAR.search(row.get_text(" ", strip=True))
+            group = {
+                "group_id": group_id,
+                "name": link.get_text(strip=True),
+                "artist": artist_link.get_text(strip=True) if artist_link else "",
+                "year": int(year.group(1)) if year else None,
+                "torrents": [],
+            }
+            by_id[group_id] = group
+            groups.append(group)
+            edition = ""
+
+        elif "group_torrent" in classes:
+            if "edition" in classes:
+                edition = row.get_text(" ", strip=True).lstrip("−- ")
+                continue
+            link = row.find("a", href=TORRENT_LINK)
+            group_match = link and GROUP_LINK.search(link["href"])
+            if not group_match:
+                continue
+            group = by_id.get(int(group_match.group(1)))
+            if group is None:
+                continue
+            cells = row.find_all("td")
+            # Trailing cells are: size, snatches, seeders, leechers
+            numbers = [cell.get_text(strip=True) for cell in cells[-4:]]
+            if len(numbers) < 4:
+                numbers = [""] * (4 - len(numbers)) + numbers
+            group["torrents"].append({
+                "torrent_id": int(TORRENT_LINK.search(link["href"]).group(1)),
+                "label": link.get_text(" ", strip=True),
+                "edition": edition,
+                "size": parse_size(numbers[0]),
+                "snatches": _to_int(numbers[1]),
+                "seeders": _to_int(numbers[2]),
+                "leechers": _to_int(numbers[3]),
+            })
+
+    return groups
+
+
+def parse_group_ids(html: str) -> List[int]:
+    """Group IDs linked from a page, in page order, without duplicates"""
+    seen = set()
+    ids = []
+    for link in _soup(html, GROUP_LINKS).find_all("a"):
+        match = GROUP_LINK.search(link["href"])
+        # Skip per-torrent links; they repeat the group of the row above
+        if not match or "torrentid=" in link["href"]:
+            continue
+        group_id = int(match.group(1))
+        if group_id not in seen:
+            seen.add(group_id)
+            ids.append(group_id)
+    return ids
+
+
+def parse_collage_list(html: str) -> List[Dict]:
+    """Parse collage search results and a group page's collage box"""
+    collages = []
+    for row in _soup(html, COLLAGE_TABLES).find_all("tr"):
+        link = row.find("a", href=COLLAGE_LINK)
+        if not link:
+            continue
+        cells = [cell.get_text(strip=True) for cell in row.find_all("td")]
+        counts = [_to_int(cell) for cell in cells if cell.replace(",", "").isdigit()]
+        collages.append({
+            "collage_id": int(COLLAGE_LINK.search(link["href"]).group(1)),
+            "name": link.get_text(strip=True),
+            "torrents": counts[0] if counts else None,
+        })
+    return collages
+
+
+def parse_page_count(html: str) -> int:
+    """Highest page number in a page's pagination links (1 if none)"""
+    pages = [int(n) for n in re.findall(r"[?&;]page=(\d+)", html)]
+    return max(pages, default=1)
+
+
+def benchmark(paths: List[Path], repeat: int = 5) -> List[Dict]:
+    """Time full-soup parsing against the targeted parsers on recorded pages"""
+    parsers: Dict[str, Callable[[str], object]] = {
+        "full_soup": lambda html: BeautifulSoup(html, PARSER),
+        "torrent_groups": parse_torrent_groups,
+        "group_ids": parse_group_ids,
+        "collage_list": parse_collage_list,
+    }
+    results = []
+    for path in paths:
+        html = Path(path).read_text(encoding="utf-8", errors="replace")
+        timings = {}
+        for name, parse in parsers.items():
+            start = time.perf_counter()
+            for _ in range(repeat):
+                parse(html)
+            timings[name] = (time.perf_counter() - start) / repeat
+        results.append({"file": str(path), "bytes": len(html), "seconds": timings})
+    return results
+
+
+def main(argv: Optional[List[str]] = None):
+    """Benchmark parsing on recorded pages: python -m orpheus_collage_tools.parsing page.html ..."""
+    parser = argparse.ArgumentParser(description="Benchmark targeted HTML parsing on recorded pages")
+    parser.add_argument("pages", nargs="*", help="Recorded HTML pages (default: the sample in resources/data/pages)")
+    parser.add_argument("--repeat", type=int, default=5, help="Parses per page (default: 5)")
+    args = parser.parse_args(argv)
+
+    paths = [Path(p) for p in args.pages]
+    if not paths:
+        paths = sorted(SAMPLE_PAGES.glob("*.html"))
+    if not paths:
+        print("❌ No recorded pages found; pass the pages to benchmark")
+        sys.exit(1)
+
+    print(f"🧪 Parser backend: {PARSER}")
+    for result in benchmark(paths, args.repeat):
+        seconds = result["seconds"]
+        full = seconds["full_soup"]
+        print(f"\n📄 {result['file']} ({result['bytes'] / 1024:.0f} KB)")
+        for name, elapsed in seconds.items():
+            speedup = f" ({full / elapsed:.1f}x)" if name != "full_soup" and elapsed else ""
+            print(f"   {name:<16} {elapsed * 1000:8.2f} ms{speedup}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Orpheus Collage Tools - Download Planner
+Picks one torrent per album for a crate or collage so that as many albums
+as possible fit a byte budget, favouring preferred and well-seeded torrents
+"""
+
+import sys
+import math
+import asyncio
+import argparse
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .api import APIError, OrpheusAPI
+from .artist_index import ArtistIndex, load_artist_index
+from .cache import ResponseCache
+from .collage_store import group_artist
+from .crates import CrateMatches, find_crate, load_crate, resolve_crate
+from .discography import format_size
+from .parsing import SIZE_UNITS
+from .sinks import DownloadLedger, SinkError, TorrentItem, make_sink
+from .sync import safe_name
+from .workers import CompactGroup, compact_collage
+
+# How well an encoding serves each preference (1.0 = exactly what was asked for)
+ENCODING_SCORES = {
+    "flac": {("FLAC", "Lossless"): 1.0, ("FLAC", "24bit Lossless"): 0.9,
+             ("MP3", "V0 (VBR)"): 0.5, ("MP3", "320"): 0.45},
+    "v0": {("MP3", "V0 (VBR)"): 1.0, ("MP3", "320"): 0.8, ("MP3", "V2 (VBR)"): 0.5,
+           ("FLAC", "Lossless"): 0.4},
+    "320": {("MP3", "320"): 1.0, ("MP3", "V0 (VBR)"): 0.85, ("MP3", "256"): 0.5,
+            ("FLAC", "Lossless"): 0.4},
+}
+OTHER_ENCODING_SCORE = 0.1
+MEDIA_BONUS = 1.15
+
+# Covering an album always outweighs upgrading the quality of another one
+COVERAGE_VALUE = 1.0
+
+
+class Option(NamedTuple):
+    torrent_id: int
+    format: str
+    encoding: str
+    media: str
+    size: int
+    seeders: int
+    score: float
+
+    @property
+    def value(self) -> float:
+        return COVERAGE_VALUE + self.score
+
+
+class Album(NamedTuple):
+    group_id: int
+    artist: str
+    name: str
+    year: int
+    options: List[Option]
+
+
+def parse_budget(text: str) -> int:
+    """Bytes from '300GB', '1.5 TB' or '800M'"""
+    text = text.strip().upper()
+    if text[-1:] in "KMGT":
+        text += "B"
+    number, unit = text.rstrip("KMGTB").strip(), text[len(text.rstrip("KMGTB")):]
+    try:
+        value = float(number.replace(",", "")) * SIZE_UNITS[unit or "B"]
+    except (KeyError, ValueError):
+        raise ValueError(f"Invalid size budget: {text}")
+    if value <= 0:
+        raise ValueError(f"Invalid size budget: {text}")
+    return int(value)
+
+
+def seeder_weight(seeders: int) -> float:
+    """0 for dead torrents, rising quickly to 1.0 from about 7 seeders"""
+    if seeders <= 0:
+        return 0.0
+    return min(1.0, 0.4 + 0.2 * math.log2(1 + seeders))
+
+
+def score_torrent(fmt: str, encoding: str, media: str, seeders: int, prefer: str,
+                  prefer_media: Optional[str] = None) -> float:
+    score = ENCODING_SCORES[prefer].get((fmt, encoding), OTHER_ENCODING_SCORE)
+    if prefer_media and media.lower() == prefer_media.lower():
+        score *= MEDIA_BONUS
+    return score * seeder_weight(seeders)
+
+
+def album_options(group: CompactGroup, prefer: str, prefer_media: Optional[str] = None,
+                  min_seeders: int = 1) -> List[Option]:
+    """Every usable torrent of a group, scored against the preferences"""
+    options = []
+    for _year, _title, _label, _catalog, media, torrents in group[4]:
+        for torrent_id, fmt, encoding, size, seeders in torrents:
+            if seeders < max(1, min_seeders) or size <= 0:
+                continue
+            options.append(Option(torrent_id, fmt, encoding, media, size, seeders,
+                                  score_torrent(fmt, encoding, media, seeders, prefer, prefer_media)))
+    return options
+
+
+def _hull(options: List[Option], base: Optional[Option] = None) -> List[Option]:
+    """Options on the upper convex hull of (size, value) above ``base``, smallest first
+
+    Anything below the hull is never the best use of its bytes, and what
+    remains has decreasing value per extra byte, which the greedy relies on.
+    """
+    start = (base.size, base.value, base) if base is not None else (0, 0.0, None)
+    hull: List[Tuple[int, float, Optional[Option]]] = [start]
+    for option in sorted(options, key=lambda o: (o.size, -o.value)):
+        if option.size <= start[0]:
+            continue
+        if option.value <= hull[-1][1]:
+            continue
+        while len(hull) >= 2:
+            (s1, v1, _), (s2, v2, _) = hull[-2], hull[-1]
+            # Drop the middle point when it lies on or below the line to the new one
+            if (v2 - v1) * (option.size - s1) <= (option.value - v1) * (s2 - s1):
+                hull.pop()
+            else:
+                break
+        hull.append((option.size, option.value, option))
+    return [option for _size, _value, option in hull[1:]]
+
+
+class Plan:
+    """Chosen torrent per album plus what could not be covered"""
+
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.chosen: Dict[int, Tuple[Album, Option]] = {}
+        self.unavailable: List[Album] = []
+        self.skipped: List[Album] = []
+
+    @property
+    def total(self) -> int:
+        return sum(option.size for _album, option in self.chosen.values())
+
+
+def plan_downloads(albums: List[Album], budget: int) -> Plan:
+    """Multiple-choice knapsack: at most one torrent per album within ``budget`` bytes
+
+    Coverage comes first: every album is admitted with its cheapest torrent,
+    smallest first, which fits the most albums. The leftover bytes then go
+    to upgrades, greedily by value per extra byte along each album's hull,
+    and a last pass spends what remains on the best single upgrade that fits.
+    """
+    plan = Plan(budget)
+    remaining = budget
+    available = []
+    for album in albums:
+        if album.options:
+            available.append((min(album.options, key=lambda o: (o.size, -o.value)), album))
+        else:
+            plan.unavailable.append(album)
+
+    for cheapest, album in sorted(available, key=lambda item: item[0].size):
+        if cheapest.size > remaining:
+            plan.skipped.append(album)
+            continue
+        plan.chosen[album.group_id] = (album, cheapest)
+        remaining -= cheapest.size
+
+    steps = []
+    hulls = {}
+    for group_id, (album, base) in plan.chosen.items():
+        hull = [base] + _hull(album.options, base)
+        hulls[group_id] = hull
+        for index in range(1, len(hull)):
+            efficiency = (hull[index].value - hull[index - 1].value) / (hull[index].size - hull[index - 1].size)
+            steps.append((-efficiency, index, group_id))
+    steps.sort()
+
+    position = {group_id: 0 for group_id in hulls}
+    for _efficiency, index, group_id in steps:
+        if position[group_id] != index - 1:
+            continue
+        hull = hulls[group_id]
+        extra = hull[index].size - hull[index - 1].size
+        if extra > remaining:
+            continue
+        remaining -= extra
+        position[group_id] = index
+
+    # Leftover space: the best upgrade off the hull that still fits
+    for group_id, hull in hulls.items():
+        album, _base = plan.chosen[group_id]
+        current = hull[position[group_id]]
+        fitting = [option for option in album.options
+                   if option.size - current.size <= remaining and option.value > current.value]
+        option = max(fitting, key=lambda o: o.value) if fitting else current
+        remaining -= option.size - current.size
+        plan.chosen[group_id] = (album, option)
+    return plan
+
+
+def print_plan(plan: Plan, title: str):
+    total_albums = len(plan.chosen) + len(plan.unavailable) + len(plan.skipped)
+    print(f"\n📐 Download plan for {title}")
+    print("=" * 60)
+    for album, option in sorted(plan.chosen.values(), key=lambda item: (item[0].artist.lower(), item[0].year)):
+        print(f"   ✅ {album.artist} - {album.name} ({album.year or '?'}) | {option.format} {option.encoding} "
+              f"{option.media} | {format_size(option.size)} | {option.seeders} seeders")
+    for album in plan.skipped:
+        smallest = min(option.size for option in album.options)
+        print(f"   ⏭️  {album.artist} - {album.name}: does not fit (smallest {format_size(smallest)})")
+    for album in plan.unavailable:
+        print(f"   ⚠️  {album.artist} - {album.name}: no seeded torrent")
+    print()
+    print(f"📊 {len(plan.chosen)} of {total_albums} albums | "
+          f"{format_size(plan.total)} of {format_size(plan.budget)} budget")
+
+
+async def collage_albums(api: OrpheusAPI, collage_id: int, prefer: str, media: Optional[str],
+                         min_seeders: int) -> Tuple[str, List[Album]]:
+    albums: List[Album] = []
+
+    async def add(batch: List[Dict]):
+        _name, groups = compact_collage({"torrentgroups": batch})
+        for raw, group in zip(batch, groups):
+            albums.append(Album(group[0], group_artist(raw), group[1], group[2],
+                                album_options(group, prefer, media, min_seeders)))
+
+    response = await api.ajax_stream("collage", "torrentgroups", add, id=collage_id)
+    return response.get("name") or "", albums
+
+
+async def crate_albums(api: OrpheusAPI, crate: Dict, prefer: str, media: Optional[str], min_seeders: int,
+                       index: Optional[ArtistIndex] = None,
+                       matches: Optional[CrateMatches] = None) -> Tuple[List[Album], List[Dict]]:
+    """Crate entries as plannable albums, plus the entries not found
+
+    Entries resolving to the same group (e.g. listed twice, or once by
+    ``group_id`` and once by name) become one album, so it is planned and
+    paid for once.
+    """
+    albums, unresolved = [], []
+    seen = set()
+    for entry, group in await resolve_crate(api, crate, index, matches):
+        if group is None:
+            unresolved.append(entry)
+            continue
+        if group[0] in seen:
+            continue
+        seen.add(group[0])
+        albums.append(Album(group[0], entry.get("artist") or "", group[1], group[2],
+                            album_options(group, prefer, media, min_seeders)))
+    return albums, unresolved
+
+
+def _confirm(question: str) -> bool:
+    try:
+        return input(question).strip().lower() in ("y", "yes")
+    except EOFError:
+        return False
+
+
+def main(argv: Optional[List[str]] = None):
+    """Entry point for ``orpheus plan``"""
+    from .core import OrpheusTools
+
+    parser = argparse.ArgumentParser(prog="orpheus plan",
+                                     description="Choose per-album torrents for a crate or collage within a size budget")
+    parser.add_argument("kind", choices=("collage", "crate"))
+    parser.add_argument("target", help="Collage ID or crate name")
+    parser.add_argument("--budget", required=True, help="Total size, e.g. 300GB or 1.5TB")
+    parser.add_argument("--prefer", choices=sorted(ENCODING_SCORES),
+                        help="Preferred encoding (default: the crate's preference, else flac)")
+    parser.add_argument("--media", help="Preferred media such as CD, Vinyl or WEB")
+    parser.add_argument("--min-seeders", type=int, default=1)
+    parser.add_argument("--download", action="store_true", help="Fetch the planned torrents after confirming")
+    parser.add_argument("--yes", action="store_true", help="Do not ask before downloading")
+    parser.add_argument("--refresh-matches", action="store_true",
+                        help="Look crate entries up again instead of reusing earlier matches")
+    args = parser.parse_args(argv)
+
+    try:
+        budget = parse_budget(args.budget)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    tools = OrpheusTools()
+    config = tools.require_config()
+
+    crate = None
+    prefer, media = args.prefer, args.media
+    if args.kind == "crate":
+        path = find_crate(tools.config_dir, args.target)
+        if path is None:
+            print(f"❌ Crate not found: {args.target}")
+            sys.exit(1)
+        crate = load_crate(path)
+        preferences = crate.get("preferences") or {}
+        prefer = prefer or str(preferences.get("encoding", "")).lower() or None
+        media = media or preferences.get("media")
+    prefer = prefer if prefer in ENCODING_SCORES else "flac"
+
+    async def run():
+        async with OrpheusAPI.from_config(config, cache=ResponseCache(tools.config_dir / "cache")) as api:
+            if crate is not None:
+                print(f"🔍 Resolving {len(crate.get('albums', []))} crate entries...")
+                index = load_artist_index(tools.config_dir)
+                matches = CrateMatches.for_crate(tools.config_dir, path, crate,
+                                                 max_age=0 if args.refresh_matches else None)
+                try:
+                    albums, unresolved = await crate_albums(api, crate, prefer, media, args.min_seeders,
+                                                            index, matches)
+                finally:
+                    index.save()
+                    matches.save()
+                for entry in unresolved:
+                    print(f"   ❓ Not found on the tracker: {entry.get('artist')} - {entry.get('album')}")
+                title, folder = crate.get("name") or args.target, f"crate_{safe_name(crate.get('name') or args.target)}"
+            else:
+                name, albums = await collage_albums(api, int(args.target), prefer, media, args.min_seeders)
+                title, folder = f"collage {args.target} ({name})", f"collage_{args.target}_{safe_name(name)}"
+
+            plan = plan_downloads(albums, budget)
+            print_plan(plan, title)
+            if not args.download or not plan.chosen:
+                return
+            if not args.yes and not _confirm(f"\n⬇️  Download {len(plan.chosen)} torrents? (y/N): "):
+                print("👋 Nothing downloaded")
+                return
+
+            sink = make_sink(config, tools.download_dir, ledger=DownloadLedger(tools.config_dir / "downloads.jsonl"))
+            async with sink:
+                for album, option in plan.chosen.values():
+                    try:
+                        data = await api.download_torrent(option.torrent_id)
+                    except APIError as e:
+                        print(f"   ❌ {album.name}: {e}")
+                        continue
+                    await sink.add(TorrentItem(option.torrent_id, album.group_id, album.name, data, folder))
+            print(f"✅ {len(sink.delivered)} torrents handed to {sink.description}")
+
+    try:
+        asyncio.run(run())
+    except (APIError, SinkError, ValueError) as e:
+        print(f"❌ Planning failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Orpheus Collage Tools - Release Grouping
+Groups torrents under the physical/digital release they belong to
+(year | title | label | catalog | media) rather than by file format
+"""
+
+import html
+from typing import Dict, List, Optional, Tuple
+
+# Gazelle release type IDs
+RELEASE_TYPES = {
+    1: "Album", 3: "Soundtrack", 5: "EP", 6: "Anthology", 7: "Compilation",
+    9: "Single", 11: "Live album", 13: "Remix", 14: "Bootleg", 15: "Interview",
+    16: "Mixtape", 17: "Demo", 18: "Concert Recording", 19: "DJ Mix", 21: "Unknown",
+}
+UNOFFICIAL_TYPES = {6, 7, 14, 16, 19, 21}
+
+# (torrent_id, format, encoding, size, seeders)
+CompactTorrent = Tuple[int, str, str, int, int]
+# (year, title, label, catalog, media, [torrents])
+CompactRelease = Tuple[int, str, str, str, str, List[CompactTorrent]]
+
+
+def _text(value) -> str:
+    return html.unescape(str(value or "")).strip()
+
+
+def torrent_id(torrent: Dict) -> int:
+    """Torrent ID across the artist, collage and torrentgroup API shapes"""
+    return int(torrent.get("id") or torrent.get("torrentid") or torrent.get("torrentId") or 0)
+
+
+def release_key(torrent: Dict, group: Dict) -> Tuple[int, str, str, str, str]:
+    """Key identifying the release (pressing) a torrent was ripped from"""
+    if torrent.get("remastered") or torrent.get("remasterYear"):
+        year = torrent.get("remasterYear") or 0
+        label = torrent.get("remasterRecordLabel")
+        catalog = torrent.get("remasterCatalogueNumber")
+    else:
+        # Original release: edition details live on the group
+        year = group.get("groupYear") or group.get("year") or 0
+        label = group.get("groupRecordLabel") or group.get("recordLabel")
+        catalog = group.get("groupCatalogueNumber") or group.get("catalogueNumber")
+    return (
+        int(year or 0),
+        _text(torrent.get("remasterTitle")),
+        _text(label),
+        _text(catalog),
+        _text(torrent.get("media")),
+    )
+
+
+def compact_torrent(torrent: Dict) -> CompactTorrent:
+    return (
+        torrent_id(torrent),
+        _text(torrent.get("format")),
+        _text(torrent.get("encoding")),
+        int(torrent.get("size") or 0),
+        int(torrent.get("seeders") or 0),
+    )
+
+
+def group_releases(torrents: List[Dict], group: Dict) -> List[CompactRelease]:
+    """Group a torrent group's torrents by release, oldest release first"""
+    releases: Dict[Tuple, List[CompactTorrent]] = {}
+    for torrent in torrents:
+        releases.setdefault(release_key(torrent, group), []).append(compact_torrent(torrent))
+
+    grouped = []
+    for key, items in releases.items():
+        # Within a release: most seeded formats first
+        items.sort(key=lambda t: -t[4])
+        grouped.append(key + (items,))
+    grouped.sort(key=lambda r: (r[0] or 9999, r[4], r[2], r[3]))
+    return grouped
+
+
+def is_official(release_type) -> bool:
+    """Official releases exclude compilations, bootlegs, mixtapes and the like"""
+    try:
+        return int(release_type) not in UNOFFICIAL_TYPES
+    except (TypeError, ValueError):
+        return True
+
+
+# Download preference -> accepted (format, encoding) pairs, best first
+PREFERENCES = {
+    "320": [("MP3", "320")],
+    "v0": [("MP3", "V0 (VBR)")],
+    "flac": [("FLAC", "Lossless"), ("FLAC", "24bit Lossless")],
+}
+
+
+def select_torrent(torrents: List[CompactTorrent], prefer: str) -> Optional[CompactTorrent]:
+    """Best-seeded torrent matching the preference, or None when there is no match"""
+    accepted = PREFERENCES[prefer.lower()]
+    matches = [t for t in torrents if (t[1], t[2]) in accepted]
+    if not matches:
+        return None
+    return max(matches, key=lambda t: (-accepted.index((t[1], t[2])), t[4]))
+
+
+def release_torrents(releases: List[CompactRelease]) -> List[CompactTorrent]:
+    """Flatten grouped releases back into their torrents"""
+    return [torrent for release in releases for torrent in release[5]]
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Orpheus Collage Tools - Retry and Circuit Breaking
+Exponential backoff with jitter, Retry-After handling and a circuit breaker
+shared by every request of a session, so concurrent workers back off together
+"""
+
+import time
+import random
+import socket
+import asyncio
+import email.utils
+import urllib.error
+from typing import Callable, Optional, TypeVar
+
+from .metrics import CIRCUIT_OPENS, RETRIES
+
+T = TypeVar("T")
+
+# Statuses worth another attempt; only 5xx count against the breaker
+RETRY_STATUSES = {429, 500, 502, 503, 504, 520, 522, 524}
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the tracker is considered down"""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f"Tracker unavailable, not retrying for {retry_in:.0f}s")
+        self.retry_in = retry_in
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta seconds or HTTP date)"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class RetryPolicy:
+    """How often and how long to retry: full-jitter exponential backoff"""
+
+    def __init__(self, attempts: int = 4, base_delay: float = 1.0, max_delay: float = 30.0):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Wait before retry number ``attempt`` (1-based); Retry-After wins when given"""
+        if retry_after is not None:
+            return min(retry_after, self.max_delay * 4)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """Stops all requests for a while after repeated server errors or timeouts
+
+    After ``failure_threshold`` consecutive failures the circuit opens for
+    ``reset_timeout`` seconds. Then a single probe request is let through:
+    success closes the circuit, failure reopens it for twice as long (up to
+    ``max_reset_timeout``). Callers wait out short openings and fail fast
+    with ``CircuitOpenError`` when the wait would exceed ``max_wait``.
+    A Retry-After from the tracker pauses every caller until it passes.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 15.0,
+                 max_reset_timeout: float = 300.0, max_wait: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.max_wait = max_wait
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_for = reset_timeout
+        self.open_until = 0.0
+        self.paused_until = 0.0
+
+    def _wait_time(self) -> Optional[float]:
+        """Seconds to wait before sending, 0 to send now, None while a probe is out"""
+        now = time.monotonic()
+        if self.state == OPEN:
+            if now < self.open_until:
+                return self.open_until - now
+            self.state = HALF_OPEN
+            return 0.0
+        if self.state == HALF_OPEN:
+            return None
+        return max(0.0, self.paused_until - now)
+
+    def check(self):
+        """Synchronous gate: raise if the circuit is open (used by blocking callers)"""
+        wait = self._wait_time()
+        if wait is None or wait > 0:
+            raise CircuitOpenError(wait or 0.0)
+
+    async def before(self) -> bool:
+        """Wait until a request may be sent; True when this request is the half-open probe"""
+        while True:
+            probing = self.state == OPEN
+            wait = self._wait_time()
+            if wait is None:
+                # Someone else is probing; check back shortly
+                wait = 0.5
+            elif wait == 0:
+                return probing and self.state == HALF_OPEN
+            if wait > self.max_wait:
+                raise CircuitOpenError(wait)
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Hold every caller back for ``seconds`` (the tracker sent Retry-After)"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def record_success(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_for = self.reset_timeout
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN:
+            self.opened_for = min(self.opened_for * 2, self.max_reset_timeout)
+            self._open()
+        elif self.state == CLOSED and self.failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self.open_until = time.monotonic() + self.opened_for
+        CIRCUIT_OPENS.inc()
+
+
+# One breaker per process: every session and blocking call backs off together when the tracker struggles
+TRACKER_BREAKER = CircuitBreaker()
+
+
+def call_with_retry(func: Callable[[], T], policy: Optional[RetryPolicy] = None,
+                    breaker: Optional[CircuitBreaker] = None, endpoint: str = "request") -> T:
+    """Run a blocking urllib call, retrying transient failures with backoff"""
+    policy = policy or RetryPolicy()
+    for attempt in range(1, policy.attempts + 1):
+        if breaker is not None:
+            breaker.check()
+        retry_after = None
+        try:
+            result = func()
+        except urllib.error.HTTPError as e:
+            retry_after = parse_retry_after(e.headers.get("Retry-After") if e.headers else None)
+            if breaker is not None and e.code >= 500:
+                breaker.record_failure()
+            elif breaker is not None:
+                # The tracker answered; it is up even if it refused this request
+                breaker.record_success()
+                if retry_after is not None:
+                    breaker.pause(retry_after)
+            if e.code not in RETRY_STATUSES or attempt == policy.attempts:
+                raise
+            reason = str(e.code)
+        except (urllib.error.URLError, socket.timeout, ConnectionError) as e:
+            if breaker is not None:
+                breaker.record_failure()
+            if attempt == policy.attempts:
+                raise
+            reason = "timeout" if "timed out" in str(e) else "connection"
+        else:
+            if breaker is not None:
+                breaker.record_success()
+            return result
+        RETRIES.inc(endpoint=endpoint, reason=reason)
+        time.sleep(policy.delay(attempt, retry_after))
+    raise AssertionError("unreachable")
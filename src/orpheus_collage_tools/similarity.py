@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Orpheus Collage Tools - Related Collages
+MinHash signatures of every locally stored collage's group IDs, banded for
+locality-sensitive hashing, so similar or overlapping collages are found
+without comparing group sets pairwise or fetching anything
+"""
+
+import os
+import sys
+import json
+import bisect
+import random
+import struct
+import asyncio
+import argparse
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .collage_store import CollageStore, fetch_collage_store, store_path
+
+MAGIC = b"OCSG0002"
+INDEX_FILE = "collage_signatures.bin"
+
+# 64 bands of 2 rows: collages with a Jaccard similarity of about 0.2 or
+# more share at least one band with high probability
+PERMUTATIONS = 128
+BANDS = 64
+ROWS = PERMUTATIONS // BANDS
+
+PRIME = (1 << 31) - 1
+MASK64 = (1 << 64) - 1
+BAND_MULTIPLIER = 0x100000001B3
+SEED = 6936
+
+_rng = random.Random(SEED)
+COEFFICIENTS = [(_rng.randrange(1, PRIME), _rng.randrange(0, PRIME)) for _ in range(PERMUTATIONS)]
+
+
+def minhash(group_ids: Iterable[int]) -> List[int]:
+    """Signature of a set of group IDs: the minimum of each hash permutation"""
+    ids = [group_id % PRIME for group_id in set(group_ids)]
+    if not ids:
+        return [PRIME] * PERMUTATIONS
+    if numpy is not None:
+        values = numpy.array(ids, dtype=numpy.uint64)
+        a = numpy.array([a for a, _b in COEFFICIENTS], dtype=numpy.uint64)[:, None]
+        b = numpy.array([b for _a, b in COEFFICIENTS], dtype=numpy.uint64)[:, None]
+        return ((a * values[None, :] + b) % PRIME).min(axis=1).tolist()
+    return [min((a * value + b) % PRIME for value in ids) for a, b in COEFFICIENTS]
+
+
+def band_hashes(signature: List[int]) -> List[int]:
+    """One 64-bit hash per band of ``ROWS`` signature values"""
+    hashes = []
+    for band in range(BANDS):
+        h = 0
+        for value in signature[band * ROWS:(band + 1) * ROWS]:
+            h = (h * BAND_MULTIPLIER + value) & MASK64
+        hashes.append(h)
+    return hashes
+
+
+class Related(NamedTuple):
+    collage_id: int
+    name: str
+    groups: int
+    similarity: float   # estimated Jaccard similarity
+    shared: int         # estimated groups in common
+
+
+class SimilarityIndex:
+    """Signatures and band hashes of every collage store under ``config_dir``
+
+    Kept in one file: a JSON header listing the collages (with the store's
+    modification time, so only changed stores are re-hashed) followed by the
+    signature and band-hash arrays, the band hashes again sorted within
+    each band so a query finds its LSH buckets by binary search, and every
+    collage's sorted group IDs for exact set operations.
+    """
+
+    def __init__(self, config_dir: Path):
+        self.config_dir = Path(config_dir)
+        self.path = self.config_dir / INDEX_FILE
+        # [collage_id, name, group count, store mtime_ns]
+        self.collages: List[List] = []
+        self.signatures = array("I")
+        self.bands = array("Q")
+        self.bucket_keys = array("Q")
+        self.bucket_positions = array("I")
+        self.group_offsets = array("Q", [0])
+        self.group_ids = array("I")
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return
+        if data[:len(MAGIC)] != MAGIC:
+            return
+        (header_length,) = struct.unpack_from("<I", data, len(MAGIC))
+        start = len(MAGIC) + 4
+        header = json.loads(data[start:start + header_length])
+        if header.get("permutations") != PERMUTATIONS or header.get("seed") != SEED \
+                or header.get("byteorder") != sys.byteorder:
+            return
+        position = start + header_length
+        count = len(header["collages"])
+        blocks = []
+        for typecode, width in (("I", PERMUTATIONS), ("Q", BANDS), ("Q", BANDS), ("I", BANDS)):
+            block = array(typecode)
+            length = count * width * block.itemsize
+            block.frombytes(data[position:position + length])
+            position += length
+            blocks.append(block)
+        offsets, group_ids = array("Q"), array("I")
+        offsets.frombytes(data[position:position + (count + 1) * offsets.itemsize])
+        position += (count + 1) * offsets.itemsize
+        group_ids.frombytes(data[position:position + offsets[-1] * group_ids.itemsize])
+        self.collages = header["collages"]
+        self.signatures, self.bands, self.bucket_keys, self.bucket_positions = blocks
+        self.group_offsets, self.group_ids = offsets, group_ids
+
+    def _build_buckets(self):
+        count = len(self.collages)
+        self.bucket_keys, self.bucket_positions = array("Q"), array("I")
+        for band in range(BANDS):
+            bucket = sorted((self.bands[position * BANDS + band], position) for position in range(count))
+            self.bucket_keys.extend(key for key, _position in bucket)
+            self.bucket_positions.extend(position for _key, position in bucket)
+
+    def save(self):
+        header = json.dumps({"permutations": PERMUTATIONS, "seed": SEED, "byteorder": sys.byteorder,
+                             "collages": self.collages}).encode("utf-8")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC + struct.pack("<I", len(header)) + header)
+            for block in (self.signatures, self.bands, self.bucket_keys, self.bucket_positions,
+                          self.group_offsets, self.group_ids):
+                f.write(block.tobytes())
+        os.replace(tmp_path, self.path)
+
+    def __len__(self) -> int:
+        return len(self.collages)
+
+    def signature(self, position: int) -> List[int]:
+        return self.signatures[position * PERMUTATIONS:(position + 1) * PERMUTATIONS].tolist()
+
+    def groups(self, position: int) -> array:
+        """Sorted group IDs of the collage at ``position``"""
+        return self.group_ids[self.group_offsets[position]:self.group_offsets[position + 1]]
+
+    def position(self, collage_id: int) -> Optional[int]:
+        for position, entry in enumerate(self.collages):
+            if entry[0] == collage_id:
+                return position
+        return None
+
+    def update(self) -> int:
+        """Re-hash new and changed collage stores, drop deleted ones; returns the number re-hashed"""
+        known = {entry[0]: (entry, position) for position, entry in enumerate(self.collages)}
+        collages: List[List] = []
+        signatures, bands = array("I"), array("Q")
+        offsets, all_groups = array("Q", [0]), array("I")
+        hashed = 0
+        for path in sorted((self.config_dir / "collages").glob("*.occ")):
+            try:
+                mtime = path.stat().st_mtime_ns
+                collage_id = int(path.stem.rsplit("_", 1)[-1])
+            except (OSError, ValueError):
+                continue
+            previous = known.get(collage_id)
+            if previous is not None and previous[0][3] == mtime:
+                entry, position = previous
+                signature = self.signature(position)
+                band = self.bands[position * BANDS:(position + 1) * BANDS].tolist()
+                groups = self.groups(position)
+            else:
+                try:
+                    with CollageStore(path) as store:
+                        group_ids = store.group_ids()
+                        entry = [collage_id, store.name, len(group_ids), mtime]
+                except (OSError, ValueError):
+                    continue
+                signature = minhash(group_ids)
+                band = band_hashes(signature)
+                groups = array("I", sorted(group_ids))
+                hashed += 1
+            collages.append(entry)
+            signatures.extend(signature)
+            bands.extend(band)
+            all_groups.extend(groups)
+            offsets.append(len(all_groups))
+        changed = hashed or len(collages) != len(self.collages)
+        self.collages, self.signatures, self.bands = collages, signatures, bands
+        self.group_offsets, self.group_ids = offsets, all_groups
+        if changed:
+            self._build_buckets()
+            self.save()
+        return hashed
+
+    def candidates(self, bands: List[int]) -> List[int]:
+        """Positions of collages sharing at least one band with ``bands``"""
+        count = len(self.collages)
+        found: Set[int] = set()
+        for band, value in enumerate(bands):
+            lo = bisect.bisect_left(self.bucket_keys, value, band * count, (band + 1) * count)
+            hi = bisect.bisect_right(self.bucket_keys, value, lo, (band + 1) * count)
+            found.update(self.bucket_positions[lo:hi])
+        return sorted(found)
+
+    def similarities(self, signature: List[int], positions: Iterable[int]) -> Dict[int, float]:
+        """Estimated Jaccard similarity (share of equal signature values) per position"""
+        positions = list(positions)
+        if numpy is not None and positions:
+            table = numpy.frombuffer(self.signatures, dtype=numpy.uint32).reshape(-1, PERMUTATIONS)
+            matches = (table[positions] == numpy.array(signature, dtype=numpy.uint32)).mean(axis=1)
+            return dict(zip(positions, matches.tolist()))
+        scores = {}
+        for position in positions:
+            start = position * PERMUTATIONS
+            scores[position] = sum(self.signatures[start + i] == value
+                                   for i, value in enumerate(signature)) / PERMUTATIONS
+        return scores
+
+    def containing(self, group_ids: Set[int]) -> Dict[int, Set[int]]:
+        """Exactly which of ``group_ids`` each collage holds: position -> shared groups"""
+        found: Dict[int, Set[int]] = {}
+        if not group_ids or not self.group_ids:
+            return found
+        if numpy is not None:
+            values = numpy.frombuffer(self.group_ids, dtype=numpy.uint32)
+            hits = numpy.flatnonzero(numpy.isin(values, numpy.array(sorted(group_ids), dtype=numpy.uint32)))
+            offsets = numpy.frombuffer(self.group_offsets, dtype=numpy.uint64)
+            positions = numpy.searchsorted(offsets, hits, side="right") - 1
+            for position, hit in zip(positions.tolist(), hits.tolist()):
+                found.setdefault(position, set()).add(self.group_ids[hit])
+            return found
+        for position in range(len(self.collages)):
+            shared = group_ids.intersection(self.groups(position))
+            if shared:
+                found[position] = shared
+        return found
+
+    def related(self, group_ids: Set[int], limit: int = 10, exclude: Optional[int] = None,
+                scan_all: bool = False) -> List[Related]:
+        """Collages most similar to a set of group IDs, best first
+
+        Only collages sharing an LSH band are scored. ``scan_all`` scores
+        every signature instead, for small sets (such as a crate) whose
+        similarity to big collages is too low for the bands to catch.
+        """
+        signature = minhash(group_ids)
+        positions = range(len(self.collages)) if scan_all else self.candidates(band_hashes(signature))
+        positions = [p for p in positions if self.collages[p][0] != exclude]
+        results = []
+        for position, similarity in self.similarities(signature, positions).items():
+            if similarity <= 0:
+                continue
+            collage_id, name, groups, _mtime = self.collages[position]
+            shared = similarity * (len(group_ids) + groups) / (1 + similarity)
+            results.append(Related(collage_id, name, groups, similarity, round(min(shared, groups, len(group_ids)))))
+        results.sort(key=lambda r: (-r.shared if scan_all else -r.similarity, r.collage_id))
+        return results[:limit]
+
+
+def exact_shared(config_dir: Path, collage_id: int, group_ids: Set[int]) -> Optional[int]:
+    """Groups a stored collage really has in common with ``group_ids``"""
+    try:
+        with CollageStore(store_path(config_dir, collage_id)) as store:
+            return len(store.group_ids() & group_ids)
+    except (OSError, ValueError):
+        return None
+
+
+def print_related(config_dir: Path, title: str, results: List[Related], group_ids: Set[int]):
+    if not results:
+        print(f"📭 No related collages found for {title}")
+        return
+    print(f"\n🔗 Collages related to {title}")
+    print("=" * 60)
+    for i, result in enumerate(results, 1):
+        shared = exact_shared(config_dir, result.collage_id, group_ids)
+        shared = result.shared if shared is None else shared
+        print(f"{i:2d}. {result.name} (ID: {result.collage_id})")
+        print(f"    {shared} of {len(group_ids)} albums in common | {result.groups} albums | "
+              f"similarity {result.similarity:.0%}")
+
+
+def main(argv: Optional[List[str]] = None):
+    """Entry point for ``orpheus related``"""
+    from .api import APIError, OrpheusAPI
+    from .artist_index import load_artist_index
+    from .cache import ResponseCache
+    from .core import OrpheusTools
+    from .crates import CrateMatches, find_crate, load_crate, resolve_crate
+
+    parser = argparse.ArgumentParser(prog="orpheus related",
+                                     description="Find locally stored collages similar to a collage or crate")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("collage_id", type=int, nargs="?")
+    target.add_argument("--crate", metavar="NAME", help="Collages overlapping a crate's albums")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    tools = OrpheusTools()
+    index = SimilarityIndex(tools.config_dir)
+    hashed = index.update()
+    if hashed:
+        print(f"🧮 Indexed {hashed} new or changed collage(s)")
+    if not index:
+        print("📭 No collages stored locally yet. Use 'orpheus collage query <id>' or 'orpheus watch add collage <id>'.")
+        sys.exit(1)
+
+    crate = None
+    if args.crate:
+        crate_path = find_crate(tools.config_dir, args.crate)
+        if crate_path is None:
+            print(f"❌ Crate not found: {args.crate}")
+            sys.exit(1)
+        crate = load_crate(crate_path)
+
+    position = None if crate is not None else index.position(args.collage_id)
+    if crate is not None or position is None:
+        config = tools.require_config()
+
+        async def fetch():
+            async with OrpheusAPI.from_config(config, cache=ResponseCache(tools.config_dir / "cache")) as api:
+                if crate is not None:
+                    names = load_artist_index(tools.config_dir)
+                    matches = CrateMatches.for_crate(tools.config_dir, crate_path, crate)
+                    try:
+                        return {group[0] for _entry, group in await resolve_crate(api, crate, names, matches) if group}
+                    finally:
+                        names.save()
+                        matches.save()
+                # Only the collage asked about is fetched; candidates must already be local
+                path = store_path(tools.config_dir, args.collage_id)
+                await fetch_collage_store(api, path, args.collage_id)
+                with CollageStore(path) as store:
+                    return store.group_ids()
+
+        try:
+            group_ids = asyncio.run(fetch())
+        except (APIError, ValueError) as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+    else:
+        with CollageStore(store_path(tools.config_dir, args.collage_id)) as store:
+            group_ids = store.group_ids()
+
+    if not group_ids:
+        print("📭 No albums to compare")
+        sys.exit(1)
+    if crate is not None:
+        results = index.related(group_ids, args.limit, scan_all=True)
+        title = f"crate {crate.get('name') or args.crate}"
+    else:
+        results = index.related(group_ids, args.limit, exclude=args.collage_id)
+        title = f"collage {args.collage_id}"
+    print_related(tools.config_dir, title, results, group_ids)
+
+
+if __name__ == "__main__":
+    main()
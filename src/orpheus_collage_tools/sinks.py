@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Orpheus Collage Tools - Torrent Sinks
+Where downloaded .torrent files go: a folder or client watch directory
+(atomic renames, one fsync pass per batch) or a torrent client's Web API
+(batched adds over one pooled connection), plus a ledger of what was sent
+"""
+
+import os
+import json
+import time
+import base64
+import asyncio
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import aiohttp
+
+from .metrics import DOWNLOADS
+
+DEFAULT_BATCH = 50
+SINK_TYPES = ("folder", "watch_dir", "qbittorrent", "transmission")
+
+
+class SinkError(Exception):
+    """Raised when a batch could not be handed to its destination"""
+
+
+# Errors that mean a destination refused or could not be reached
+DELIVERY_ERRORS = (SinkError, OSError, aiohttp.ClientError, asyncio.TimeoutError)
+
+
+class TorrentItem(NamedTuple):
+    torrent_id: int
+    group_id: int
+    name: str
+    data: bytes
+    folder: str = ""    # subfolder (folder sink) or category/label (clients)
+
+
+class DownloadLedger:
+    """Append-only record of every torrent handed to a sink (``downloads.jsonl``)"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def record(self, items: Iterable[TorrentItem], sink: str):
+        now = time.time()
+        lines = [json.dumps({"torrent_id": item.torrent_id, "group_id": item.group_id,
+                             "name": item.name, "sink": sink, "at": now}) + "\n" for item in items]
+        if not lines:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(lines))
+
+    def entries(self) -> List[Dict[str, Any]]:
+        if not self.path.exists():
+            return []
+        entries = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # A torn last line from an interrupted run
+                    continue
+        return entries
+
+    def group_ids(self) -> Set[int]:
+        return {int(entry["group_id"]) for entry in self.entries() if entry.get("group_id")}
+
+    def torrent_ids(self) -> Set[int]:
+        return {int(entry["torrent_id"]) for entry in self.entries()}
+
+
+class TorrentSink:
+    """Collects torrents and delivers them in batches
+
+    Use as ``async with sink: await sink.add(item)``; anything still queued
+    is delivered on exit. Results end up in ``delivered`` and ``failed``.
+    """
+
+    kind = "sink"
+
+    def __init__(self, batch_size: int = DEFAULT_BATCH, ledger: Optional[DownloadLedger] = None):
+        self.batch_size = max(1, batch_size)
+        self.ledger = ledger
+        self.pending: List[TorrentItem] = []
+        self.delivered: List[TorrentItem] = []
+        self.failed: List[TorrentItem] = []
+
+    async def __aenter__(self):
+        try:
+            await self.open()
+        except BaseException:
+            # __aexit__ does not run when entering fails
+            await self.close()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            await self.flush()
+        finally:
+            await self.close()
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+    @property
+    def description(self) -> str:
+        return self.kind
+
+    async def add(self, item: TorrentItem):
+        self.pending.append(item)
+        if len(self.pending) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        """Deliver everything queued; failures are recorded, not raised"""
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+        try:
+            rejected = await self.deliver(batch) or []
+        except DELIVERY_ERRORS as e:
+            self.failed.extend(batch)
+            DOWNLOADS.inc(len(batch), status="failed")
+            print(f"   ❌ Could not hand {len(batch)} torrent(s) to {self.description}: {e}")
+            return
+        for item, error in rejected:
+            print(f"   ❌ Could not hand {item.name} to {self.description}: {error}")
+        failed = {id(item) for item, _error in rejected}
+        accepted = [item for item in batch if id(item) not in failed]
+        self.failed.extend(item for item in batch if id(item) in failed)
+        self.delivered.extend(accepted)
+        DOWNLOADS.inc(len(failed), status="failed")
+        DOWNLOADS.inc(len(accepted), status="completed")
+        if self.ledger is not None:
+            self.ledger.record(accepted, self.kind)
+
+    async def deliver(self, batch: List[TorrentItem]) -> Optional[List[Tuple[TorrentItem, Exception]]]:
+        """Hand over a batch; raise when none of it arrived, or return the (item, error) pairs that did not"""
+        raise NotImplementedError
+
+
+def _fsync_dir(directory: Path):
+    # Makes the renames themselves durable; not supported on Windows
+    if os.name == "nt":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class FolderSink(TorrentSink):
+    """Writes .torrent files into a folder, optionally one subfolder per collage
+
+    Files are written under a ``.part`` name that watch-dir pollers ignore,
+    fsynced, then renamed into place together, with one directory fsync per
+    batch instead of per file.
+    """
+
+    kind = "folder"
+
+    def __init__(self, directory: Path, subfolders: bool = True, **kwargs):
+        super().__init__(**kwargs)
+        self.directory = Path(directory).expanduser()
+        self.subfolders = subfolders
+
+    @property
+    def description(self) -> str:
+        return str(self.directory)
+
+    def target(self, item: TorrentItem) -> Path:
+        from .sync import safe_name
+
+        directory = self.directory / item.folder if self.subfolders and item.folder else self.directory
+        return directory / f"{safe_name(item.name)}_{item.torrent_id}.torrent"
+
+    async def deliver(self, batch: List[TorrentItem]):
+        staged = []
+        try:
+            for item in batch:
+                target = self.target(item)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                part = target.with_name(f".{target.name}.part")
+                with open(part, "wb") as f:
+                    f.write(item.data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                staged.append((part, target))
+        except OSError:
+            for part, _target in staged:
+                part.unlink()
+            raise
+        for part, target in staged:
+            os.replace(part, target)
+        for directory in {target.parent for _part, target in staged}:
+            _fsync_dir(directory)
+
+
+class WatchDirSink(FolderSink):
+    """Flat drop folder watched by a torrent client"""
+
+    kind = "watch_dir"
+
+    def __init__(self, directory: Path, **kwargs):
+        super().__init__(directory, subfolders=False, **kwargs)
+
+
+class ClientSink(TorrentSink):
+    """Base for torrent client Web APIs, sharing one pooled HTTP session"""
+
+    def __init__(self, url: str, username: Optional[str] = None, password: Optional[str] = None,
+                 category: Optional[str] = None, paused: bool = False, timeout: float = 60.0, **kwargs):
+        super().__init__(**kwargs)
+        self.url = url.rstrip("/")
+        self.username = username
+        self.password = password
+        self.category = category
+        self.paused = paused
+        self.timeout = timeout
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def description(self) -> str:
+        return f"{self.kind} at {self.url}"
+
+    async def open(self):
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=4),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+class QBittorrentSink(ClientSink):
+    """qBittorrent Web API: one ``torrents/add`` request per batch"""
+
+    kind = "qbittorrent"
+
+    async def open(self):
+        await super().open()
+        if not self.username:
+            return
+        try:
+            async with self.session.post(f"{self.url}/api/v2/auth/login",
+                                         data={"username": self.username, "password": self.password or ""},
+                                         headers={"Referer": self.url}) as response:
+                if response.status != 200 or (await response.text()).strip() != "Ok.":
+                    raise SinkError(f"qBittorrent login failed (HTTP {response.status})")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise SinkError(f"Could not reach qBittorrent at {self.url}: {e or type(e).__name__}") from e
+
+    async def deliver(self, batch: List[TorrentItem]):
+        form = aiohttp.FormData()
+        for item in batch:
+            form.add_field("torrents", item.data, filename=f"{item.torrent_id}.torrent",
+                           content_type="application/x-bittorrent")
+        if self.category:
+            form.add_field("category", self.category)
+        form.add_field("paused", "true" if self.paused else "false")
+        async with self.session.post(f"{self.url}/api/v2/torrents/add", data=form,
+                                     headers={"Referer": self.url}) as response:
+            body = (await response.text()).strip()
+            if response.status != 200 or body != "Ok.":
+                raise SinkError(f"HTTP {response.status}: {body or 'no response'}")
+
+
+class TransmissionSink(ClientSink):
+    """Transmission RPC: ``torrent-add`` calls pipelined over one session"""
+
+    kind = "transmission"
+
+    def __init__(self, url: str, **kwargs):
+        if not url.rstrip("/").endswith("/rpc"):
+            url = url.rstrip("/") + "/transmission/rpc"
+        super().__init__(url, **kwargs)
+        self._session_id = ""
+
+    async def _call(self, method: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        auth = aiohttp.BasicAuth(self.username, self.password or "") if self.username else None
+        payload = {"method": method, "arguments": arguments}
+        for _attempt in range(2):
+            async with self.session.post(self.url, json=payload, auth=auth,
+                                         headers={"X-Transmission-Session-Id": self._session_id}) as response:
+                if response.status == 409:
+                    # CSRF handshake: retry once with the id the daemon hands out
+                    self._session_id = response.headers.get("X-Transmission-Session-Id", "")
+                    continue
+                if response.status != 200:
+                    raise SinkError(f"HTTP {response.status}")
+                data = await response.json(content_type=None)
+                if data.get("result") != "success":
+                    raise SinkError(data.get("result") or "torrent-add failed")
+                return data.get("arguments") or {}
+        raise SinkError("Transmission rejected the session id")
+
+    async def deliver(self, batch: List[TorrentItem]) -> List[Tuple[TorrentItem, Exception]]:
+        results = await asyncio.gather(*(self._call("torrent-add", self._arguments(item)) for item in batch),
+                                       return_exceptions=True)
+        rejected = []
+        for item, result in zip(batch, results):
+            if isinstance(result, BaseException):
+                if not isinstance(result, DELIVERY_ERRORS):
+                    raise result
+                rejected.append((item, result))
+        if len(rejected) == len(batch):
+            raise rejected[0][1]
+        return rejected
+
+    def _arguments(self, item: TorrentItem) -> Dict[str, Any]:
+        arguments = {"metainfo": base64.b64encode(item.data).decode("ascii"), "paused": self.paused}
+        if self.category:
+            arguments["labels"] = [self.category]
+        return arguments
+
+
+def make_sink(config: Dict[str, Any], download_dir: Path, kind: Optional[str] = None,
+              ledger: Optional[DownloadLedger] = None) -> TorrentSink:
+    """Sink described by the ``torrent_sink`` config section (default: folders under ``download_dir``)"""
+    settings = dict(config.get("torrent_sink") or {})
+    configured = settings.pop("type", "folder")
+    batch_size = int(settings.pop("batch_size", DEFAULT_BATCH))
+    if kind and kind != configured:
+        # Overridden on the command line: the configured section describes another sink
+        settings = {}
+    kind = kind or configured
+
+    if kind == "folder":
+        return FolderSink(settings.get("path") or download_dir, batch_size=batch_size, ledger=ledger)
+    if kind == "watch_dir":
+        if not settings.get("path"):
+            raise ValueError("torrent_sink.path is required for a watch_dir sink")
+        return WatchDirSink(settings["path"], batch_size=batch_size, ledger=ledger)
+    if kind in ("qbittorrent", "transmission"):
+        if not settings.get("url"):
+            raise ValueError(f"torrent_sink.url is required for a {kind} sink")
+        sink_class = QBittorrentSink if kind == "qbittorrent" else TransmissionSink
+        return sink_class(settings["url"], username=settings.get("username"), password=settings.get("password"),
+                          category=settings.get("category"), paused=bool(settings.get("paused", False)),
+                          batch_size=batch_size, ledger=ledger)
+    raise ValueError(f"Unknown torrent sink: {kind}")
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Orpheus Collage Tools - Incremental Collage Sync
+Remembers which groups of a collage were already processed and only
+resolves and downloads the ones added since the last run
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from .api import APIError, OrpheusAPI
+from .metrics import DOWNLOADS
+from .sinks import SINK_TYPES, DownloadLedger, SinkError, TorrentItem, TorrentSink, make_sink
+from .parsing import parse_group_ids, parse_page_count
+from .releases import release_torrents, select_torrent
+from .workers import CompactGroup, ParsePool, compact_collage, parse_group_response, pool_size
+
+
+def safe_name(name: str) -> str:
+    """File-system safe version of a collage or album name"""
+    return re.sub(r"[^\w\-]+", "_", name).strip("_")[:80] or "untitled"
+
+
+class SyncState:
+    """Last-seen groups and downloaded torrents for one collage"""
+
+    def __init__(self, path: Path, collage_id: int):
+        self.path = path
+        self.collage_id = collage_id
+        self.name = ""
+        self.groups: Set[int] = set()
+        self.downloads: Dict[int, int] = {}
+        self.synced_at: Optional[float] = None
+
+    @classmethod
+    def load(cls, state_dir: Path, collage_id: int) -> "SyncState":
+        state = cls(Path(state_dir) / f"collage_{collage_id}.json", collage_id)
+        if state.path.exists():
+            with open(state.path, "r") as f:
+                data = json.load(f)
+            state.name = data.get("name", "")
+            state.groups = set(data.get("groups", []))
+            state.downloads = {int(k): v for k, v in data.get("downloads", {}).items()}
+            state.synced_at = data.get("synced_at")
+        return state
+
+    @property
+    def torrents(self) -> Set[int]:
+        return set(self.downloads.values())
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "collage_id": self.collage_id,
+            "name": self.name,
+            "groups": sorted(self.groups),
+            "downloads": {str(k): v for k, v in sorted(self.downloads.items())},
+            "synced_at": self.synced_at,
+        }
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+async def find_new_group_ids(api: OrpheusAPI, pool: ParsePool, collage_id: int, seen: Set[int]) -> List[int]:
+    """Walk collage pages from the newest additions back, stopping at the first fully-seen page
+
+    A first page without group links is an error once the collage has been
+    synced: a collage does not empty itself, but a changed layout or a
+    bounce to some other page would otherwise pass for "nothing new".
+    """
+    first_page = await api.page("collages.php", id=collage_id)
+    first_ids = await pool.run(parse_group_ids, first_page)
+    if not first_ids and seen:
+        raise APIError(f"Collage {collage_id}: page 1 lists no groups; the page layout may have changed")
+    new_ids: List[int] = []
+    for page in range(parse_page_count(first_page), 0, -1):
+        if page == 1:
+            ids = first_ids
+        else:
+            ids = await pool.run(parse_group_ids, await api.page("collages.php", id=collage_id, page=page))
+        unseen = [group_id for group_id in ids if group_id not in seen]
+        new_ids = unseen + new_ids
+        if ids and not unseen:
+            break
+    return new_ids
+
+
+async def sync_collage(api: OrpheusAPI, state: SyncState, prefer: str, sink: TorrentSink,
+                       full: bool = False, dry_run: bool = False, pool: Optional[ParsePool] = None) -> Dict[str, int]:
+    """Resolve the groups of a collage not seen by a previous sync and hand them to ``sink``"""
+    pool = pool or ParsePool(0)
+    summary = {"new": 0, "downloaded": 0, "unmatched": 0, "failed": 0}
+
+    if full or not state.groups:
+        # One collage call covers everything; retry groups with no match yet.
+        # Groups are compacted batch by batch as the response streams in.
+        groups = []
+
+        async def add(batch):
+            _name, compacted = compact_collage({"torrentgroups": batch})
+            groups.extend(g for g in compacted if g[0] not in state.downloads)
+
+        response = await api.ajax_stream("collage", "torrentgroups", add, id=state.collage_id)
+        state.name = response.get("name") or ""
+    else:
+        new_ids = await find_new_group_ids(api, pool, state.collage_id, state.groups)
+
+        async def fetch_group(group_id: int) -> CompactGroup:
+            return await pool.run(parse_group_response, await api.ajax_raw("torrentgroup", id=group_id))
+
+        # One failing lookup must not sink the others; failed groups stay unseen and are retried next sync
+        results = await asyncio.gather(*(fetch_group(group_id) for group_id in new_ids), return_exceptions=True)
+        groups = []
+        for group_id, result in zip(new_ids, results):
+            if isinstance(result, (APIError, LookupError, ValueError)):
+                summary["failed"] += 1
+                print(f"   ❌ Group {group_id}: {result}")
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                groups.append(result)
+
+    summary["new"] = len(groups) + summary["failed"]
+    if not groups:
+        return summary
+
+    chosen = []
+    for group_id, name, year, _release_type, releases in groups:
+        torrent = select_torrent(release_torrents(releases), prefer)
+        if torrent is None:
+            summary["unmatched"] += 1
+            print(f"   ⚠️  No {prefer} torrent: {name} ({year})")
+            state.groups.add(group_id)
+        else:
+            chosen.append((group_id, name, year, torrent))
+
+    if dry_run:
+        # Nothing is handed over, so the sink (and any client login) is left alone
+        for _group_id, name, year, torrent in chosen:
+            print(f"   📋 Would download: {name} ({year}) [{torrent[1]} {torrent[2]}]")
+        return summary
+
+    if chosen:
+        folder = f"collage_{state.collage_id}_{safe_name(state.name)}"
+        labels = {}
+        async with sink:
+            for group_id, name, year, torrent in chosen:
+                try:
+                    data = await api.download_torrent(torrent[0])
+                except APIError as e:
+                    summary["failed"] += 1
+                    DOWNLOADS.inc(status="failed")
+                    print(f"   ❌ {name}: {e}")
+                    continue
+
+                labels[torrent[0]] = f"{name} ({year}) [{torrent[1]} {torrent[2]}]"
+                await sink.add(TorrentItem(torrent[0], group_id, name, data, folder))
+
+        # Only what the sink accepted counts as downloaded; failed batches are retried next sync
+        for item in sink.delivered:
+            state.groups.add(item.group_id)
+            state.downloads[item.group_id] = item.torrent_id
+            print(f"   ✅ {labels[item.torrent_id]}")
+        summary["downloaded"] += len(sink.delivered)
+        summary["failed"] += len(sink.failed)
+
+    state.synced_at = time.time()
+    state.save()
+    return summary
+
+
+def main(argv: Optional[List[str]] = None):
+    """Entry point for ``orpheus sync``"""
+    from .core import OrpheusTools
+
+    parser = argparse.ArgumentParser(prog="orpheus sync",
+                                     description="Download only what was added to a collage since the last sync")
+    parser.add_argument("collage_id", type=int, help="Collage ID to sync")
+    prefer = parser.add_mutually_exclusive_group(required=True)
+    prefer.add_argument("--prefer-320", dest="prefer", action="store_const", const="320", help="MP3 320 CBR")
+    prefer.add_argument("--prefer-v0", dest="prefer", action="store_const", const="v0", help="MP3 V0 VBR")
+    prefer.add_argument("--prefer-flac", dest="prefer", action="store_const", const="flac", help="FLAC Lossless")
+    parser.add_argument("--full", action="store_true",
+                        help="Compare against the whole collage instead of stopping at already-seen pages")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would be downloaded")
+    parser.add_argument("--sink", choices=SINK_TYPES,
+                        help="Where torrents go (default: the torrent_sink config, else per-collage folders)")
+    args = parser.parse_args(argv)
+
+    tools = OrpheusTools()
+    config = tools.require_config()
+
+    try:
+        sink = make_sink(config, tools.download_dir, args.sink, DownloadLedger(tools.config_dir / "downloads.jsonl"))
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    state = SyncState.load(tools.config_dir / "sync", args.collage_id)
+    if state.synced_at:
+        print(f"🔄 Syncing collage {args.collage_id} ({len(state.groups)} groups already seen)")
+    else:
+        print(f"🔄 First sync of collage {args.collage_id}: processing every group")
+
+    async def run():
+        async with OrpheusAPI.from_config(config) as api, ParsePool(pool_size(config)) as pool:
+            return await sync_collage(api, state, args.prefer, sink,
+                                      full=args.full, dry_run=args.dry_run, pool=pool)
+
+    try:
+        summary = asyncio.run(run())
+    except (APIError, SinkError) as e:
+        print(f"❌ Sync failed: {e}")
+        sys.exit(1)
+
+    if not summary["new"]:
+        print("✅ Already up to date")
+        return
+    print(f"\n📊 {summary['new']} new | {summary['downloaded']} downloaded | "
+          f"{summary['unmatched']} without a {args.prefer} torrent | {summary['failed']} failed")
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Orpheus Collage Tools - Watch Scheduler
+Keeps a persisted queue of collages and crates to refresh on jittered
+intervals, so interactive lookups find warm data in the local cache
+and collage stores
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from .api import APIError, OrpheusAPI, RateLimiter
+from .cache import ResponseCache
+from .artist_index import load_artist_index
+from .collage_store import CollageStore, fetch_collage_store, store_path
+from .crates import crate_artists, find_crate, load_crate
+from .metrics import export_if_configured
+
+# Lower runs first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+DEFAULT_INTERVAL = 6 * 3600
+JITTER = 0.1
+KINDS = ("collage", "crate")
+
+
+def parse_interval(text: str) -> int:
+    """Seconds from '90', '30m', '6h' or '1d'"""
+    match = re.fullmatch(r"\s*(\d+)\s*([smhd]?)\s*", text.lower())
+    if not match:
+        raise ValueError(f"Invalid interval: {text}")
+    return int(match.group(1)) * {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}[match.group(2)]
+
+
+def format_interval(seconds: float) -> str:
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= size and seconds % size == 0:
+            return f"{int(seconds // size)}{unit}"
+    return f"{int(seconds)}s"
+
+
+async def refresh_collage(api: OrpheusAPI, target: str, config_dir: Path):
+    collage_id = int(target)
+    path = store_path(config_dir, collage_id)
+    await fetch_collage_store(api, path, collage_id)
+    index = load_artist_index(config_dir)
+    with CollageStore(path) as store:
+        index.add_many(store.artists)
+    index.save()
+
+
+async def refresh_crate(api: OrpheusAPI, target: str, config_dir: Path):
+    path = find_crate(config_dir, target)
+    if path is None:
+        raise APIError(f"Crate not found: {target}")
+    artists = crate_artists(load_crate(path))
+    index = load_artist_index(config_dir)
+    missing = []
+    for artist in artists:
+        try:
+            response = await index.fetch(artist, lambda name: api.ajax("artist", artistname=name), quiet=True)
+        except APIError:
+            missing.append(artist)
+        else:
+            index.add(response.get("name") or "")
+    index.save()
+    if artists and len(missing) == len(artists):
+        raise APIError(f"No artists of crate {target} could be refreshed")
+
+
+# kind -> coroutine that refetches the item (writing through the cache)
+REFRESHERS: Dict[str, Callable[[OrpheusAPI, str, Path], Awaitable[None]]] = {
+    "collage": refresh_collage,
+    "crate": refresh_crate,
+}
+
+
+class WatchScheduler:
+    """Persisted refresh queue stored in ``watch.json``"""
+
+    def __init__(self, path: Path, jitter: float = JITTER):
+        self.path = Path(path)
+        self.jitter = jitter
+        self.items: Dict[str, Dict] = {}
+        self.load()
+
+    @staticmethod
+    def key(kind: str, target: str) -> str:
+        return f"{kind}:{target}"
+
+    def load(self):
+        if self.path.exists():
+            with open(self.path, "r") as f:
+                self.items = json.load(f).get("items", {})
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"items": self.items}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def add(self, kind: str, target: str, interval: int = DEFAULT_INTERVAL) -> Dict:
+        item = self.items.setdefault(self.key(kind, target), {
+            "kind": kind,
+            "target": target,
+            "last_run": None,
+            "last_error": None,
+        })
+        item["interval"] = interval
+        item["priority"] = PRIORITY_BACKGROUND
+        # Spread first runs out instead of firing everything at once
+        item["next_run"] = time.time() + random.uniform(0, interval * self.jitter)
+        self.save()
+        return item
+
+    def remove(self, kind: str, target: str) -> bool:
+        removed = self.items.pop(self.key(kind, target), None) is not None
+        if removed:
+            self.save()
+        return removed
+
+    def request_refresh(self, kind: str, target: str) -> bool:
+        """Move a watched item to the front of the queue (e.g. the user is browsing it)"""
+        item = self.items.get(self.key(kind, target))
+        if item is None:
+            return False
+        item["priority"] = PRIORITY_INTERACTIVE
+        item["next_run"] = item["requested_at"] = time.time()
+        self.save()
+        return True
+
+    def due(self, now: Optional[float] = None) -> List[Dict]:
+        """Items whose next run has passed, most urgent first"""
+        now = time.time() if now is None else now
+        ready = [item for item in self.items.values() if item["next_run"] <= now]
+        return sorted(ready, key=lambda item: (item["priority"], item["next_run"]))
+
+    def next_wakeup(self) -> Optional[float]:
+        return min((item["next_run"] for item in self.items.values()), default=None)
+
+    def reschedule(self, item: Dict, error: Optional[str] = None):
+        now = time.time()
+        interval = item["interval"]
+        item["last_run"] = now
+        item["last_error"] = error
+        item["priority"] = PRIORITY_BACKGROUND
+        item["next_run"] = now + interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def run_due(self, api: OrpheusAPI, config_dir: Path, concurrency: int = 2) -> int:
+        """Refresh due items, taking the most urgent one each time a worker is free
+
+        ``watch.json`` is re-read before every pick and merged after every
+        job, so items added, removed or bumped by ``request_refresh`` in
+        another process are seen within the cycle. An item runs once per
+        cycle unless it is bumped again after its run started. All jobs
+        share ``api`` and therefore its request budget.
+        """
+        running = set()
+        started_at: Dict[str, float] = {}
+
+        def take() -> Optional[Dict]:
+            self.load()
+            for item in self.due():
+                key = self.key(item["kind"], item["target"])
+                if key in running or (item.get("requested_at") or 0) < started_at.get(key, 0):
+                    continue
+                running.add(key)
+                started_at[key] = time.time()
+                return item
+            return None
+
+        def finish(key: str, error: Optional[str] = None):
+            # Removed items stay removed; one bumped mid-run stays at the front
+            self.load()
+            current = self.items.get(key)
+            if current is not None and (current.get("requested_at") or 0) < started_at[key]:
+                self.reschedule(current, error)
+                self.save()
+            running.discard(key)
+
+        async def worker() -> int:
+            count = 0
+            while True:
+                item = take()
+                if item is None:
+                    return count
+                key = self.key(item["kind"], item["target"])
+                try:
+                    await REFRESHERS[item["kind"]](api, item["target"], config_dir)
+                except Exception as e:
+                    finish(key, str(e))
+                    print(f"⚠️  Refresh failed for {item['kind']} {item['target']}: {e}")
+                else:
+                    finish(key)
+                    print(f"🔄 Refreshed {item['kind']} {item['target']}")
+                count += 1
+
+        return sum(await asyncio.gather(*(worker() for _ in range(max(1, concurrency)))))
+
+    async def run_forever(self, api: OrpheusAPI, config_dir: Path, poll: float = 30.0, once: bool = False,
+                          after_cycle: Optional[Callable[[], None]] = None):
+        while True:
+            await self.run_due(api, config_dir)
+            if after_cycle is not None:
+                after_cycle()
+            if once:
+                return
+            wakeup = self.next_wakeup()
+            delay = poll if wakeup is None else max(1.0, min(poll, wakeup - time.time()))
+            await asyncio.sleep(delay)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Entry point for ``orpheus watch``"""
+    from .core import OrpheusTools
+
+    parser = argparse.ArgumentParser(prog="orpheus watch",
+                                     description="Refresh collages and crates in the background")
+    sub = parser.add_subparsers(dest="action", required=True)
+    add = sub.add_parser("add", help="Watch a collage or crate")
+    add.add_argument("kind", choices=KINDS)
+    add.add_argument("target", help="Collage ID or crate name")
+    add.add_argument("--every", default=format_interval(DEFAULT_INTERVAL),
+                     help="Refresh interval such as 30m, 6h or 1d (default: 6h)")
+    remove = sub.add_parser("remove", help="Stop watching a collage or crate")
+    remove.add_argument("kind", choices=KINDS)
+    remove.add_argument("target")
+    sub.add_parser("list", help="Show watched items")
+    run = sub.add_parser("run", help="Run the scheduler")
+    run.add_argument("--once", action="store_true", help="Refresh what is due, then exit")
+    args = parser.parse_args(argv)
+
+    tools = OrpheusTools()
+    scheduler = WatchScheduler(tools.config_dir / "watch.json")
+
+    if args.action == "add":
+        try:
+            interval = parse_interval(args.every)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        scheduler.add(args.kind, args.target, interval)
+        print(f"✅ Watching {args.kind} {args.target} every {format_interval(interval)}")
+    elif args.action == "remove":
+        if scheduler.remove(args.kind, args.target):
+            print(f"✅ Stopped watching {args.kind} {args.target}")
+        else:
+            print(f"❌ Not watched: {args.kind} {args.target}")
+            sys.exit(1)
+    elif args.action == "list":
+        if not scheduler.items:
+            print("📭 Nothing is being watched")
+            return
+        now = time.time()
+        for item in sorted(scheduler.items.values(), key=lambda i: i["next_run"]):
+            due_in = max(0, item["next_run"] - now)
+            status = f" ⚠️  {item['last_error']}" if item.get("last_error") else ""
+            print(f"  {item['kind']:<8} {item['target']:<30} every {format_interval(item['interval']):<5} "
+                  f"next in {format_interval(int(due_in))}{status}")
+    else:
+        config = tools.require_config()
+        # Background refreshes get a smaller budget than interactive use
+        rate = config.get("watch_rate_limit") or [2, 10]
+
+        async def run_scheduler():
+            async with OrpheusAPI.from_config(config, rate_limiter=RateLimiter(int(rate[0]), float(rate[1])),
+                                              cache=ResponseCache(tools.config_dir / "cache")) as api:
+                await scheduler.run_forever(api, tools.config_dir, once=args.once,
+                                            after_cycle=lambda: export_if_configured(config))
+
+        try:
+            asyncio.run(run_scheduler())
+        except KeyboardInterrupt:
+            print("\n👋 Watcher stopped")
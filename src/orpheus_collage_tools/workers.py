@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Orpheus Collage Tools - Parse Worker Pool
+Moves CPU-heavy JSON/HTML parsing and release grouping off the event loop
+into a process pool so concurrent fetches keep the network busy
+"""
+
+import os
+import json
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .releases import CompactRelease, group_releases
+
+# (group_id, name, year, release_type, [releases])
+CompactGroup = Tuple[int, str, int, int, List[CompactRelease]]
+
+
+def pool_size(config: Optional[Dict] = None) -> int:
+    """Worker count from the ``parse_workers`` config key (default: one per core)"""
+    configured = (config or {}).get("parse_workers")
+    if configured is not None:
+        return max(0, int(configured))
+    return os.cpu_count() or 1
+
+
+# Worker functions run in child processes. They take raw response bytes so
+# the event loop never parses, and return plain tuples that pickle compactly.
+
+def parse_artist_response(raw: bytes, cache_dir: Optional[str] = None,
+                          key: Optional[str] = None) -> Tuple[str, List[CompactGroup]]:
+    """Parse an ``action=artist`` response into (artist name, grouped releases)
+
+    A failure status raises ``LookupError`` with the tracker's message. With
+    ``cache_dir`` the payload is also written to the response cache under
+    ``key`` from here, so the full object tree never reaches the event loop.
+    """
+    data = json.loads(raw)
+    if data.get("status") != "success":
+        raise LookupError(data.get("error") or "artist request failed")
+    response = data.get("response") or {}
+    if cache_dir is not None and key is not None:
+        from .cache import ResponseCache
+
+        ResponseCache(cache_dir).put(key, response)
+    return compact_artist(response)
+
+
+def compact_artist(response: Dict) -> Tuple[str, List[CompactGroup]]:
+    """Group an already-parsed ``action=artist`` payload"""
+    groups = []
+    for group in response.get("torrentgroup") or []:
+        groups.append((
+            int(group.get("groupId") or 0),
+            group.get("groupName") or "",
+            int(group.get("groupYear") or 0),
+            int(group.get("releaseType") or 0),
+            group_releases(group.get("torrent") or [], group),
+        ))
+    return response.get("name") or "", groups
+
+
+def compact_collage(response: Dict) -> Tuple[str, List[CompactGroup]]:
+    """Group an ``action=collage`` payload (or a streamed batch of its groups)"""
+    groups = []
+    for group in response.get("torrentgroups") or []:
+        groups.append((
+            int(group.get("id") or 0),
+            group.get("name") or "",
+            int(group.get("year") or 0),
+            int(group.get("releaseType") or 0),
+            group_releases(group.get("torrents") or [], group),
+        ))
+    return response.get("name") or "", groups
+
+
+def parse_group_response(raw: bytes) -> CompactGroup:
+    """Parse an ``action=torrentgroup`` response into one grouped entry (``LookupError`` on a failure status)"""
+    data = json.loads(raw)
+    if data.get("status") != "success":
+        raise LookupError(data.get("error") or "torrentgroup request failed")
+    return compact_group(data.get("response") or {})
+
+
+def compact_group(response: Dict) -> CompactGroup:
+    """Group an already-parsed ``action=torrentgroup`` payload"""
+    group = response.get("group") or {}
+    return (
+        int(group.get("id") or 0),
+        group.get("name") or "",
+        int(group.get("year") or 0),
+        int(group.get("releaseType") or 0),
+        group_releases(response.get("torrents") or [], group),
+    )
+
+
+class ParsePool:
+    """Process pool for parse/group work, usable as an async context manager
+
+    With ``max_workers=0`` work runs inline, which is cheaper for one-off
+    lookups where process start-up would dominate.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = pool_size() if max_workers is None else max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _ensure_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def run(self, func: Callable, *args) -> Any:
+        """Run ``func(*args)`` in a worker process without blocking the loop"""
+        if self.max_workers == 0:
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._ensure_executor(), func, *args)
+
+    async def map(self, func: Callable, items: Iterable) -> List[Any]:
+        """Run ``func`` over ``items`` concurrently, preserving order"""
+        return await asyncio.gather(*(self.run(func, item) for item in items))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
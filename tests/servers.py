@@ -0,0 +1,25 @@
+"""Local stand-in servers for the tracker and torrent clients"""
+
+import socket
+from contextlib import asynccontextmanager
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+
+@asynccontextmanager
+async def serve(app: web.Application):
+    """Run ``app`` on a free local port for the duration of the block"""
+    server = TestServer(app)
+    await server.start_server()
+    try:
+        yield server
+    finally:
+        await server.close()
+
+
+def closed_port() -> int:
+    """A local port nothing listens on"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
@@ -0,0 +1,88 @@
+"""Artist index: the exact spelling goes first, corrections only for unknown names"""
+
+import time
+import asyncio
+
+import pytest
+
+from orpheus_collage_tools.api import FailureStatus
+from orpheus_collage_tools.artist_index import MISS_MAX_AGE, ArtistIndex, normalize_artist
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = ArtistIndex(tmp_path / "artist_index.json")
+    index.add_many(["Muse", "Slayer", "Blur", "Led Zeppelin"])
+    return index
+
+
+def lookups(known):
+    """A stand-in tracker that only knows ``known``, recording what was asked"""
+    sent = []
+
+    async def fetch(name):
+        sent.append(name)
+        if name not in known:
+            raise FailureStatus("no artist found")
+        return {"name": name}
+
+    return sent, fetch
+
+
+@pytest.mark.parametrize("name", ["Mase", "Player", "Bluer"])
+def test_real_artists_are_not_rewritten(index, name):
+    sent, fetch = lookups({name, "Muse", "Slayer", "Blur"})
+    assert asyncio.run(index.fetch(name, fetch, quiet=True)) == {"name": name}
+    assert sent == [name]
+
+
+def test_unknown_name_is_corrected(index):
+    sent, fetch = lookups({"Led Zeppelin"})
+    assert asyncio.run(index.fetch("Led Zepplin", fetch, quiet=True)) == {"name": "Led Zeppelin"}
+    assert sent == ["Led Zepplin", "Led Zeppelin"]
+
+
+def test_unknown_name_without_correction_fails(index):
+    sent, fetch = lookups(set())
+    with pytest.raises(FailureStatus):
+        asyncio.run(index.fetch("Nobody Known", fetch, quiet=True))
+    assert sent == ["Nobody Known"]
+
+
+def test_normalize_artist():
+    assert normalize_artist("The Beatles") == normalize_artist("Beatles, The") == "beatles"
+    assert normalize_artist("Simon & Garfunkel") == "simon and garfunkel"
+    assert normalize_artist("Björk") == "bjork"
+
+
+def test_repeated_typo_is_corrected_offline(index, tmp_path):
+    sent, fetch = lookups({"Led Zeppelin"})
+    asyncio.run(index.fetch("Led Zepplin", fetch, quiet=True))
+    index.save()
+
+    # A later run remembers that the tracker rejected the typo
+    again = ArtistIndex(tmp_path / "artist_index.json")
+    assert asyncio.run(again.fetch("led zepplin", fetch, quiet=True)) == {"name": "Led Zeppelin"}
+    assert sent == ["Led Zepplin", "Led Zeppelin", "Led Zeppelin"]
+
+
+def test_miss_without_correction_is_asked_again(index):
+    sent, fetch = lookups(set())
+    for _ in range(2):
+        with pytest.raises(FailureStatus):
+            asyncio.run(index.fetch("Nobody Known", fetch, quiet=True))
+    assert sent == ["Nobody Known", "Nobody Known"]
+
+
+def test_misses_expire(index):
+    sent, fetch = lookups({"Led Zeppelin", "Led Zepplin"})
+    index.misses[normalize_artist("Led Zepplin")] = time.time() - MISS_MAX_AGE - 1
+    # The tracker has since learned the name, and it is asked as typed again
+    assert asyncio.run(index.fetch("Led Zepplin", fetch, quiet=True)) == {"name": "Led Zepplin"}
+    assert sent == ["Led Zepplin"]
+
+
+def test_seen_artist_is_no_longer_a_miss(index):
+    index.add_miss("Led Zepplin")
+    index.add("Led Zepplin")
+    assert not index.is_miss("Led Zepplin")
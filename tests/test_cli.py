@@ -0,0 +1,106 @@
+"""Command dispatch: every platform takes the same in-process path"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+from orpheus_collage_tools import cli, core
+
+
+class FakeTools:
+    """OrpheusTools stand-in that records external script runs"""
+
+    instances = []
+    metrics_path = None
+
+    def __init__(self, system=None):
+        self.system = system
+        self.commands = []
+        # Any existing file: configuration is treated as done
+        self.config_file = Path(__file__)
+        FakeTools.instances.append(self)
+
+    def check_config(self):
+        return True
+
+    def load_config(self):
+        return {"metrics_textfile": self.metrics_path} if self.metrics_path else {}
+
+    def run_command(self, command, *args):
+        self.commands.append((command,) + args)
+
+    def show_help(self):
+        pass
+
+
+@pytest.fixture
+def tools(monkeypatch):
+    FakeTools.instances = []
+    monkeypatch.setattr(core, "OrpheusTools", FakeTools)
+    return FakeTools.instances
+
+
+@pytest.mark.parametrize("system", ["darwin", "linux", "windows"])
+def test_sync_runs_in_process(tools, monkeypatch, system):
+    from orpheus_collage_tools import sync
+
+    calls = []
+    monkeypatch.setattr(sync, "main", calls.append)
+    cli.main(["sync", "6936", "--prefer-flac"], system=system)
+
+    assert calls == [["6936", "--prefer-flac"]]
+    assert tools[0].system == system
+    assert tools[0].commands == []
+
+
+def test_darwin_plan_runs_in_process(tools, monkeypatch):
+    from orpheus_collage_tools import planner
+
+    calls = []
+    monkeypatch.setattr(planner, "main", calls.append)
+    cli.main(["plan", "collage", "6936", "--budget", "300GB"], system="Darwin")
+
+    assert calls == [["collage", "6936", "--budget", "300GB"]]
+    assert tools[0].commands == []
+
+
+@pytest.mark.parametrize("system", ["darwin", "linux"])
+def test_crate_without_action_prints_usage(tools, capsys, system):
+    cli.main(["crate"], system=system)
+
+    assert "Crate Commands" in capsys.readouterr().out
+    assert tools[0].commands == []
+
+
+def test_crate_actions_translate(tools):
+    cli.main(["crate", "download", "Funk Masters"], system="darwin")
+    assert tools[0].commands == [("download_crate", "--download-crate", "Funk Masters")]
+
+
+def test_crate_args():
+    assert cli.crate_args([]) is None
+    assert cli.crate_args(["list"]) == ["--list-crates"]
+    assert cli.crate_args(["create"]) is None
+    assert cli.crate_args(["--list-crates"]) == ["--list-crates"]
+
+
+def test_unsupported_platform_exits(tools):
+    with pytest.raises(SystemExit):
+        cli.main(["sync"], system="plan9")
+    assert tools == []
+
+
+def test_metrics_exported_after_in_process_command(tools, monkeypatch, tmp_path):
+    from orpheus_collage_tools import sync
+
+    monkeypatch.setattr(FakeTools, "metrics_path", str(tmp_path / "orpheus.prom"))
+
+    def failing_sync(args):
+        sys.exit(1)
+
+    monkeypatch.setattr(sync, "main", failing_sync)
+    with pytest.raises(SystemExit):
+        cli.main(["sync", "6936", "--prefer-flac"], system="darwin")
+    assert "orpheus_requests_total" in (tmp_path / "orpheus.prom").read_text()
+
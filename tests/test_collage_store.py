@@ -0,0 +1,111 @@
+"""Columnar collage store: round trip, filters with and without NumPy, best rows"""
+
+import pytest
+
+from orpheus_collage_tools import collage_store
+from orpheus_collage_tools.collage_store import CollageStore, write_collage_store
+
+FILTERS = [
+    {},
+    {"format": "FLAC"},
+    {"format": ["flac", "MP3"], "media": "CD"},
+    {"encoding": ["320", "V0 (VBR)"], "min_seeders": 5},
+    {"max_size": 400},
+    {"format": "FLAC", "min_seeders": 1, "max_size": 500},
+    {"media": "Cassette"},
+]
+
+
+def torrent(torrent_id, fmt, encoding, media, size, seeders):
+    return {"torrentid": torrent_id, "format": fmt, "encoding": encoding, "media": media,
+            "size": size, "seeders": seeders}
+
+
+GROUPS = [
+    {"id": 1, "name": "Reign in Blood", "year": 1986,
+     "musicInfo": {"artists": [{"name": "Slayer"}]},
+     "torrents": [torrent(11, "FLAC", "Lossless", "CD", 300, 12),
+                  torrent(12, "MP3", "320", "CD", 100, 30),
+                  torrent(13, "FLAC", "24bit Lossless", "Vinyl", 900, 0)]},
+    {"id": 2, "name": "Jóga", "year": 1997,
+     "musicInfo": {"artists": [{"name": "Björk"}]},
+     "torrents": [torrent(21, "MP3", "V0 (VBR)", "WEB", 80, 5),
+                  torrent(22, "FLAC", "Lossless", "WEB", 400, 5)]},
+    {"id": 3, "name": "Split", "year": 2001,
+     "musicInfo": {"artists": [{"name": "A"}, {"name": "B"}, {"name": "C"}]},
+     "torrents": [torrent(31, "MP3", "320", "CD", 120, 2)]},
+]
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / "collage_9.occ"
+    assert write_collage_store(path, 9, "Thrash & More", GROUPS) == 6
+    return path
+
+
+def expected(store, format=None, encoding=None, media=None, min_seeders=0, max_size=None):
+    """What ``where`` should return, checked row by row"""
+    def wanted(value, values):
+        if values is None:
+            return True
+        values = [values] if isinstance(values, str) else values
+        return value.lower() in {v.lower() for v in values}
+
+    rows = []
+    for i in range(store.rows):
+        row = store.row(i)
+        if (wanted(row["format"], format) and wanted(row["encoding"], encoding) and wanted(row["media"], media)
+                and row["seeders"] >= min_seeders and (max_size is None or row["size"] <= max_size)):
+            rows.append(i)
+    return rows
+
+
+def test_round_trip(path):
+    with CollageStore(path) as store:
+        assert (store.collage_id, store.name, store.rows) == (9, "Thrash & More", 6)
+        assert store.group_ids() == {1, 2, 3}
+        assert store.artists == ["Slayer", "Björk", "A", "B", "C"]
+        assert store.row(3) == {"group_id": 2, "torrent_id": 21, "size": 80, "seeders": 5, "year": 1997,
+                                "format": "MP3", "encoding": "V0 (VBR)", "media": "WEB",
+                                "name": "Jóga", "artist": "Björk"}
+        assert store.row(5)["artist"] == "Various Artists"
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_where_without_numpy(path, monkeypatch, filters):
+    monkeypatch.setattr(collage_store, "numpy", None)
+    with CollageStore(path) as store:
+        assert store.where(**filters) == expected(store, **filters)
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_where_with_numpy(path, filters):
+    pytest.importorskip("numpy")
+    with CollageStore(path) as store:
+        assert store.where(**filters) == expected(store, **filters)
+
+
+def test_best_per_group(path):
+    with CollageStore(path) as store:
+        # Best-seeded torrent of each album, in row order
+        assert [store.row(i)["torrent_id"] for i in store.best_per_group(range(store.rows))] == [12, 21, 31]
+        flac = store.where(format="FLAC")
+        assert [store.row(i)["torrent_id"] for i in store.best_per_group(flac)] == [11, 22]
+
+
+def test_empty_store(tmp_path):
+    path = tmp_path / "collage_1.occ"
+    assert write_collage_store(path, 1, "Empty", []) == 0
+    with CollageStore(path) as store:
+        assert store.rows == 0
+        assert store.group_ids() == set()
+        assert store.where(format="FLAC", min_seeders=1) == []
+        assert store.best_per_group(store.where()) == []
+
+
+def test_not_a_store(tmp_path):
+    path = tmp_path / "bogus.occ"
+    path.write_bytes(b"not a store at all")
+    with pytest.raises(ValueError):
+        CollageStore(path)
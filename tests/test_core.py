@@ -0,0 +1,32 @@
+"""External script runs and how they are counted"""
+
+import pytest
+
+from orpheus_collage_tools.core import OrpheusTools
+from orpheus_collage_tools.metrics import JOBS
+
+
+@pytest.mark.parametrize("code, status", [(0, "success"), (2, "usage_error"), (1, "failed")])
+def test_run_command_status(tmp_path, monkeypatch, code, status):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.delenv("ORPHEUS_METRICS_TEXTFILE", raising=False)
+    tools = OrpheusTools()
+    tools.lib_dir = tmp_path
+    (tmp_path / "exits.py").write_text(f"import sys\nsys.exit({code})\n")
+
+    before = JOBS.value(command="exits", status=status)
+    tools.run_command("exits")
+    assert JOBS.value(command="exits", status=status) == before + 1
+
+
+def test_require_config(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    tools = OrpheusTools()
+    with pytest.raises(SystemExit) as exit_info:
+        tools.require_config()
+    assert exit_info.value.code == 1
+    assert "No configuration found" in capsys.readouterr().err
+
+    tools.config_file.parent.mkdir(parents=True, exist_ok=True)
+    tools.config_file.write_text('{"api_key": "key"}')
+    assert tools.require_config() == {"api_key": "key"}
@@ -0,0 +1,107 @@
+"""Crate coverage: offline resolution, what is downloaded and which collages fill the gaps"""
+
+import pytest
+
+from orpheus_collage_tools.artist_index import ArtistIndex
+from orpheus_collage_tools.cache import ResponseCache, cache_key
+from orpheus_collage_tools.collage_store import store_path, write_collage_store
+from orpheus_collage_tools.coverage import (Coverage, crate_coverage, downloaded_groups, fill_order,
+                                            resolve_offline)
+from orpheus_collage_tools.crates import CrateMatches
+from orpheus_collage_tools.sinks import DownloadLedger, TorrentItem
+from orpheus_collage_tools.sync import SyncState
+
+CRATE = {"name": "Heavy", "albums": [
+    {"artist": "Slayer", "album": "Reign in Blood"},
+    {"artist": "slayer", "album": "South of Heaven", "year": 1988},
+    {"artist": "Led Zepplin", "album": "IV"},
+    {"group_id": 9},
+    {"artist": "Nobody Known", "album": "Demo"},
+]}
+
+
+def discography(name, *groups):
+    return {"name": name, "torrentgroup": [
+        {"groupId": group_id, "groupName": title, "groupYear": year, "releaseType": 1, "torrent": []}
+        for group_id, title, year in groups
+    ]}
+
+
+@pytest.fixture
+def config_dir(tmp_path):
+    cache = ResponseCache(tmp_path / "cache")
+    cache.put(cache_key("artist", artistname="Slayer"),
+              discography("Slayer", (1, "Reign in Blood", 1986), (2, "South of Heaven", 1988)))
+    cache.put(cache_key("artist", artistname="Led Zeppelin"),
+              discography("Led Zeppelin", (3, "IV", 1971), (4, "Houses of the Holy", 1973)))
+    return tmp_path
+
+
+@pytest.fixture
+def index(config_dir):
+    index = ArtistIndex(config_dir / "artist_index.json")
+    index.add_many(["Slayer", "Led Zeppelin"])
+    return index
+
+
+def group_ids(entries):
+    return [group_id for _entry, group_id in entries]
+
+
+def test_resolve_offline(config_dir, index):
+    assert group_ids(resolve_offline(config_dir, CRATE, index)) == [1, 2, 3, 9, None]
+
+
+def test_resolve_offline_without_index_keeps_typos_unresolved(config_dir):
+    assert group_ids(resolve_offline(config_dir, CRATE)) == [1, 2, None, 9, None]
+
+
+def test_resolve_offline_prefers_stored_matches(config_dir, index):
+    matches = CrateMatches(config_dir / "matches.json", CRATE)
+    matches.record(CRATE["albums"][4], (12, "Demo", 1999, 1, []))
+    assert group_ids(resolve_offline(config_dir, CRATE, index, matches)) == [1, 2, 3, 9, 12]
+
+
+def test_downloaded_groups(config_dir):
+    assert downloaded_groups(config_dir) == set()
+    DownloadLedger(config_dir / "downloads.jsonl").record([TorrentItem(10, 1, "Reign in Blood", b"")], "folder")
+    state = SyncState.load(config_dir / "sync", 50)
+    state.downloads = {2: 20}
+    state.save()
+    assert downloaded_groups(config_dir) == {1, 2}
+
+
+def coverage(downloaded, collages):
+    """Coverage of six albums (group IDs 1-6)"""
+    entries = [({}, group_id) for group_id in range(1, 7)]
+    named = {collage_id: (f"Collage {collage_id}", set(groups)) for collage_id, groups in collages.items()}
+    return Coverage(entries, set(downloaded), named, {})
+
+
+def test_fill_order_is_greedy_set_cover():
+    cover = coverage({1}, {100: {2, 3, 4}, 101: {4, 5}, 102: {5, 6}, 103: {1, 2}})
+    assert fill_order(cover) == [(100, "Collage 100", {2, 3, 4}), (102, "Collage 102", {5, 6})]
+    assert fill_order(cover, limit=1) == [(100, "Collage 100", {2, 3, 4})]
+
+
+def test_fill_order_breaks_ties_by_collage_id_and_skips_useless_collages():
+    cover = coverage({1, 2, 3, 4}, {104: {5}, 103: {6}, 105: {1, 2}})
+    assert [collage_id for collage_id, _name, _filled in fill_order(cover)] == [103, 104]
+    assert fill_order(coverage(range(1, 7), {100: {1, 2}})) == []
+
+
+def test_crate_coverage(config_dir, index):
+    write_collage_store(store_path(config_dir, 70), 70, "Thrash", [
+        {"id": group_id, "name": "x", "torrents": [{"id": group_id * 10, "format": "FLAC", "size": 1}]}
+        for group_id in (2, 3, 40)
+    ])
+    synced = SyncState.load(config_dir / "sync", 80)
+    synced.name, synced.groups, synced.downloads = "Synced", {9, 41}, {9: 90}
+    synced.save()
+
+    result = crate_coverage(config_dir, resolve_offline(config_dir, CRATE, index))
+    assert result.groups == {1, 2, 3, 9}
+    assert result.downloaded == {9}
+    assert result.collages == {70: ("Thrash", {2, 3}), 80: ("Synced", {9})}
+    assert result.gaps == {1, 2, 3}
+    assert fill_order(result) == [(70, "Thrash", {2, 3})]
@@ -0,0 +1,131 @@
+"""Crates: one lookup per artist, and matches reused, expired and re-chosen under the crate's preferences"""
+
+import time
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from orpheus_collage_tools.api import OrpheusAPI, RateLimiter
+from orpheus_collage_tools.artist_index import normalize_artist
+from orpheus_collage_tools.crates import (MATCH_MAX_AGE, MISS_MAX_AGE, CrateMatches, preferred_torrent,
+                                          resolve_crate)
+from orpheus_collage_tools.resilience import CircuitBreaker
+from servers import serve
+
+ENTRY = {"artist": "Slayer", "album": "Reign in Blood", "year": 1986}
+# (group_id, name, year, release_type, releases)
+GROUP = (7, "Reign in Blood", 1986, 1, [
+    (1986, "", "Def Jam", "", "Vinyl", [(71, "FLAC", "24bit Lossless", 900, 4),
+                                        (72, "MP3", "320", 100, 30)]),
+    (1986, "", "Def Jam", "", "CD", [(73, "FLAC", "Lossless", 300, 12),
+                                     (74, "MP3", "V0 (VBR)", 80, 0)]),
+])
+
+
+def crate(**preferences):
+    return {"name": "Thrash", "preferences": preferences, "albums": [ENTRY]}
+
+
+@pytest.fixture
+def matches(tmp_path):
+    return CrateMatches(tmp_path / "matches.json", crate(encoding="flac"))
+
+
+@pytest.mark.parametrize("preferences, torrent_id", [
+    ({"encoding": "flac"}, 73),
+    ({"encoding": "flac", "media": "vinyl"}, 71),
+    ({"encoding": "320"}, 72),
+    # The only V0 has no seeders, but it is still the only fit
+    ({"encoding": "v0"}, 74),
+    ({}, 72),
+])
+def test_preferred_torrent(preferences, torrent_id):
+    assert preferred_torrent(GROUP, preferences)[0] == torrent_id
+
+
+def test_preferred_torrent_without_a_fit():
+    group = GROUP[:4] + ([GROUP[4][0][:5] + ([(72, "MP3", "320", 100, 30)],)],)
+    assert preferred_torrent(group, {"encoding": "flac"}) is None
+
+
+def test_match_is_reused_until_it_expires(matches):
+    matches.record(ENTRY, GROUP)
+    matches.save()
+
+    reloaded = CrateMatches(matches.path, crate(encoding="flac"))
+    match = reloaded.lookup(ENTRY)
+    assert match["group"][0] == 7 and match["torrent"][0] == 73
+    assert not reloaded.dirty
+
+    reloaded.entries[next(iter(reloaded.entries))]["at"] = time.time() - MATCH_MAX_AGE - 1
+    assert reloaded.lookup(ENTRY) is None
+
+
+def test_misses_expire_sooner(matches):
+    matches.record(ENTRY, None)
+    match = matches.lookup(ENTRY)
+    assert match is not None and match["group"] is None
+
+    matches.entries[next(iter(matches.entries))]["at"] = time.time() - MISS_MAX_AGE - 1
+    assert matches.lookup(ENTRY) is None
+
+
+def test_new_preferences_rechoose_the_torrent(matches):
+    matches.record(ENTRY, GROUP)
+    recorded_at = matches.entries[next(iter(matches.entries))]["at"]
+    matches.save()
+
+    changed = CrateMatches(matches.path, crate(encoding="320"))
+    match = changed.lookup(ENTRY)
+    assert match["group"][0] == 7
+    assert match["torrent"][0] == 72
+    assert match["preferences"] == changed.preference_hash != matches.preference_hash
+    # The group was not looked up again, so its age carries over
+    assert match["at"] == recorded_at
+    assert changed.dirty
+
+
+def test_unnamed_crates_keep_separate_matches(tmp_path):
+    unnamed = {"albums": [ENTRY]}
+    first = CrateMatches.for_crate(tmp_path, tmp_path / "crates" / "a.json", unnamed)
+    second = CrateMatches.for_crate(tmp_path, tmp_path / "other" / "a.json", unnamed)
+    assert first.path != second.path
+    assert first.path == CrateMatches.for_crate(tmp_path, tmp_path / "crates" / "a.json", unnamed).path
+
+    first.record(ENTRY, GROUP)
+    first.save()
+    assert CrateMatches.for_crate(tmp_path, tmp_path / "other" / "a.json", unnamed).lookup(ENTRY) is None
+
+
+def test_one_artist_request_per_artist():
+    asked = []
+
+    async def ajax(request):
+        name = request.query["artistname"]
+        asked.append(name)
+        albums = {"Beatles": ["Abbey Road", "Revolver"], "Björk": ["Homogenic"]}
+        for key, titles in albums.items():
+            if normalize_artist(name) == normalize_artist(key):
+                return web.json_response({"status": "success", "response": {"name": key, "torrentgroup": [
+                    {"groupId": n, "groupName": title, "groupYear": 1970, "releaseType": 1, "torrent": []}
+                    for n, title in enumerate(titles, 1)
+                ]}})
+        return web.json_response({"status": "failure", "error": "no artist found"})
+
+    albums = [{"artist": artist, "album": album} for artist, album in [
+        ("The Beatles", "Abbey Road"), ("Beatles, The", "Revolver"), ("beatles", "Abbey Road"),
+        ("Björk", "Homogenic"), ("BJORK", "Homogenic"),
+    ]]
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/ajax.php", ajax)
+        async with serve(app) as server, \
+                OrpheusAPI("key", base_url=str(server.make_url("")), rate_limiter=RateLimiter(100, 1.0),
+                           breaker=CircuitBreaker()) as api:
+            return await resolve_crate(api, {"albums": albums})
+
+    resolved = asyncio.run(run())
+    assert [group[0] for _entry, group in resolved] == [1, 2, 1, 1, 1]
+    assert sorted(normalize_artist(name) for name in asked) == ["beatles", "bjork"]
@@ -0,0 +1,62 @@
+"""Streaming array parser: every chunk boundary gives the same elements"""
+
+import json
+
+import pytest
+
+from orpheus_collage_tools.jsonstream import JSONArrayStream
+
+DOCUMENT = {
+    "status": "success",
+    "response": {
+        "name": "Café \"Classics\"",
+        "torrentgroups": [-2500.5, 12, 1.5e-3, -7, True, None, "a,b]\\", {"id": 1, "tags": ["x", "y"]},
+                          [3, 4], 0, 1e5],
+        "after": {"page": 2},
+    },
+}
+BODY = json.dumps(DOCUMENT, ensure_ascii=False).encode("utf-8")
+EXPECTED = DOCUMENT["response"]["torrentgroups"]
+
+
+def stream(chunks):
+    parser = JSONArrayStream(("response", "torrentgroups"))
+    items = []
+    for chunk in chunks:
+        items += parser.feed(chunk)
+    items += parser.finish()
+    return parser, items
+
+
+@pytest.mark.parametrize("split", range(1, len(BODY)))
+def test_every_split_point(split):
+    parser, items = stream([BODY[:split], BODY[split:]])
+    assert items == EXPECTED
+    assert parser.document["response"]["after"] == {"page": 2}
+    assert parser.document["response"]["torrentgroups"] == []
+
+
+def test_byte_by_byte():
+    _parser, items = stream(BODY[i:i + 1] for i in range(len(BODY)))
+    assert items == EXPECTED
+
+
+def test_number_split_at_decimal_point():
+    parser = JSONArrayStream(("response", "torrentgroups"))
+    assert parser.feed(b'{"response": {"torrentgroups": [1, -2500.') == [1]
+    assert parser.feed(b"5") == []
+    assert parser.feed(b", 3]}}") == [-2500.5, 3]
+    assert parser.finish() == []
+
+
+def test_head_before_array():
+    parser = JSONArrayStream(("response", "torrentgroups"))
+    parser.feed(BODY[:BODY.index(b"[") + 1])
+    assert parser.head["response"]["name"] == DOCUMENT["response"]["name"]
+
+
+def test_cut_off_document():
+    parser = JSONArrayStream(("response", "torrentgroups"))
+    parser.feed(BODY[:len(BODY) // 2])
+    with pytest.raises(ValueError):
+        parser.finish()
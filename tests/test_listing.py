@@ -0,0 +1,72 @@
+"""Artist listings: parsing in the pool, cache first, stale marking"""
+
+import json
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from orpheus_collage_tools.api import OrpheusAPI, RateLimiter
+from orpheus_collage_tools.cache import ResponseCache
+from orpheus_collage_tools.listing import artist_records
+from orpheus_collage_tools.resilience import CircuitBreaker
+from orpheus_collage_tools.workers import ParsePool
+from servers import serve
+
+TORRENT = {"id": 11, "media": "CD", "format": "FLAC", "encoding": "Lossless", "size": 300_000_000, "seeders": 4,
+           "remasterYear": 1996, "remasterTitle": "", "remasterRecordLabel": "Def Jam", "remasterCatalogueNumber": ""}
+
+
+def tracker():
+    app = web.Application()
+    seen = []
+
+    async def ajax(request):
+        seen.append(request.query["artistname"])
+        if request.query["artistname"] != "Nas":
+            return web.json_response({"status": "failure", "error": "no artist found"})
+        groups = [{"groupId": 1, "groupName": "It Was Written", "groupYear": 1996, "releaseType": 1,
+                   "torrent": [TORRENT]}]
+        return web.json_response({"status": "success", "response": {"id": 7, "name": "Nas", "torrentgroup": groups}})
+
+    app.router.add_get("/ajax.php", ajax)
+    return app, seen
+
+
+def lookup(cache_dir, workers):
+    async def run():
+        app, seen = tracker()
+        async with serve(app) as server, \
+                OrpheusAPI("key", base_url=str(server.make_url("")), rate_limiter=RateLimiter(100, 1.0),
+                           cache=ResponseCache(cache_dir), breaker=CircuitBreaker()) as api, \
+                ParsePool(workers) as pool:
+            records = [record async for record in artist_records(api, pool, "Nas")]
+            return records, seen
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("workers", [0, 1])
+def test_parsed_in_pool_and_cached(tmp_path, workers):
+    records, seen = lookup(tmp_path, workers)
+    assert seen == ["Nas"]
+    assert [(artist, group[0], group[1]) for artist, group, _extra in records] == [("Nas", 1, "It Was Written")]
+
+    # Written to the cache by the parser; the second lookup sends nothing
+    records, seen = lookup(tmp_path, workers)
+    assert seen == []
+    assert records[0][2] == {}
+
+
+def test_stale_copy_is_marked(tmp_path):
+    lookup(tmp_path, 0)
+    for path in tmp_path.glob("*/*.json"):
+        entry = json.loads(path.read_text())
+        entry["stored_at"] -= 7 * 3600
+        path.write_text(json.dumps(entry))
+
+    records, seen = lookup(tmp_path, 0)
+    assert records[0][2]["stale"] is True
+    assert records[0][2]["cached_age"] >= 7 * 3600
+    # Refreshed in the background before the session closed
+    assert seen == ["Nas"]
@@ -0,0 +1,41 @@
+"""Targeted HTML parsing on the bundled sample collage page"""
+
+import pytest
+
+from orpheus_collage_tools.parsing import (SAMPLE_PAGES, benchmark, parse_collage_list, parse_group_ids,
+                                           parse_page_count, parse_size, parse_torrent_groups)
+
+
+@pytest.fixture(scope="module")
+def html():
+    return (SAMPLE_PAGES / "collage.html").read_text(encoding="utf-8")
+
+
+def test_torrent_groups(html):
+    groups = parse_torrent_groups(html)
+    assert len(groups) == 40
+    first = groups[0]
+    assert (first["group_id"], first["artist"], first["year"]) == (100000, "MC Lyte", 1992)
+    assert [t["torrent_id"] for t in first["torrents"]] == [2000001, 2000002, 2000003, 2000004]
+    assert first["torrents"][0]["edition"] == "1992 - Cold Chillin' / CD"
+    assert first["torrents"][0]["seeders"] == 88
+
+
+def test_group_ids_skip_torrent_links(html):
+    ids = parse_group_ids(html)
+    assert ids == [group["group_id"] for group in parse_torrent_groups(html)]
+
+
+def test_collage_list_and_pages(html):
+    assert [c["collage_id"] for c in parse_collage_list(html)] == [1412, 2290, 5120]
+    assert parse_page_count(html) == 3
+
+
+def test_parse_size():
+    assert parse_size("1.5 GB") == int(1.5 * 1024 ** 3)
+    assert parse_size("n/a") == 0
+
+
+def test_benchmark_runs_on_sample():
+    (result,) = benchmark(sorted(SAMPLE_PAGES.glob("*.html")), repeat=1)
+    assert set(result["seconds"]) == {"full_soup", "torrent_groups", "group_ids", "collage_list"}
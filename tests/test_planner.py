@@ -0,0 +1,65 @@
+"""Download planner: coverage first, then upgrades within the budget"""
+
+import asyncio
+
+from orpheus_collage_tools.crates import CrateMatches
+from orpheus_collage_tools.planner import Album, Option, crate_albums, parse_budget, plan_downloads
+
+MB = 1024 ** 2
+
+
+def option(torrent_id, size_mb, score):
+    return Option(torrent_id, "FLAC", "Lossless", "CD", size_mb * MB, 10, score)
+
+
+def test_coverage_beats_upgrades():
+    # Upgrading A to FLAC would leave no room for B, which only has a FLAC
+    a = Album(1, "A", "A", 2000, [option(11, 100, 0.45), option(12, 150, 1.0)])
+    b = Album(2, "B", "B", 2000, [option(21, 900, 1.0)])
+    plan = plan_downloads([a, b], parse_budget("1GB"))
+
+    assert set(plan.chosen) == {1, 2}
+    assert plan.chosen[1][1].torrent_id == 11
+    assert plan.chosen[2][1].torrent_id == 21
+    assert not plan.skipped
+    assert plan.total <= plan.budget
+
+
+def test_leftover_goes_to_upgrades():
+    a = Album(1, "A", "A", 2000, [option(11, 100, 0.45), option(12, 150, 1.0)])
+    b = Album(2, "B", "B", 2000, [option(21, 800, 1.0)])
+    plan = plan_downloads([a, b], parse_budget("1GB"))
+
+    assert plan.chosen[1][1].torrent_id == 12
+    assert plan.chosen[2][1].torrent_id == 21
+
+
+def test_skipped_and_unavailable():
+    small = Album(1, "A", "A", 2000, [option(11, 300, 1.0)])
+    large = Album(2, "B", "B", 2000, [option(21, 900, 1.0)])
+    dead = Album(3, "C", "C", 2000, [])
+    plan = plan_downloads([large, small, dead], parse_budget("1GB"))
+
+    assert set(plan.chosen) == {1}
+    assert plan.skipped == [large]
+    assert plan.unavailable == [dead]
+
+
+def test_crate_albums_are_planned_once(tmp_path):
+    # (group_id, name, year, release_type, releases)
+    group = (7, "Reign in Blood", 1986, 1, [(1986, "", "", "", "CD", [(71, "FLAC", "Lossless", 300 * MB, 12)])])
+    crate = {"albums": [{"artist": "Slayer", "album": "Reign in Blood"},
+                        {"artist": "slayer", "album": "reign in blood"},
+                        {"group_id": 7},
+                        {"artist": "Nobody", "album": "Demo"}]}
+    matches = CrateMatches(tmp_path / "matches.json", crate)
+    for entry in crate["albums"][:3]:
+        matches.record(entry, group)
+    matches.record(crate["albums"][3], None)
+
+    # Every entry has a stored match, so nothing is asked of the tracker
+    albums, unresolved = asyncio.run(crate_albums(None, crate, "flac", None, 1, matches=matches))
+    assert [album.group_id for album in albums] == [7]
+    assert unresolved == [crate["albums"][3]]
+    plan = plan_downloads(albums, parse_budget("1GB"))
+    assert plan.total == 300 * MB
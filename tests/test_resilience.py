@@ -0,0 +1,281 @@
+"""Retries and circuit breaking against a fault-injecting stand-in tracker"""
+
+import time
+import asyncio
+import urllib.error
+import urllib.request
+
+import pytest
+from aiohttp import web
+
+from orpheus_collage_tools.api import APIError, OrpheusAPI, RateLimiter
+from orpheus_collage_tools.resilience import (CircuitBreaker, CircuitOpenError, RetryPolicy, call_with_retry,
+                                              parse_retry_after)
+from servers import serve
+
+FAST = RetryPolicy(attempts=4, base_delay=0.01, max_delay=0.05)
+
+
+def tracker(*faults, delay=0.0):
+    """Stand-in ajax.php answering with ``faults`` (status, headers) first, then success
+
+    The last fault repeats when it is followed by ``...``.
+    """
+    app = web.Application()
+    seen = []
+
+    async def ajax(request):
+        seen.append(time.monotonic())
+        if delay:
+            await asyncio.sleep(delay)
+        fault = None
+        if faults and faults[-1] is ...:
+            fault = faults[min(len(seen), len(faults) - 1) - 1]
+        elif len(seen) <= len(faults):
+            fault = faults[len(seen) - 1]
+        if fault is not None:
+            status, headers = fault
+            return web.Response(status=status, headers=headers, text="error")
+        return web.json_response({"status": "success", "response": {"id": 1, "name": "Charts"}})
+
+    app.router.add_get("/ajax.php", ajax)
+    return app, seen
+
+
+def client(server, breaker, timeout=5.0, policy=FAST):
+    return OrpheusAPI("key", base_url=str(server.make_url("")), rate_limiter=RateLimiter(100, 1.0),
+                      timeout=timeout, retry_policy=policy, breaker=breaker)
+
+
+def test_flaky_503_is_retried():
+    async def run():
+        app, seen = tracker((503, {}), (503, {}))
+        async with serve(app) as server, client(server, CircuitBreaker()) as api:
+            return await api.ajax("collage", id=1), seen
+
+    response, seen = asyncio.run(run())
+    assert response["name"] == "Charts"
+    assert len(seen) == 3
+
+
+def test_429_waits_for_retry_after():
+    breaker = CircuitBreaker()
+
+    async def run():
+        app, seen = tracker((429, {"Retry-After": "1"}))
+        async with serve(app) as server, client(server, breaker) as api:
+            return await api.ajax("collage", id=1), seen
+
+    response, seen = asyncio.run(run())
+    assert response["name"] == "Charts"
+    assert len(seen) == 2
+    assert seen[1] - seen[0] >= 0.9
+    # A refusal is not an outage
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_always_500_opens_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60, max_wait=0.1)
+
+    async def run():
+        app, seen = tracker((500, {}), ...)
+        async with serve(app) as server, client(server, breaker, policy=RetryPolicy(5, 0.01, 0.05)) as api:
+            with pytest.raises(APIError, match="Tracker unavailable"):
+                await api.ajax("collage", id=1)
+            sent = len(seen)
+            # Open circuit: fail fast without touching the tracker
+            with pytest.raises(APIError, match="Tracker unavailable"):
+                await api.ajax("collage", id=2)
+            return sent, len(seen)
+
+    sent, after = asyncio.run(run())
+    assert sent == 3 and after == 3
+    assert breaker.state == "open"
+
+
+def test_slow_response_times_out():
+    breaker = CircuitBreaker()
+
+    async def run():
+        app, seen = tracker(delay=1.0)
+        async with serve(app) as server, client(server, breaker, timeout=0.2,
+                                                policy=RetryPolicy(2, 0.01, 0.05)) as api:
+            with pytest.raises(APIError, match="timeout after 2 attempts"):
+                await api.ajax("collage", id=1)
+            return seen
+
+    assert len(asyncio.run(run())) == 2
+    assert breaker.failures == 2
+
+
+def test_blocking_calls_share_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+
+    async def run():
+        app, seen = tracker((500, {}), ...)
+        async with serve(app) as server:
+            url = str(server.make_url("/ajax.php?action=collage&id=1"))
+
+            def fetch():
+                with urllib.request.urlopen(url, timeout=5) as response:
+                    return response.getcode()
+
+            def call():
+                return call_with_retry(fetch, RetryPolicy(4, 0.01, 0.05), breaker, "collage")
+
+            loop = asyncio.get_running_loop()
+            with pytest.raises(CircuitOpenError):
+                await loop.run_in_executor(None, call)
+            return seen
+
+    assert len(asyncio.run(run())) == 2
+    assert breaker.state == "open"
+
+
+def test_blocking_call_recovers_from_503():
+    async def run():
+        app, seen = tracker((503, {}))
+        async with serve(app) as server:
+            url = str(server.make_url("/ajax.php?action=collage&id=1"))
+
+            def fetch():
+                with urllib.request.urlopen(url, timeout=5) as response:
+                    return response.getcode()
+
+            loop = asyncio.get_running_loop()
+            code = await loop.run_in_executor(None, call_with_retry, fetch, FAST, CircuitBreaker())
+            return code, seen
+
+    code, seen = asyncio.run(run())
+    assert code == 200 and len(seen) == 2
+
+
+def test_validation_uses_the_process_breaker(monkeypatch):
+    from orpheus_collage_tools import core
+    from orpheus_collage_tools.api import TRACKER_BREAKER
+
+    breakers = []
+
+    def fake_call(func, policy=None, breaker=None, endpoint="request"):
+        breakers.append(breaker)
+        raise urllib.error.URLError("offline")
+
+    monkeypatch.setattr(core, "call_with_retry", fake_call)
+    tools = core.OrpheusTools()
+    assert not tools._validate_api_key("key")
+    assert not tools._validate_credentials("user", "password")
+    assert breakers == [TRACKER_BREAKER, TRACKER_BREAKER]
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after("") is None
+    assert parse_retry_after("soon") is None
+
+
+def short_body_tracker(failures):
+    """Stand-in whose first ``failures`` answers promise more body than they send"""
+    app = web.Application()
+    seen = []
+
+    async def ajax(request):
+        seen.append(time.monotonic())
+        body = b'{"status": "success", "response": {"id": 1, "name": "Charts"}}'
+        if len(seen) > failures:
+            return web.Response(body=body, content_type="application/json")
+        response = web.StreamResponse(headers={"Content-Length": str(len(body) * 2),
+                                               "Content-Type": "application/json"})
+        await response.prepare(request)
+        await response.write(body[:20])
+        # Drop the connection mid-body
+        request.transport.close()
+        return response
+
+    app.router.add_get("/ajax.php", ajax)
+    return app, seen
+
+
+def test_truncated_body_is_retried():
+    breaker = CircuitBreaker()
+
+    async def run():
+        app, seen = short_body_tracker(1)
+        async with serve(app) as server, client(server, breaker) as api:
+            return await api.ajax("collage", id=1), seen
+
+    response, seen = asyncio.run(run())
+    assert response["name"] == "Charts"
+    assert len(seen) == 2
+
+
+def test_truncated_body_gives_api_error():
+    breaker = CircuitBreaker()
+
+    async def run():
+        app, seen = short_body_tracker(10)
+        async with serve(app) as server, client(server, breaker, policy=RetryPolicy(3, 0.01, 0.05)) as api:
+            with pytest.raises(APIError, match="truncated body after 3 attempts"):
+                await api.ajax("collage", id=1)
+            return seen
+
+    assert len(asyncio.run(run())) == 3
+    assert breaker.failures == 3
+
+
+COLLAGE = (b'{"status": "success", "response": {"id": 1, "name": "Charts", "torrentgroups": ['
+           b'{"id": 10, "name": "One"}, {"id": 11, "name": "Two"}]}}')
+
+
+def streaming_tracker(cuts):
+    """Stand-in collage whose answers stop after ``cuts[n]`` bytes until the cuts run out"""
+    app = web.Application()
+    seen = []
+
+    async def ajax(request):
+        seen.append(time.monotonic())
+        if len(seen) > len(cuts):
+            return web.Response(body=COLLAGE, content_type="application/json")
+        response = web.StreamResponse(headers={"Content-Length": str(len(COLLAGE)),
+                                               "Content-Type": "application/json"})
+        await response.prepare(request)
+        await response.write(COLLAGE[:cuts[len(seen) - 1]])
+        await asyncio.sleep(0.05)
+        request.transport.close()
+        return response
+
+    app.router.add_get("/ajax.php", ajax)
+    return app, seen
+
+
+def stream_collage(app, breaker):
+    groups = []
+
+    async def add(items):
+        groups.extend(item["id"] for item in items)
+
+    async def run():
+        async with serve(app) as server, client(server, breaker) as api:
+            await api.ajax_stream("collage", "torrentgroups", add, id=1)
+
+    return groups, run
+
+
+def test_stream_cut_before_items_is_retried():
+    breaker = CircuitBreaker()
+    app, seen = streaming_tracker([30])
+    groups, run = stream_collage(app, breaker)
+    asyncio.run(run())
+    assert groups == [10, 11]
+    assert len(seen) == 2
+
+
+def test_stream_cut_after_items_gives_api_error():
+    breaker = CircuitBreaker()
+    app, seen = streaming_tracker([COLLAGE.index(b", {") + 2])
+    groups, run = stream_collage(app, breaker)
+    with pytest.raises(APIError, match="cut off after 1 items"):
+        asyncio.run(run())
+    # Not retried, so the first group is not handed on twice
+    assert groups == [10]
+    assert len(seen) == 1
+    assert breaker.failures == 1
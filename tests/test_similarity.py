@@ -0,0 +1,88 @@
+"""Related collages: MinHash/LSH recall and the persisted, incrementally updated index"""
+
+import os
+
+import pytest
+
+from orpheus_collage_tools.collage_store import store_path, write_collage_store
+from orpheus_collage_tools.similarity import SimilarityIndex, minhash
+
+BASE = set(range(1000, 1200))
+# Near-duplicates of BASE: a few albums swapped out for others
+VARIANTS = {10 + n: (BASE - set(range(1000 + n * 10, 1010 + n * 10))) | set(range(5000 + n * 10, 5010 + n * 10))
+            for n in range(5)}
+UNRELATED = {20 + n: set(range(10000 + n * 300, 10200 + n * 300)) for n in range(10)}
+
+
+def store(config_dir, collage_id, group_ids, name=None):
+    groups = [{"id": group_id, "name": f"Album {group_id}", "year": 2000,
+               "torrents": [{"id": group_id * 10, "format": "FLAC", "encoding": "Lossless", "media": "CD",
+                             "size": 1, "seeders": 1}]}
+              for group_id in sorted(group_ids)]
+    path = store_path(config_dir, collage_id)
+    write_collage_store(path, collage_id, name or f"Collage {collage_id}", groups)
+    return path
+
+
+@pytest.fixture
+def config_dir(tmp_path):
+    store(tmp_path, 1, BASE, "Base")
+    for collage_id, group_ids in {**VARIANTS, **UNRELATED}.items():
+        store(tmp_path, collage_id, group_ids)
+    return tmp_path
+
+
+@pytest.fixture
+def index(config_dir):
+    index = SimilarityIndex(config_dir)
+    assert index.update() == 16
+    return index
+
+
+def test_near_duplicates_are_found(index):
+    results = index.related(BASE, limit=20, exclude=1)
+    assert {r.collage_id for r in results} == set(VARIANTS)
+    for result in results:
+        assert result.similarity > 0.6
+        assert abs(result.shared - 190) <= 20
+
+
+def test_exclude_drops_the_collage_itself(index):
+    assert index.related(BASE, limit=1)[0].collage_id == 1
+    assert 1 not in {r.collage_id for r in index.related(BASE, exclude=1)}
+
+
+def test_scan_all_finds_small_sets_by_shared_albums(index):
+    # Five albums of one unrelated collage: too small a share for the bands
+    small = set(sorted(UNRELATED[23])[:5])
+    results = index.related(small, limit=3, scan_all=True)
+    assert results and results[0].collage_id == 23
+
+
+def test_index_survives_a_reload(index, config_dir):
+    loaded = SimilarityIndex(config_dir)
+    assert loaded.collages == index.collages
+    assert loaded.signature(0) == index.signature(0) == minhash(BASE)
+    assert list(loaded.groups(0)) == sorted(BASE)
+    assert loaded.related(BASE, limit=20) == index.related(BASE, limit=20)
+    assert loaded.update() == 0
+
+
+def test_changed_and_deleted_stores_are_picked_up(index, config_dir):
+    path = store(config_dir, 20, BASE)
+    stat = path.stat()
+    # Make sure the rewrite is seen even on coarse file system clocks
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    store_path(config_dir, 21).unlink()
+
+    assert index.update() == 1
+    assert index.position(21) is None
+    assert 20 in {r.collage_id for r in index.related(BASE, limit=20, exclude=1)}
+    assert SimilarityIndex(config_dir).position(21) is None
+
+
+def test_empty_index(tmp_path):
+    index = SimilarityIndex(tmp_path)
+    assert index.update() == 0
+    assert len(index) == 0
+    assert index.related(BASE) == []
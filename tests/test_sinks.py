@@ -0,0 +1,135 @@
+"""Torrent sinks against local stand-ins for qBittorrent and Transmission"""
+
+import asyncio
+import base64
+
+import pytest
+from aiohttp import web
+
+from orpheus_collage_tools.sinks import (DownloadLedger, FolderSink, QBittorrentSink, SinkError, TorrentItem,
+                                         TransmissionSink)
+from servers import closed_port, serve
+
+
+def items(*payloads):
+    return [TorrentItem(i, 100 + i, f"Album {i}", data, "collage_1") for i, data in enumerate(payloads, 1)]
+
+
+def qbittorrent_app(password="secret"):
+    app = web.Application()
+    added = []
+
+    async def login(request):
+        form = await request.post()
+        return web.Response(text="Ok." if form.get("password") == password else "Fails.")
+
+    async def add(request):
+        form = await request.post()
+        added.extend(field.file.read() for field in form.getall("torrents"))
+        return web.Response(text="Ok.")
+
+    app.router.add_post("/api/v2/auth/login", login)
+    app.router.add_post("/api/v2/torrents/add", add)
+    return app, added
+
+
+def transmission_app():
+    app = web.Application()
+    added = []
+
+    async def rpc(request):
+        if request.headers.get("X-Transmission-Session-Id") != "abc":
+            return web.Response(status=409, headers={"X-Transmission-Session-Id": "abc"})
+        data = base64.b64decode((await request.json())["arguments"]["metainfo"])
+        if data.startswith(b"bad"):
+            return web.json_response({"result": "invalid or corrupt torrent file", "arguments": {}})
+        added.append(data)
+        return web.json_response({"result": "success", "arguments": {"torrent-added": {}}})
+
+    app.router.add_post("/transmission/rpc", rpc)
+    return app, added
+
+
+def test_qbittorrent_batch(tmp_path):
+    async def run():
+        app, added = qbittorrent_app()
+        async with serve(app) as server:
+            sink = QBittorrentSink(str(server.make_url("/")), username="u", password="secret",
+                                   ledger=DownloadLedger(tmp_path / "downloads.jsonl"))
+            async with sink:
+                for item in items(b"one", b"two"):
+                    await sink.add(item)
+        return added, sink
+
+    added, sink = asyncio.run(run())
+    assert added == [b"one", b"two"]
+    assert len(sink.delivered) == 2 and not sink.failed
+    assert sink.ledger.torrent_ids() == {1, 2}
+
+
+def test_qbittorrent_bad_login_closes_session():
+    async def run():
+        async with serve(qbittorrent_app()[0]) as server:
+            sink = QBittorrentSink(str(server.make_url("/")), username="u", password="wrong")
+            with pytest.raises(SinkError, match="login failed"):
+                async with sink:
+                    pass
+        return sink
+
+    assert asyncio.run(run()).session is None
+
+
+def test_qbittorrent_unreachable_closes_session():
+    async def run():
+        sink = QBittorrentSink(f"http://127.0.0.1:{closed_port()}", username="u", password="p")
+        with pytest.raises(SinkError, match="Could not reach"):
+            async with sink:
+                pass
+        return sink
+
+    assert asyncio.run(run()).session is None
+
+
+def test_transmission_marks_only_rejected_torrents(tmp_path):
+    async def run():
+        app, added = transmission_app()
+        async with serve(app) as server:
+            sink = TransmissionSink(str(server.make_url("/")), ledger=DownloadLedger(tmp_path / "downloads.jsonl"))
+            async with sink:
+                for item in items(b"one", b"bad", b"three"):
+                    await sink.add(item)
+        return added, sink
+
+    added, sink = asyncio.run(run())
+    assert sorted(added) == [b"one", b"three"]
+    assert [item.torrent_id for item in sink.delivered] == [1, 3]
+    assert [item.torrent_id for item in sink.failed] == [2]
+    assert sink.ledger.torrent_ids() == {1, 3}
+
+
+def test_transmission_whole_batch_failure():
+    async def run():
+        async with serve(transmission_app()[0]) as server:
+            sink = TransmissionSink(str(server.make_url("/")))
+            async with sink:
+                for item in items(b"bad1", b"bad2"):
+                    await sink.add(item)
+        return sink
+
+    sink = asyncio.run(run())
+    assert not sink.delivered
+    assert len(sink.failed) == 2
+
+
+def test_folder_sink(tmp_path):
+    async def run():
+        sink = FolderSink(tmp_path)
+        async with sink:
+            for item in items(b"one", b"two"):
+                await sink.add(item)
+        return sink
+
+    sink = asyncio.run(run())
+    assert len(sink.delivered) == 2
+    written = sorted(path.name for path in (tmp_path / "collage_1").iterdir())
+    assert written == ["Album_1_1.torrent", "Album_2_2.torrent"]
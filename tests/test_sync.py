@@ -0,0 +1,108 @@
+"""Incremental collage sync against a stand-in tracker"""
+
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from orpheus_collage_tools.api import APIError, OrpheusAPI, RateLimiter
+from orpheus_collage_tools.resilience import CircuitBreaker, RetryPolicy
+from orpheus_collage_tools.sinks import FolderSink, SinkError
+from orpheus_collage_tools.sync import SyncState, sync_collage
+from servers import serve
+
+BROKEN_GROUP = 3
+LOGIN_PAGE = '<html><form class="auth_form" name="login" id="loginform" method="post" action="login.php"></form></html>'
+
+
+def group(group_id):
+    return {
+        "group": {"id": group_id, "name": f"Album {group_id}", "year": 1990 + group_id, "releaseType": 1},
+        "torrents": [{"id": group_id * 10, "media": "CD", "format": "FLAC", "encoding": "Lossless",
+                      "size": 300_000_000, "seeders": 5, "remasterYear": 1990 + group_id}],
+    }
+
+
+def tracker(login=True, expired=False, rows=(1, 2, 3, 4)):
+    """Stand-in site; ``login=False`` refuses the password, ``expired`` bounces pages to login.php"""
+    app = web.Application()
+
+    async def ajax(request):
+        action = request.query["action"]
+        if action == "torrentgroup":
+            group_id = int(request.query["id"])
+            if group_id == BROKEN_GROUP:
+                return web.Response(status=500)
+            return web.json_response({"status": "success", "response": group(group_id)})
+        if action == "download":
+            return web.Response(body=b"d8:announce" + request.query["id"].encode() + b"e")
+        return web.json_response({"status": "failure", "error": "bad action"})
+
+    async def login_form(request):
+        return web.Response(text=LOGIN_PAGE, content_type="text/html")
+
+    async def do_login(request):
+        if not login:
+            return await login_form(request)
+        return web.Response(status=302, headers={"Location": "/index.php"})
+
+    async def collage(request):
+        if expired:
+            raise web.HTTPFound("/login.php")
+        links = "".join(f'<tr class="group"><td><a href="torrents.php?id={i}">x</a></td></tr>' for i in rows)
+        return web.Response(text=f'<html><table class="torrent_table" id="discog_table">{links}</table></html>',
+                            content_type="text/html")
+
+    app.router.add_get("/ajax.php", ajax)
+    app.router.add_post("/login.php", do_login)
+    app.router.add_get("/login.php", login_form)
+    app.router.add_get("/collages.php", collage)
+    return app
+
+
+class UnopenableSink(FolderSink):
+    async def open(self):
+        raise SinkError("client unreachable")
+
+
+def run_sync(tmp_path, sink, dry_run=False, site=None):
+    async def run():
+        async with serve(site or tracker()) as server, \
+                OrpheusAPI("key", "user", "password", base_url=str(server.make_url("")),
+                           rate_limiter=RateLimiter(100, 1.0), retry_policy=RetryPolicy(2, 0.01, 0.05),
+                           breaker=CircuitBreaker()) as api:
+            return await sync_collage(api, state, "flac", sink, dry_run=dry_run)
+
+    state = SyncState.load(tmp_path / "sync", 7)
+    state.groups = {1}
+    state.synced_at = 1.0
+    return asyncio.run(run()), state
+
+
+def test_failed_group_does_not_abort_sync(tmp_path):
+    summary, state = run_sync(tmp_path, FolderSink(tmp_path / "torrents"))
+
+    assert summary == {"new": 3, "downloaded": 2, "unmatched": 0, "failed": 1}
+    assert state.downloads == {2: 20, 4: 40}
+    # The failed group stays unseen so the next sync retries it
+    assert BROKEN_GROUP not in state.groups
+    saved = SyncState.load(tmp_path / "sync", 7)
+    assert saved.downloads == {2: 20, 4: 40}
+
+
+def test_dry_run_leaves_the_sink_closed(tmp_path):
+    summary, state = run_sync(tmp_path, UnopenableSink(tmp_path / "torrents"), dry_run=True)
+
+    assert summary["new"] == 3 and summary["downloaded"] == 0
+    assert not (tmp_path / "sync" / "collage_7.json").exists()
+
+
+@pytest.mark.parametrize("site, message", [
+    (tracker(login=False), "Login failed"),
+    (tracker(expired=True), "got the login page"),
+    (tracker(rows=()), "page 1 lists no groups"),
+])
+def test_login_page_is_not_an_empty_collage(tmp_path, site, message):
+    with pytest.raises(APIError, match=message):
+        run_sync(tmp_path, FolderSink(tmp_path / "torrents"), site=site)
+    assert not (tmp_path / "sync" / "collage_7.json").exists()
@@ -0,0 +1,124 @@
+"""Watch scheduler cycles"""
+
+import json
+import time
+import asyncio
+
+from orpheus_collage_tools.api import APIError
+from orpheus_collage_tools.watch import PRIORITY_BACKGROUND, REFRESHERS, WatchScheduler
+
+
+def test_after_cycle_runs_after_each_cycle(tmp_path):
+    cycles = []
+    scheduler = WatchScheduler(tmp_path / "watch.json")
+    asyncio.run(scheduler.run_forever(None, tmp_path, once=True, after_cycle=lambda: cycles.append(1)))
+    assert cycles == [1]
+
+
+def watching(path, *targets, interval=3600):
+    """Scheduler whose ``targets`` are all due, earliest first"""
+    scheduler = WatchScheduler(path)
+    for n, target in enumerate(targets):
+        scheduler.add("collage", target, interval)
+        scheduler.items[scheduler.key("collage", target)]["next_run"] = n
+    scheduler.save()
+    return scheduler
+
+
+def recorder(monkeypatch, during=None):
+    """Swap in a collage refresher that records targets, calling ``during(target)`` mid-job"""
+    ran = []
+
+    async def refresh(api, target, config_dir):
+        ran.append(target)
+        if during is not None:
+            during(target)
+
+    monkeypatch.setitem(REFRESHERS, "collage", refresh)
+    return ran
+
+
+def test_due_items_run_by_priority(tmp_path, monkeypatch):
+    ran = recorder(monkeypatch)
+    scheduler = watching(tmp_path / "watch.json", "1", "2", "3")
+    scheduler.request_refresh("collage", "3")
+
+    assert asyncio.run(scheduler.run_due(None, tmp_path, concurrency=1)) == 3
+    assert ran == ["3", "1", "2"]
+    assert not scheduler.due()
+
+
+def test_bump_while_running_is_seen_in_the_same_cycle(tmp_path, monkeypatch):
+    path = tmp_path / "watch.json"
+    scheduler = watching(path, "1", "2", "3")
+    other = WatchScheduler(path)
+    other.add("collage", "4", 3600)
+    other.items["collage:4"]["next_run"] = time.time() + 3600
+    other.save()
+
+    def bump(target):
+        # Another process (the interactive CLI) asks for 4 while 1 refreshes
+        if target == "1":
+            WatchScheduler(path).request_refresh("collage", "4")
+
+    ran = recorder(monkeypatch, bump)
+    asyncio.run(scheduler.run_due(None, tmp_path, concurrency=1))
+    assert ran == ["1", "4", "2", "3"]
+
+
+def test_item_bumped_during_its_own_run_runs_again(tmp_path, monkeypatch):
+    path = tmp_path / "watch.json"
+    scheduler = watching(path, "1")
+
+    def bump(target):
+        if len(ran) == 1:
+            WatchScheduler(path).request_refresh("collage", "1")
+
+    ran = recorder(monkeypatch, bump)
+    asyncio.run(scheduler.run_due(None, tmp_path, concurrency=1))
+    assert ran == ["1", "1"]
+    assert scheduler.items["collage:1"]["priority"] == PRIORITY_BACKGROUND
+
+
+def test_changes_on_disk_are_merged(tmp_path, monkeypatch):
+    path = tmp_path / "watch.json"
+    scheduler = watching(path, "1", "2")
+
+    def edit(target):
+        other = WatchScheduler(path)
+        other.remove("collage", "2")
+        other.add("crate", "Jazz", 3600)
+        other.items["crate:Jazz"]["next_run"] = time.time() + 3600
+        other.save()
+
+    ran = recorder(monkeypatch, edit)
+    before = time.time()
+    assert asyncio.run(scheduler.run_due(None, tmp_path, concurrency=1)) == 1
+    assert ran == ["1"]
+
+    saved = json.loads(path.read_text())["items"]
+    assert set(saved) == {"collage:1", "crate:Jazz"}
+    assert saved["collage:1"]["last_run"] >= before
+    assert saved["collage:1"]["next_run"] > before + 3000
+    assert saved["crate:Jazz"]["last_run"] is None
+
+
+def test_failed_refresh_is_recorded(tmp_path, monkeypatch):
+    scheduler = watching(tmp_path / "watch.json", "1")
+
+    async def refresh(api, target, config_dir):
+        raise APIError("tracker down")
+
+    monkeypatch.setitem(REFRESHERS, "collage", refresh)
+    asyncio.run(scheduler.run_due(None, tmp_path))
+    assert WatchScheduler(tmp_path / "watch.json").items["collage:1"]["last_error"] == "tracker down"
+
+
+def test_jitter_bounds(tmp_path):
+    scheduler = WatchScheduler(tmp_path / "watch.json", jitter=0.1)
+    for n in range(50):
+        now = time.time()
+        item = scheduler.add("collage", str(n), 1000)
+        assert now <= item["next_run"] <= time.time() + 100
+        scheduler.reschedule(item)
+        assert now + 900 <= item["next_run"] <= time.time() + 1100